@@ -1,66 +1,240 @@
 import os
+import queue
+import threading
 import tkinter as tk
-from tkinter import filedialog, messagebox, scrolledtext
-
-def convert_files_to_lf(file_paths):
-    converted_files = []
-    for file_path in file_paths:
-        if not os.path.isfile(file_path):
-            print(f"File does not exist: {file_path}")
-            continue
+from tkinter import filedialog, messagebox
+
+from lf_normalize import DEFAULT_INCLUDE, FileEntry, normalize_files, scan_tree, summary
+
+SCAN_BATCH = 500            # files handed from the scan thread to the list at a time
+SCAN_POLL_MS = 50
+CONVERT_POLL_MS = 100
+
+# =========================
+# Directory scan
+# =========================
+def scan_batches(top, include, exclude, gitignore, stop, out):
+    """Runs scan_tree on a worker thread: lists of up to SCAN_BATCH entries into out, then None."""
+    batch = []
+    try:
+        for entry in scan_tree(top, include, exclude, gitignore, stop):
+            batch.append(entry)
+            if len(batch) >= SCAN_BATCH:
+                out.put(batch)
+                batch = []
+    finally:
+        out.put(batch)
+        out.put(None)
+
+def convert_worker(paths, out):
+    """
+    Runs normalize_files on a worker thread: ("progress", done) while it runs, then
+    ("done", results) or ("error", exception).
+    """
+    try:
+        out.put(("done", normalize_files(paths, progress=lambda done: out.put(("progress", done)))))
+    except Exception as e:
+        out.put(("error", e))
+
+# =========================
+# GUI
+# =========================
+class Converter:
+    def __init__(self, root):
+        self.root = root
+        self.root.title("Converter do UTF-8 + LF")
+
+        self.files = []             # FileEntry, in list order
+        self.known = set()
+        self.queue = queue.Queue()  # batches from the scan threads
+        self.stop = threading.Event()
+        self.scans = 0              # scan threads still running
+        self.converting = None      # (queue, file count) while the conversion thread runs
+
+        # Filters for "Add folder"
+        filters = tk.Frame(root)
+        filters.pack(fill=tk.X, padx=10, pady=(10, 0))
+        filters.columnconfigure(1, weight=1)
+        self.include = tk.StringVar(value=DEFAULT_INCLUDE)
+        self.exclude = tk.StringVar(value="")
+        self.gitignore = tk.BooleanVar(value=True)
+        tk.Label(filters, text="Include").grid(row=0, column=0, sticky="w")
+        tk.Entry(filters, textvariable=self.include).grid(row=0, column=1, sticky="we")
+        tk.Label(filters, text="Exclude").grid(row=1, column=0, sticky="w")
+        tk.Entry(filters, textvariable=self.exclude).grid(row=1, column=1, sticky="we")
+        tk.Checkbutton(filters, text="Skip files ignored by .gitignore", variable=self.gitignore).grid(
+            row=2, column=1, sticky="w")
+
+        # Pasted path (file or folder)
+        path_frame = tk.Frame(root)
+        path_frame.pack(fill=tk.X, padx=10, pady=(5, 0))
+        self.path = tk.StringVar()
+        path_entry = tk.Entry(path_frame, textvariable=self.path)
+        path_entry.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        path_entry.bind("<Return>", lambda e: self.add_path())
+        tk.Button(path_frame, text="Add path", command=self.add_path).pack(side=tk.LEFT, padx=(5, 0))
+
+        # File list – a Listbox only draws the visible rows, batches are inserted in one call
+        list_frame = tk.Frame(root)
+        list_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+        scroll = tk.Scrollbar(list_frame)
+        scroll.pack(side=tk.RIGHT, fill=tk.Y)
+        self.listbox = tk.Listbox(list_frame, width=100, height=20, selectmode=tk.EXTENDED,
+                                  yscrollcommand=scroll.set)
+        self.listbox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        scroll.configure(command=self.listbox.yview)
+        self.listbox.bind("<Delete>", lambda e: self.remove_selected())
+
+        self.status = tk.Label(root, anchor="w")
+        self.status.pack(fill=tk.X, padx=10)
+
+        # Buttons
+        button_frame = tk.Frame(root)
+        button_frame.pack(pady=10)
+        tk.Button(button_frame, text="Add folder", command=self.add_folder).grid(row=0, column=0, padx=5)
+        tk.Button(button_frame, text="Add file", command=self.add_file).grid(row=0, column=1, padx=5)
+        tk.Button(button_frame, text="Remove selected", command=self.remove_selected).grid(row=0, column=2, padx=5)
+        tk.Button(button_frame, text="Clear", command=self.clear).grid(row=0, column=3, padx=5)
+        tk.Button(button_frame, text="Convert files", command=self.convert).grid(row=0, column=4, padx=5)
+
+        self.show_status()
+
+    # =========================
+    # File list
+    # =========================
+    def add_entries(self, entries):
+        new = [e for e in entries if e.path not in self.known]
+        if not new:
+            return
+        self.known.update(e.path for e in new)
+        self.files.extend(new)
+        self.listbox.insert(tk.END, *(e.path.replace("\\", "/") for e in new))
+
+    def scan(self, folder):
+        """Scans folder on a worker thread; the list fills in batches while the UI stays responsive."""
+        threading.Thread(
+            target=scan_batches,
+            args=(folder, self.include.get().split(), self.exclude.get().split(), self.gitignore.get(),
+                  self.stop, self.queue),
+            daemon=True,
+        ).start()
+        self.scans += 1
+        if self.scans == 1:
+            self.root.after(SCAN_POLL_MS, self.poll_scan)
+        self.show_status()
+
+    def poll_scan(self):
+        batches = []
+        try:
+            while len(batches) < 20:    # at most 20 x SCAN_BATCH rows per tick
+                batch = self.queue.get_nowait()
+                if batch is None:
+                    self.scans -= 1
+                else:
+                    batches.extend(batch)
+        except queue.Empty:
+            pass
+        self.add_entries(batches)
+        self.show_status()
+        if self.scans:
+            self.root.after(SCAN_POLL_MS, self.poll_scan)
+
+    def show_status(self):
+        size = sum(e.size for e in self.files)
+        text = f"{len(self.files)} files, {size / 1024:.0f} kB"
+        self.status.configure(text=text + (" – scanning…" if self.scans else ""))
+
+    def show_progress(self, done, total):
+        self.status.configure(text=f"Converting… {done}/{total} files")
+
+    def add_folder(self):
+        folder_path = filedialog.askdirectory()
+        if folder_path:
+            self.scan(folder_path)
+
+    def add_file(self):
+        for file_path in filedialog.askopenfilenames():
+            self.add_entries([FileEntry(file_path, os.path.getsize(file_path))])
+        self.show_status()
+
+    def add_path(self):
+        path = self.path.get().strip().strip('"')
+        if os.path.isdir(path):
+            self.scan(path)
+        elif os.path.isfile(path):
+            self.add_entries([FileEntry(path, os.path.getsize(path))])
+            self.show_status()
+        else:
+            messagebox.showerror("Error", f"Not found: {path}")
+            return
+        self.path.set("")
+
+    def remove_selected(self):
+        for i in reversed(self.listbox.curselection()):
+            self.listbox.delete(i)
+            self.known.discard(self.files.pop(i).path)
+        self.show_status()
+
+    def clear(self):
+        # Running scans finish into the old queue and are ignored
+        self.stop.set()
+        self.stop = threading.Event()
+        self.queue = queue.Queue()
+        self.scans = 0
+        self.files.clear()
+        self.known.clear()
+        self.listbox.delete(0, tk.END)
+        self.show_status()
+
+    # =========================
+    # Conversion
+    # =========================
+    def convert(self):
+        if self.scans:
+            messagebox.showinfo("Info", "Folder scan still running, try again when it has finished.")
+            return
+        if self.converting:
+            messagebox.showinfo("Info", "Conversion still running.")
+            return
+        if not self.files:
+            messagebox.showinfo("Info", "No files to convert!")
+            return
+        # Converts on a worker thread, the window keeps redrawing and shows the progress
+        paths = [e.path for e in self.files]
+        self.converting = (queue.Queue(), len(paths))
+        threading.Thread(target=convert_worker, args=(paths, self.converting[0]), daemon=True).start()
+        self.show_progress(0, len(paths))
+        self.root.after(CONVERT_POLL_MS, self.poll_convert)
+
+    def poll_convert(self):
+        out, total = self.converting
+        kind, value = "progress", None
         try:
-            # Open the file in binary mode
-            with open(file_path, "rb") as f:
-                raw = f.read()
-
-            # Replace all CRLF (\r\n) i CR (\r) na LF (\n)
-            text = raw.replace(b"\r\n", b"\n").replace(b"\r", b"\n")
-
-            # Save again in UTF-8
-            with open(file_path, "wb") as f:
-                f.write(text)
-
-            converted_files.append(file_path)
-        except Exception as e:
-            print(f"Conversion failed: {file_path}")
-            print(e)
-    return converted_files
-
-def add_folder(text_area):
-    folder_path = filedialog.askdirectory()
-    if folder_path:
-        for root, dirs, files in os.walk(folder_path):
-            for file in files:
-                file_path = os.path.join(root, file)
-                text_area.insert(tk.END, file_path.replace("\\", "/") + "\n")
-
-def add_file(text_area):
-    file_path = filedialog.askopenfilename()
-    if file_path:
-        text_area.insert(tk.END, file_path.replace("\\", "/") + "\n")
-
-def convert_from_text(text_area):
-    content = text_area.get("1.0", tk.END).strip()
-    file_paths = [line.strip() for line in content.splitlines() if line.strip()]
-    if not file_paths:
-        messagebox.showinfo("Info", "No files to convert!")
-        return
-    converted_files = convert_files_to_lf(file_paths)
-    messagebox.showinfo("Success", f"Converted {len(converted_files)} files!")
-
-root = tk.Tk()
-root.title("Converter do UTF-8 + LF")
-
-# ScrolledText for displaying and editing paths
-text_area = scrolledtext.ScrolledText(root, width=80, height=20)
-text_area.pack(padx=10, pady=10)
-
-# Buttons
-button_frame = tk.Frame(root)
-button_frame.pack(pady=10)
-
-tk.Button(button_frame, text="Add folder", command=lambda: add_folder(text_area)).grid(row=0, column=0, padx=5)
-tk.Button(button_frame, text="Add file", command=lambda: add_file(text_area)).grid(row=0, column=1, padx=5)
-tk.Button(button_frame, text="Convert files", command=lambda: convert_from_text(text_area)).grid(row=0, column=2, padx=5)
-
-root.mainloop()
+            while kind == "progress":
+                kind, value = out.get_nowait()
+        except queue.Empty:
+            pass
+        if kind == "progress":
+            if value is not None:
+                self.show_progress(value, total)
+            self.root.after(CONVERT_POLL_MS, self.poll_convert)
+            return
+
+        self.converting = None
+        self.show_status()
+        if kind == "error":
+            messagebox.showerror("Error", str(value))
+            return
+        results = value
+        if results["failed"]:
+            messagebox.showwarning("Done with errors", summary(results) + "\n\n" + "\n".join(results["failed"][:10]))
+        else:
+            messagebox.showinfo("Success", summary(results))
+
+def main():
+    root = tk.Tk()
+    Converter(root)
+    root.mainloop()
+
+if __name__ == "__main__":
+    main()
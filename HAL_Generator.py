@@ -2,210 +2,17 @@
 import xml.etree.ElementTree as ET
 import tkinter as tk
 from tkinter import filedialog, messagebox, scrolledtext, ttk
-import re
-
-def normalize(name):
-    """Normalize pin and halpin names: lowercase, remove underscores and hyphens."""
-    name = name.lower().replace("-", "").replace("_", "")
-    if name.startswith("drv"):
-        name = name[3:]
-    return name
-
-def normalize_param(name):
-    """Normalize parameter names: lowercase, replace _ with -"""
-    return name.lower().replace("_", "-")
-
-class HalGenerator:
-    def __init__(self, xml_path, enabled, comp_map, axis_map, pdo_combobox, joint_pins, param_values):
-        self.xml_path = xml_path
-        self.enabled = enabled
-        self.comp_map = comp_map
-        self.axis_map = axis_map
-        self.pdo_combobox = pdo_combobox
-        self.joint_pins = joint_pins
-        self.param_values = param_values
-        self.slaves = {}
-        self.parse_xml()
-        self.enabled_joint = {}
-
-        # Normalize joint pins and param values at the start
-        for pin, cb in self.joint_pins.items():
-            if cb:
-                val = cb.get().strip()
-                if val:
-                    cb.set(val.replace("_", "-"))
-        for pname, pvar in self.param_values.items():
-            val = pvar.get().strip()
-            if val:
-                pvar.set(val.replace("_", "-"))
-
-    def parse_xml(self):
-        """Parses an EtherCAT XML file and saves the PDOs and halPins for each slave."""
-        tree = ET.parse(self.xml_path)
-        root = tree.getroot()
-        for slave in root.findall(".//slave"):
-            sidx = int(slave.attrib["idx"])
-            self.slaves[sidx] = {"rx": [], "tx": []}
-
-            for sm in slave.findall("syncManager"):
-                for pdo in sm.findall("pdo"):
-                    for entry in pdo.findall("pdoEntry"):
-                        obj_str = entry.attrib["idx"]
-                        obj = int(obj_str, 16)  # Always treat as hex
-                        halpin = entry.attrib.get("halPin", f"obj-{obj:04x}").replace("_", "-")
-
-                        # Direction based on 6040 (rx) and 6041 (tx)
-                        if obj == 0x6040:
-                            self.slaves[sidx]["rx"].append((obj, halpin))
-                        elif obj == 0x6041:
-                            self.slaves[sidx]["tx"].append((obj, halpin))
-                        else:
-                            self.slaves[sidx]["rx"].append((obj, halpin))
-
-    def hal_pin_name(self, cia, obj, halpin, selected):
-        """Generuje nazwę CIA402 dla neta, z normalizacją podkreśleń."""
-        if selected:
-            return f"cia402.{cia}.{selected.replace('_', '-')}"
-        return None
-
-    def generate_hal(self):
-        """Generuje zawartość pliku HAL dla LinuxCNC + EtherCAT + CIA402."""
-
-        # Joint order and axis-to-joint mapping
-        joint_order = []
-        for i in sorted(self.axis_map.keys()):
-            cfg = self.axis_map[i]
-            if cfg["axis"]:
-                joint_order.append((cfg["slave"], cfg["axis"], i))
-
-        axis_to_joint = {}
-        for idx, (slave, axis, _) in enumerate(sorted(joint_order, key=lambda x: x[0])):
-            axis_to_joint[axis] = idx
-
-        # Dynamic count – number of joints in CiA-402
-        cia_count = len(axis_to_joint)
-
-        h = []
-        h += [
-            "# ==========================================",
-            "# AUTO GENERATED HAL – FULL PDO SUPPORT",
-            "# ==========================================\n",
-            "loadrt [KINS]KINEMATICS",
-            "loadrt [EMCMOT]EMCMOT servo_period_nsec=[EMCMOT]SERVO_PERIOD num_joints=[KINS]JOINTS",
-            "loadusr -W lcec_conf ethercat-conf.xml",
-            f"loadrt cia402 count={cia_count}",  # <- dynamic number of joints
-            "loadrt lcec",
-            "",
-        ]
-
-        # Add servo function
-        h.append("addf lcec.read-all servo-thread")
-        for axis in axis_to_joint:
-            h.append(f"addf cia402.{axis_to_joint[axis]}.read-all servo-thread")
-        h.append("addf motion-command-handler servo-thread")
-        h.append("addf motion-controller servo-thread")
-       
-        for axis in axis_to_joint:
-            h.append(f"addf cia402.{axis_to_joint[axis]}.write-all servo-thread")
-        h.append("addf lcec.write-all servo-thread")
-        h.append("")
-        h.append("setp iocontrol.0.emc-enable-in 1")
-        h.append("")
-        
-
-        # ==========================================
-        # AUTOMATIC JOINTS SECTION
-        # ==========================================
-        required_pins = [
-            "joint.0.motor-pos-cmd",
-            "joint.0.vel-cmd",
-            "joint.0.motor-pos-fb",
-            "joint.0.vel-fb",
-            "joint.0.amp-enable-out",
-            "joint.0.amp-fault-in",
-            "joint.0.request-custom-homing",
-            "joint.0.is-custom-homing",
-            "joint.0.custom-homing-finished",
-        ]
-
-        # Generate nets for each axis
-        for axis in ["X", "Y", "Y2", "Z", "A", "B"]:
-            if axis not in axis_to_joint:
-                continue
-
-            joint = axis_to_joint[axis]
-            cia = joint
-            slave = None
-            for cfg in self.axis_map.values():
-                if cfg["axis"] == axis:
-                    slave = cfg["slave"]
-                    break
-
-            h.append(f"# -------- AXIS {axis} / joint.{joint} / cia402.{cia} / slave.{slave} --------")
-
-            # CiA-402 parameters – automatic
-            for pname, pvar in self.param_values.items():
-                val = pvar.get().strip()
-                if val:
-                    pname_norm = normalize_param(pname)
-                    h.append(f"setp cia402.{cia}.{pname_norm} {val}")
-
-            h.append("")
-
-            # Joint ↔ CiA-402 nets – checkboxes updated dynamically
-            for pinname in required_pins:
-                if pinname == "joint.0.homed":
-                    continue
-                cb = self.joint_pins.get(pinname)
-                en = self.enabled_joint.get(pinname)
-                if not cb or not en or not en.get() or not cb.get().strip():
-                    continue
-                halpin = cb.get().strip()
-
-                if "motor-pos-cmd" in pinname:
-                    h.append(f"net {axis}-pos-cmd joint.{joint}.motor-pos-cmd => cia402.{cia}.{halpin}")
-                elif "vel-cmd" in pinname:
-                    h.append(f"net {axis}-vel-cmd joint.{joint}.vel-cmd => cia402.{cia}.{halpin}")
-                elif "motor-pos-fb" in pinname:
-                    h.append(f"net {axis}-pos-fb cia402.{cia}.{halpin} => joint.{joint}.motor-pos-fb")
-                elif "vel-fb" in pinname:
-                    h.append(f"net {axis}-vel-fb cia402.{cia}.{halpin} => joint.{joint}.vel-fb")
-                elif "amp-enable-out" in pinname:
-                    h.append(f"net {axis}-enable joint.{joint}.amp-enable-out => cia402.{cia}.{halpin}")
-                elif "amp-fault-in" in pinname:
-                    h.append(f"net {axis}-amp-fault cia402.{cia}.{halpin} => joint.{joint}.amp-fault-in")
-                elif "request-custom-homing" in pinname:
-                    h.append(f"net {axis}-custom-home joint.{joint}.request-custom-homing => cia402.{cia}.{halpin}")
-                elif "is-custom-homing" in pinname:
-                    h.append(f"net {axis}-is-custom-homing cia402.{cia}.{halpin} => joint.{joint}.is-custom-homing")
-                elif "custom-homing-finished" in pinname:
-                    h.append(f"net {axis}-custom-home-done cia402.{cia}.{halpin} => joint.{joint}.custom-homing-finished")
-
-            h.append("")
-
-            # Auto-generate PDO nets (Rx → lcec)
-            for obj, halpin in self.slaves.get(slave, {}).get("rx", []):
-                if self.enabled.get((slave, obj)):
-                    selected = self.pdo_combobox.get((slave, obj))
-                    src = self.hal_pin_name(cia, obj, halpin, selected.get() if selected else None)
-                    if src:
-                        lcec_net = f"lcec.0.{slave}.{halpin}"
-                        h.append(f"net {axis}-{halpin} {src} => {lcec_net}")
-
-            # Auto-generate PDO nets (Tx ← lcec)
-            for obj, halpin in self.slaves.get(slave, {}).get("tx", []):
-                if self.enabled.get((slave, obj)):
-                    selected = self.pdo_combobox.get((slave, obj))
-                    dst = self.hal_pin_name(cia, obj, halpin, selected.get() if selected else None)
-                    if dst:
-                        lcec_net = f"lcec.0.{slave}.{halpin}"
-                        h.append(f"net {axis}-{halpin} {lcec_net} => {dst}")
-
-            h.append("")
-
-        return "\n".join(h)
-
+import json
 
+from hal_core import (
+    AXIS_ORDER, JOINT_GROUPS, JOINT_MODES, JOINT_SUGGESTIONS, MODES, HalGenerator, match_pin, normalize,
+    parse_comp,
+)
+from drive_profiles import for_config
+from hal_gen import profile_relpath
+from lf_normalize import save_text
+from xml_core import scale_floats, xml_text
+from profiling import count, laps, stage, timed
 
 
 class App(tk.Tk):
@@ -215,6 +22,8 @@ class App(tk.Tk):
         self.geometry("1700x900")
 
         self.xml_path = None
+        self.comp_path = None
+        self.gen = None
         self.comp_map = {}
         self.param_values = {}
 
@@ -224,7 +33,9 @@ class App(tk.Tk):
         self.joint_pins = {}
         self.joint_enable = {}
 
-        self.axis_map = {i: {"axis": None, "slave": None} for i in range(4)}
+        self.axis_map = {}
+        self.mode_var = tk.StringVar(value="CSP")
+        self.probe_var = tk.BooleanVar(value=False)
 
         top = tk.Frame(self)
         top.pack(fill=tk.X)
@@ -232,6 +43,14 @@ class App(tk.Tk):
         tk.Button(top, text="📂 Load ethercat-conf.xml", command=self.load_xml).pack(side=tk.LEFT, padx=5)
         tk.Button(top, text="📂 Load cia402.comp", command=self.load_comp).pack(side=tk.LEFT, padx=5)
         tk.Button(top, text="💾 Save HAL", command=self.save_hal).pack(side=tk.LEFT, padx=5)
+        tk.Button(top, text="💾 Save profile", command=self.save_profile).pack(side=tk.LEFT, padx=5)
+
+        tk.Label(top, text="Mode").pack(side=tk.LEFT, padx=(20, 5))
+        mode_cb = ttk.Combobox(top, values=MODES, textvariable=self.mode_var, state="readonly", width=6)
+        mode_cb.pack(side=tk.LEFT)
+        mode_cb.bind("<<ComboboxSelected>>", lambda e: self.apply_mode())
+        tk.Checkbutton(top, text="Touch probe (latched position)", variable=self.probe_var,
+                       command=self._schedule_update).pack(side=tk.LEFT, padx=10)
 
         main = tk.PanedWindow(self, orient=tk.HORIZONTAL)
         main.pack(fill=tk.BOTH, expand=True)
@@ -292,6 +111,14 @@ class App(tk.Tk):
 
         return cb
 
+    def apply_mode(self):
+        """Check the joint pins the selected CiA-402 mode needs, uncheck the rest."""
+        mode = self.mode_var.get()
+        for pinname, var in self.joint_enable.items():
+            var.set(mode in JOINT_MODES.get(pinname, ()))
+            self.joint_pins[pinname].configure(state="readonly" if var.get() else "disabled")
+        self._schedule_update()
+
     def toggle_combobox(self, pinname):
         cb = self.joint_pins[pinname]
         if self.joint_enable[pinname].get():
@@ -310,13 +137,12 @@ class App(tk.Tk):
 
         with open(path) as f:
             content = f.read()
+        self.comp_path = path
 
-        pins = re.findall(r'pin\s+(in|out|io)\s+(unsigned|signed|float|bit)\s+(\w+)', content)
-        for _, _, name in pins:
+        pins, params = parse_comp(content)
+        for name in pins:
             self.comp_map[name] = name
-
-        params = re.findall(r'param\s+(rw|ro)\s+(unsigned|signed|float|bit)\s+(\w+)', content)
-        for _, _, name in params:
+        for name in params:
             self.param_values[name] = tk.StringVar(value="")
 
         messagebox.showinfo("OK", f"Loaded cia402.comp – {len(self.comp_map)} pins, {len(self.param_values)} parameters")
@@ -328,9 +154,12 @@ class App(tk.Tk):
         if self.xml_path:
             self.refresh_wizard()
 
+    @timed("hal.refresh_wizard")
     def refresh_wizard(self):
+        lap = laps("hal.refresh_wizard")
         for w in self.scrollable.winfo_children():
             w.destroy()
+        lap("destroy_widgets")
 
         self.pdo_vars.clear()
         self.pdo_combobox.clear()
@@ -338,7 +167,13 @@ class App(tk.Tk):
         self.joint_pins.clear()
         self.joint_enable.clear()
 
-        axis_options = ["", "X", "Y", "Y2", "Z", "A", "B"]
+        tree = ET.parse(self.xml_path)
+        root = tree.getroot()
+        lap("parse_xml")
+        # Parameter suggestions of the drive profile (selected by the slave's vid / pid)
+        suggested = for_config(root).params
+
+        axis_options = [""] + AXIS_ORDER
         bold_font = ("Arial", 10, "bold")
 
         tk.Label(self.scrollable, text="PDO / Pins", font=bold_font).grid(row=0, column=0, sticky="w")
@@ -360,10 +195,8 @@ class App(tk.Tk):
                 entry.grid(row=general_row, column=4, sticky="w")
                 entry.bind("<KeyRelease>", lambda e: self._schedule_update())
 
-                if normalize(pname) == "posscale":
-                    pvar.set("1677721.6")
-                elif normalize(pname) == "cspmode":
-                    pvar.set("1")
+                if normalize(pname) in suggested:
+                    pvar.set(suggested[normalize(pname)])
 
                 general_row += 1
 
@@ -371,32 +204,12 @@ class App(tk.Tk):
             tk.Label(self.scrollable, text="Joints", font=bold_font).grid(row=general_row, column=3, sticky="w")
             general_row += 1
 
-            joint_order = [
-                "joint.0.motor-pos-cmd",
-                "joint.0.motor-pos-fb",
-                "joint.0.amp-enable-out",
-                "joint.0.amp-fault-in",
-                "",
-                "__FOR_CST_MODE__",
-                "joint.0.vel-cmd",
-                "joint.0.vel-fb",
-                "",
-                "joint.0.request-custom-homing",
-                "joint.0.is-custom-homing",
-                "joint.0.custom-homing-finished",
-            ]
-
-            joint_suggestions = {
-                "joint.0.amp-enable-out": "enable",
-                "joint.0.motor-pos-cmd": "pos_cmd",
-                "joint.0.vel-cmd": "velocity_cmd",
-                "joint.0.motor-pos-fb": "pos_fb",
-                "joint.0.vel-fb": "velocity_fb",
-                "joint.0.amp-fault-in": "drv_fault",
-                "joint.0.request-custom-homing": "home",
-                "joint.0.is-custom-homing": "stat_homing",
-                "joint.0.custom-homing-finished": "stat_homed",
-            }
+            # Rows come from hal_core.JOINT_WIRING, grouped under their GUI heading
+            joint_order = []
+            for group, pins in JOINT_GROUPS.items():
+                joint_order += [""] if joint_order else []
+                joint_order += [f"__GROUP__{group}"] if group else []
+                joint_order += pins
 
             pin_list = list(self.comp_map.keys())
 
@@ -406,24 +219,15 @@ class App(tk.Tk):
                     general_row += 1
                     continue
 
-                if pinname == "__FOR_CST_MODE__":
-                    tk.Label(self.scrollable, text="For CST mode", font=("Arial", 10, "bold")).grid(
+                if pinname.startswith("__GROUP__"):
+                    tk.Label(self.scrollable, text=pinname[len("__GROUP__"):], font=("Arial", 10, "bold")).grid(
                         row=general_row, column=3, sticky="w"
                     )
                     general_row += 1
                     continue
 
-                if pinname == "joint.0.request-custom-homing":
-                    tk.Label(self.scrollable, text="Homing", font=("Arial", 10, "bold")).grid(
-                        row=general_row, column=3, sticky="w"
-                    )
-                    general_row += 1
-
-                # Uncheck vel-cmd and vel-fb by default
-                if pinname in ["joint.0.vel-cmd", "joint.0.vel-fb"]:
-                    var = tk.BooleanVar(value=False)
-                else:
-                    var = tk.BooleanVar(value=True)
+                # Pins the current mode does not use start unchecked
+                var = tk.BooleanVar(value=self.mode_var.get() in JOINT_MODES.get(pinname, ()))
 
                 self.joint_enable[pinname] = var
 
@@ -437,15 +241,12 @@ class App(tk.Tk):
                 chk.grid(row=general_row, column=3, sticky="w")
 
                 cb = self.create_combobox(self.scrollable, pin_list, general_row, 4)
-                sugg = joint_suggestions.get(pinname)
-                if sugg:
-                    for pin in pin_list:
-                        if normalize(pin) == normalize(sugg):
-                            cb.set(pin)
-                            break
-
-                # If vel-cmd or vel-fb is unchecked, combobox is disabled
-                if pinname in ["joint.0.vel-cmd", "joint.0.vel-fb"] and not var.get():
+                sugg = JOINT_SUGGESTIONS.get(pinname)
+                if sugg and match_pin(sugg, pin_list):
+                    cb.set(match_pin(sugg, pin_list))
+
+                # If the pin is unchecked, combobox is disabled
+                if not var.get():
                     cb.configure(state="disabled")
 
                 self.joint_pins[pinname] = cb
@@ -454,10 +255,10 @@ class App(tk.Tk):
                 tk.Label(self.scrollable, text="").grid(row=general_row, column=3)
                 general_row += 1
 
+        lap("joint_widgets")
+
         # Load slave and PDO
         row = 1
-        tree = ET.parse(self.xml_path)
-        root = tree.getroot()
 
         for slave in root.findall(".//slave"):
             sidx = int(slave.attrib["idx"])
@@ -483,10 +284,8 @@ class App(tk.Tk):
                         self.pdo_vars[(sidx, obj)] = var
 
                         cb2 = self.create_combobox(self.scrollable, list(self.comp_map.keys()), row, 1)
-                        for pin in self.comp_map:
-                            if normalize(pin) == normalize(halpin):
-                                cb2.set(pin)
-                                break
+                        if match_pin(halpin, self.comp_map):
+                            cb2.set(match_pin(halpin, self.comp_map))
 
                         self.pdo_combobox[(sidx, obj)] = cb2
                         tk.Checkbutton(
@@ -498,25 +297,38 @@ class App(tk.Tk):
                         row += 1
 
             row += 1
+        lap("pdo_widgets")
+        count("hal.wizard_rows", row)
 
         self.canvas.update_idletasks()
         self.canvas.configure(scrollregion=self.canvas.bbox("all"))
+        lap("layout")
         self._schedule_update()
 
+    def axes_used(self):
+        """Axis letter -> slave index chosen in the axis comboboxes."""
+        return {cb.get(): slave for slave, cb in self.axis_combobox.items() if cb.get()}
+
+    def profile(self):
+        """Current wizard choices as a mapping profile for hal_gen.py."""
+        return {
+            "mode": self.mode_var.get(),
+            "probe": self.probe_var.get(),
+            "axes": self.axes_used(),
+            "joint_pins": {k: cb.get() for k, cb in self.joint_pins.items()},
+            "joint_enabled": {k: v.get() for k, v in self.joint_enable.items()},
+            "params": {k: v.get() for k, v in self.param_values.items()},
+            "pdo_pins": {f"{s}:{o:04X}": cb.get() for (s, o), cb in self.pdo_combobox.items()},
+            "disabled_pdos": [f"{s}:{o:04X}" for (s, o), v in self.pdo_vars.items() if not v.get()],
+        }
+
+    @timed("hal.generate")
     def generate(self, update_only=False):
-        self.axis_map = {i: {"axis": None, "slave": None} for i in range(4)}
-
-        axis_used = {}
-        for slave, cb in self.axis_combobox.items():
-            if cb.get():
-                axis_used[cb.get()] = slave
-
-        i = 0
-        for axis in ["X", "Y", "Y2", "Z", "A", "B"]:
+        axis_used = self.axes_used()
+        self.axis_map = {}
+        for axis in AXIS_ORDER:
             if axis in axis_used:
-                self.axis_map[i]["axis"] = axis
-                self.axis_map[i]["slave"] = axis_used[axis]
-                i += 1
+                self.axis_map[len(self.axis_map)] = {"axis": axis, "slave": axis_used[axis]}
 
         enabled = {k: v.get() for k, v in self.pdo_vars.items()}
 
@@ -525,19 +337,40 @@ class App(tk.Tk):
             enabled,
             self.comp_map,
             self.axis_map,
-            self.pdo_combobox,
-            self.joint_pins,
-            self.param_values,
+            {k: cb.get() for k, cb in self.pdo_combobox.items()},
+            {k: cb.get() for k, cb in self.joint_pins.items()},
+            {k: v.get() for k, v in self.param_values.items()},
+            mode=self.mode_var.get(),
+            probe=self.probe_var.get(),
+            enabled_joint={k: v.get() for k, v in self.joint_enable.items()},
         )
-        gen.enabled_joint = self.joint_enable
 
+        self.gen = gen
         hal = gen.generate_hal()
-        self.hal_text.delete("1.0", tk.END)
-        self.hal_text.insert(tk.END, hal)
+        with stage("hal.text_insert"):
+            self.hal_text.delete("1.0", tk.END)
+            self.hal_text.insert(tk.END, hal)
+        count("hal.chars_inserted", len(hal))
 
         if not update_only:
             self._schedule_update()
 
+    def save_profile(self):
+        path = filedialog.asksaveasfilename(
+            initialfile="hal-profile.json",
+            defaultextension=".json",
+            filetypes=[("Profile", "*.json"), ("All files", "*.*")],
+        )
+        if path:
+            profile = self.profile()
+            # hal_gen.py reads the inputs from the profile, relative to it
+            for key, value in (("xml", self.xml_path), ("comp", self.comp_path)):
+                if value:
+                    profile[key] = profile_relpath(path, value)
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(profile, f, indent=2)
+            messagebox.showinfo("Saved", path)
+
     def save_hal(self):
         path = filedialog.asksaveasfilename(
             defaultextension=".hal",
@@ -545,9 +378,22 @@ class App(tk.Tk):
             title="Zapisz plik HAL"
         )
         if path:
-            with open(path, "w", encoding="utf-8") as f:
-                f.write(self.hal_text.get("1.0", tk.END))
+            save_text(path, self.hal_text.get("1.0", tk.END))
             messagebox.showinfo("Saved", path)
+            self.match_xml_scales()
+
+    def match_xml_scales(self):
+        """Offers to rescale the XML float entries (60B1 / 60B2 / 60BA) to the pos-scale of the saved HAL."""
+        if not self.xml_path or self.gen is None:
+            return
+        root = ET.parse(self.xml_path).getroot()
+        changed = scale_floats(root, self.gen.pos_scales())
+        if changed and messagebox.askyesno(
+            "Float scales",
+            f"{changed} float PDO entries in {self.xml_path} use another pos-scale than this HAL.\n"
+            "Update their scale in the XML?",
+        ):
+            save_text(self.xml_path, xml_text(root))
 
 
 if __name__ == "__main__":
@@ -3,300 +3,30 @@
 HAL -> INI intelligent generator (LinuxCNC, EtherCAT, servo)
 - GUI (tkinter)
 - Load HAL file
-- Parse with regex
+- Parse with a single-pass HAL tokenizer
 - Detect joints, cia402 drives, motion links
 - Show detected structure with color validation
+Parsing, validation and INI rendering are in ini_core.py (no tkinter); this file is the GUI only.
 """
 
 import os
-import re
 import tkinter as tk
 from tkinter import filedialog, ttk, messagebox
-from dataclasses import dataclass, field
-from typing import Dict, List, Set
 
-
-# =====================
-# Data model
-# =====================
-
-@dataclass
-class ServoDrive:
-    name: str
-    joints: Set[int] = field(default_factory=set)
-    nets: Set[str] = field(default_factory=set)
-    params: Dict[str, str] = field(default_factory=dict)
-
-@dataclass
-class Joint:
-    index: int
-    servos: Set[str] = field(default_factory=set)
-    nets: Set[str] = field(default_factory=set)
-    motion_mode: str | None = None   # CSP / CSV / UNKNOWN
-    axis_type: str | None = None     # LINEAR / ANGULAR
-
-@dataclass
-class HalModel:
-    joints: Dict[int, Joint] = field(default_factory=dict)
-    servos: Dict[str, ServoDrive] = field(default_factory=dict)
-    raw_lines: List[str] = field(default_factory=list)
-
-
-# =====================
-# HAL parser (regex based)
-# =====================
-
-class HalParser:
-    RE_NET = re.compile(r"^net\s+(?P<netname>[\w-]+)\s+(?P<pins>.+)$")
-    RE_JOINT_PIN = re.compile(r"joint\.(?P<idx>\d+)\.(?P<name>[\w-]+)")
-    RE_CIA_PIN = re.compile(r"cia402\.(?P<idx>\d+)\.(?P<name>[\w-]+)")
-    RE_SET_PARAM = re.compile(r"^setp\s+cia402\.(?P<idx>\d+)\.(?P<param>[\w-]+)\s+(?P<val>.+)$")
-
-    def parse(self, text: str) -> HalModel:
-        model = HalModel(raw_lines=text.splitlines())
-
-        axis_nets: Dict[str, Set[str]] = {}
-        axis_setp: Dict[str, Set[str]] = {}
-        axis_netlines: Dict[str, Set[str]] = {}
-
-        for line in model.raw_lines:
-            line = line.strip()
-            if not line or line.startswith('#'):
-                continue
-
-            sm = self.RE_SET_PARAM.match(line)
-            if sm:
-                idx = int(sm.group('idx'))
-                axis = f"cia402.{idx}"
-
-                axis_key = axis
-                axis_setp.setdefault(axis_key, set()).add(
-                    f"{sm.group('param').lower()}={sm.group('val')}"
-                )
-
-                name = axis
-                servo = model.servos.setdefault(name, ServoDrive(name=name))
-                servo.params[sm.group('param').lower()] = sm.group('val').strip()
-                continue
-
-            m = self.RE_NET.match(line)
-            if not m:
-                continue
-
-            netname = m.group('netname').lower()
-            pins_text = m.group('pins')
-            pins = re.findall(r"[\w\.-]+", pins_text)
-
-            axis_letter = None
-            for pin in pins:
-                if self.RE_JOINT_PIN.search(pin) or self.RE_CIA_PIN.search(pin):
-                    axis_letter = netname[0] if netname and netname[0] in "xyzabuvw" else None
-                    break
-
-            for pin in pins:
-                jm = self.RE_JOINT_PIN.search(pin)
-                if jm:
-                    idx = int(jm.group('idx'))
-                    joint = model.joints.setdefault(idx, Joint(index=idx))
-                    joint.nets.add(netname)
-
-                    if axis_letter:
-                        axis_nets.setdefault(axis_letter, set()).add(netname)
-
-                cm = self.RE_CIA_PIN.search(pin)
-                if cm:
-                    name = f"cia402.{cm.group('idx')}"
-                    servo = model.servos.setdefault(name, ServoDrive(name=name))
-                    servo.nets.add(netname)
-
-                    if axis_letter:
-                        axis_nets.setdefault(axis_letter, set()).add(netname)
-
-            if axis_letter:
-                axis_netlines.setdefault(axis_letter, set()).add(line)
-
-        for j in model.joints.values():
-            for s in model.servos.values():
-                if j.nets & s.nets:
-                    j.servos.add(s.name)
-                    s.joints.add(j.index)
-
-        model.axis_nets = axis_nets
-        model.axis_setp = axis_setp
-        model.axis_netlines = axis_netlines
-
-        return model
-
-
-# =====================
-# Analyzer (CSP/CSV detection)
-# =====================
-
-class HalAnalyzer:
-    def analyze(self, model: HalModel):
-        for j in model.joints.values():
-            self._analyze_axis_type(j)
-            self._analyze_motion_mode(j, model)
-
-    def _analyze_axis_type(self, joint: Joint):
-        if any("deg" in net or "angle" in net for net in joint.nets):
-            joint.axis_type = "ANGULAR"
-        else:
-            joint.axis_type = "LINEAR"
-
-    def _analyze_motion_mode(self, joint: Joint, model: HalModel):
-        for servo_name in joint.servos:
-            servo = model.servos.get(servo_name)
-            if servo:
-                if servo.params.get("csp_mode") == "1":
-                    joint.motion_mode = "CSP"
-                    return
-                if servo.params.get("csv_mode") == "1":
-                    joint.motion_mode = "CSV"
-                    return
-
-        if any("pos_cmd" in net or "motor-pos-cmd" in net for net in joint.nets):
-            joint.motion_mode = "CSP"
-        elif any("vel_cmd" in net or "velocity_cmd" in net for net in joint.nets):
-            joint.motion_mode = "CSV"
-        else:
-            joint.motion_mode = "UNKNOWN"
-
-
-# =====================
-# Validator (separate section, no impact on INI)
-# =====================
-
-@dataclass
-class ValidationResult:
-    errors: List[str] = field(default_factory=list)
-    warnings: List[str] = field(default_factory=list)
-
-
-class HalValidator:
-    def validate(self, model: HalModel) -> ValidationResult:
-        res = ValidationResult()
-
-        for j in model.joints.values():
-            if not j.servos:
-                res.errors.append(f"joint.{j.index} has no servo mapping")
-
-        for s in model.servos.values():
-            if not s.joints:
-                res.errors.append(f"{s.name} has no joint mapping")
-
-        for j in model.joints.values():
-            if j.motion_mode == "UNKNOWN":
-                res.warnings.append(f"joint.{j.index} motion mode UNKNOWN")
-
-        for s in model.servos.values():
-            if len(s.joints) > 1:
-                res.errors.append(f"{s.name} mapped to multiple joints: {sorted(s.joints)}")
-
-        for j in model.joints.values():
-            if len(j.servos) > 1:
-                res.errors.append(f"joint.{j.index} mapped to multiple servos: {sorted(j.servos)}")
-
-        return res
-
-
-# =====================
-# Semantic Validator
-# =====================
-
-def norm_line(line: str) -> str:
-    return re.sub(r"[0-9xyzabuvwXYZABUVW]", "", line).strip()
-
-EXPECTED_NETS = {
-    "CSP": {
-        "joint": {"motorposcmd", "motorposfb", "ampenableout"},
-        "servo": {"poscmd", "posfb", "enable"},
-    },
-    "CSV": {
-        "joint": {"velcmd", "velfb", "ampenableout"},
-        "servo": {"velocitycmd", "velocityfb", "enable"},
-    },
-    "CST": {
-        "joint": {"torquecmd", "torquefb", "ampenableout"},
-        "servo": {"torquecmd", "torquefb", "enable"},
-    }
-}
-
-
-class SemanticValidator:
-    def validate(self, model: HalModel) -> Dict[str, object]:
-        result = {
-            "essential": True,
-            "expected": True,
-            "cohesion": True,
-            "unmatched": {}
-        }
-
-        for j in model.joints.values():
-            if not j.servos:
-                result["essential"] = False
-
-        for j in model.joints.values():
-            if j.motion_mode not in EXPECTED_NETS:
-                result["expected"] = False
-                continue
-
-            servo_name = next(iter(j.servos), None)
-            if not servo_name:
-                result["expected"] = False
-                continue
-
-            servo = model.servos.get(servo_name)
-            if not servo:
-                result["expected"] = False
-                continue
-
-            joint_nets = {n.lower() for n in j.nets}
-            servo_nets = {n.lower() for n in servo.nets}
-
-            exp = EXPECTED_NETS[j.motion_mode]
-
-            for r in exp["joint"]:
-                if not any(r in n for n in joint_nets):
-                    result["expected"] = False
-
-            for r in exp["servo"]:
-                if not any(r in n for n in servo_nets):
-                    result["expected"] = False
-
-        axis_netlines = getattr(model, "axis_netlines", {})
-
-        if axis_netlines:
-            ref = None
-            ref_norm = None
-
-            for axis, lines in axis_netlines.items():
-                normalized = {norm_line(l) for l in lines}
-
-                if ref is None:
-                    ref = axis
-                    ref_norm = normalized
-                    continue
-
-                if ref_norm != normalized:
-                    result["cohesion"] = False
-
-                    unmatched = set()
-                    for l in lines:
-                        if norm_line(l) not in ref_norm:
-                            unmatched.add(l)
-
-                    result["unmatched"][axis] = unmatched
-
-        return result
+from config_check import RE_INI_REF, check_project
+from ini_core import (
+    GENERATED_KEYS, INI_DEBOUNCE_MS, INI_SECTIONS, LIMIT_DEFAULTS, WATCH_INTERVAL_MS, HalAnalyzer, HalModel,
+    HalParser, HalValidator, HalWatcher, Joint, SemanticValidator, ServoDrive, axis_table, default_axis,
+    fmt_limit, hal_joint_axes, ini_blocks, limit_warnings, merge_ini, motion_limits, pin_role, write_atomic,
+)
+from lf_normalize import normalize_text
+from profiling import count, laps, timed
 
 
 # =====================
 # GUI
 # =====================
 
-AXIS_NAMES = "XYZABCUVW"
-
 class App(tk.Tk):
     def __init__(self):
         super().__init__()
@@ -308,6 +38,15 @@ class App(tk.Tk):
         self.validator = HalValidator()
         self.semantic_validator = SemanticValidator()
         self.model: HalModel | None = None
+        self.watcher: HalWatcher | None = None
+        self.axis_table = None          # axis_table() of the current joint -> axis mapping
+        self.tree_items = {}            # ("joint", idx) / ("servo", name) -> tree item
+        self.validation_id = None
+        self.ini_values = {}            # section -> (enabled, ((KEY, value), ...))
+        self.ini_dirty = set()
+        self.ini_blocks = []            # [(header, text)] shown in the INI view
+        self.ini_after = None
+        self.watch_after = None
 
         self._build_ui()
         self.after(100, self._set_pane_sizes)
@@ -332,10 +71,24 @@ class App(tk.Tk):
         tk.Button(left_bar, text="📂 Load HAL", command=self.load_hal).pack(side=tk.LEFT, padx=5)
         tk.Button(left_bar, text="💾 Save INI", command=self.save_ini).pack(side=tk.LEFT, padx=5)
 
-        # Gantry at the end of the left section (right edge of left_bar)
+        self.merge_var = tk.BooleanVar(value=True)
+        tk.Checkbutton(left_bar, text="Merge into existing INI", variable=self.merge_var).pack(side=tk.LEFT, padx=5)
+
+        self.watch_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(left_bar, text="Watch HAL", variable=self.watch_var,
+                       command=self.toggle_watch).pack(side=tk.LEFT, padx=5)
+
+        # Gantry: joint i drives the i-th letter of "Joint axes" (e.g. X Y Y Z)
         self.gantry_var = tk.BooleanVar(value=False)
-        tk.Checkbutton(left_bar, text="Gantry", variable=self.gantry_var).place(relx=0.45, rely=0.0, anchor='n')
-        self.gantry_var.trace_add("write", lambda *args: self.apply_gantry_mode())
+        tk.Checkbutton(left_bar, text="Gantry", variable=self.gantry_var).pack(side=tk.LEFT, padx=(20, 5))
+        self.gantry_var.trace_add("write", lambda *args: self.apply_gantry_mode(prefill=True))
+
+        tk.Label(left_bar, text="Joint axes").pack(side=tk.LEFT)
+        self.joint_axes_var = tk.StringVar(value="")
+        tk.Entry(left_bar, textvariable=self.joint_axes_var, width=24).pack(side=tk.LEFT, padx=5)
+        self.joint_axes_var.trace_add("write", lambda *args: self.gantry_var.get() and self.apply_gantry_mode())
+        self.joint_axes_warning = tk.StringVar(value="")
+        tk.Label(left_bar, textvariable=self.joint_axes_warning, fg="orange").pack(side=tk.LEFT)
 
 
         self.main = tk.PanedWindow(self, orient=tk.HORIZONTAL)
@@ -443,68 +196,11 @@ class App(tk.Tk):
 
         # ===== init section widgets =====
         self.sections = {
-          "EMC": {"enabled": tk.BooleanVar(value=True), "fields": {
-            "MACHINE": tk.StringVar(value="Generated_EtherCAT"),
-            "DEBUG": tk.StringVar(value="0"),
-            "VERSION": tk.StringVar(value="1.1"),
-          }},
-          "TRAJ": {"enabled": tk.BooleanVar(value=True), "fields": {
-            "COORDINATES": tk.StringVar(value=""),
-            "LINEAR_UNITS": tk.StringVar(value="mm"),
-            "ANGULAR_UNITS": tk.StringVar(value="degree"),
-            "DEFAULT_LINEAR_VELOCITY": tk.StringVar(value="5"),
-            "MAX_LINEAR_VELOCITY": tk.StringVar(value="50"),
-          }},
-          "RS274NGC": {"enabled": tk.BooleanVar(value=True), "fields": {
-            "PARAMETER_FILE": tk.StringVar(value="gcodeparam.var"),
-          }},
-
-          "EMCMOT": {"enabled": tk.BooleanVar(value=True), "fields": {"EMCMOT": tk.StringVar(value="motmod"), "COMM_TIMEOUT": tk.StringVar(value="1.0"), "SERVO_PERIOD": tk.StringVar(value="1000000"), "HOMEMOD": tk.StringVar(value="cia402_homecomp")}},
-          "EMCIO": {"enabled": tk.BooleanVar(value=True), "fields": {"EMCIO": tk.StringVar(value="io"), "CYCLE_TIME": tk.StringVar(value="0.100")}},
-          "HAL": {"enabled": tk.BooleanVar(value=False), "fields": {"HALFILE": tk.StringVar(value=""), "HALUI": tk.StringVar(value="halui")}},
-          "JOINT": {"enabled": tk.BooleanVar(value=True), "fields": {
-            "TYPE": tk.StringVar(value="LINEAR"),
-            "HOME": tk.StringVar(value="0"),
-            "MIN_LIMIT": tk.StringVar(value="-1000"),
-            "MAX_LIMIT": tk.StringVar(value="1000"),
-            "MAX_VELOCITY": tk.StringVar(value="50"),
-            "MAX_ACCELERATION": tk.StringVar(value="100"),
-            "FERROR": tk.StringVar(value="1000"),
-            "MIN_FERROR": tk.StringVar(value="1000"),
-            "HOME_ABSOLUTE_ENCODER": tk.StringVar(value="2"),
-          }},
-          "AXIS": {"enabled": tk.BooleanVar(value=True), "fields": {
-            "MAX_VELOCITY": tk.StringVar(value="50"),
-            "MAX_ACCELERATION": tk.StringVar(value="100"),
-            "MIN_LIMIT": tk.StringVar(value="-1000"),
-            "MAX_LIMIT": tk.StringVar(value="1000"),
-          }},
-
-          "DISPLAY": {"enabled": tk.BooleanVar(value=True), "fields": {
-            "DISPLAY": tk.StringVar(value="axis"),
-            "EDITOR": tk.StringVar(value="gedit"),
-            "POSITION_OFFSET": tk.StringVar(value="RELATIVE"),
-            "POSITION_FEEDBACK": tk.StringVar(value="ACTUAL"),
-            "ARCDIVISION": tk.StringVar(value="64"),
-            "GRIDS": tk.StringVar(value="10mm 20mm 50mm 100mm 1in 2in 5in 10in"),
-            "MAX_FEED_OVERRIDE": tk.StringVar(value="1.2"),
-            "DEFAULT_LINEAR_VELOCITY": tk.StringVar(value="5"),
-            "MAX_ANGULAR_VELOCITY": tk.StringVar(value="50"),
-            "MIN_LINEAR_VELOCITY": tk.StringVar(value="0"),
-            "MAX_LINEAR_VELOCITY": tk.StringVar(value="50"),
-            "CYCLE_TIME": tk.StringVar(value="0.100"),
-            "INTRO_GRAPHIC": tk.StringVar(value="linuxcnc.gif"),
-            "INTRO_TIME": tk.StringVar(value="1"),
-            "INCREMENTS": tk.StringVar(value="5mm 1mm .5mm .1mm .05mm .01mm .005mm"),
-          }},
-          "KINS": {"enabled": tk.BooleanVar(value=True), "fields": {
-            "JOINTS": tk.StringVar(value=""),
-            "KINEMATICS": tk.StringVar(value=""),
-          }},
-          "TASK": {"enabled": tk.BooleanVar(value=True), "fields": {
-            "TASK": tk.StringVar(value="milltask"),
-            "CYCLE_TIME": tk.StringVar(value="0.010"),
-          }},
+            name: {
+                "enabled": tk.BooleanVar(value=sec["enabled"]),
+                "fields": {k: tk.StringVar(value=v) for k, v in sec["fields"].items()},
+            }
+            for name, sec in INI_SECTIONS.items()
         }
 
         self._build_section_ui(col1, "EMC")
@@ -521,12 +217,21 @@ class App(tk.Tk):
         self._build_section_ui(col3, "RS274NGC")
         self._build_section_ui(col3, "AXIS")
         self._build_section_ui(col3, "JOINT")
+
+        self.limit_fields = {k: tk.StringVar(value=v) for k, v in LIMIT_DEFAULTS.items()}
+        self.limits_id = None
+        self._build_limits_ui(col3)
         
 
-        for sec in self.sections.values():
-            sec["enabled"].trace_add("write", lambda *args: self.update_ini())
+        # Values the generator starts with; keys changed from these are owned when merging
+        self.ini_defaults = {
+            name: {k: v.get() for k, v in sec["fields"].items()} for name, sec in self.sections.items()
+        }
+
+        for name, sec in self.sections.items():
+            sec["enabled"].trace_add("write", lambda *args, n=name: self.update_ini(n))
             for v in sec["fields"].values():
-                v.trace_add("write", lambda *args: self.update_ini())
+                v.trace_add("write", lambda *args, n=name: self.update_ini(n))
 
     def _build_section_ui(self, parent, name):
         sec = self.sections[name]
@@ -542,198 +247,258 @@ class App(tk.Tk):
             tk.Label(row, text=k, width=22, anchor="w").pack(side=tk.LEFT)
             tk.Entry(row, textvariable=var).pack(side=tk.LEFT, fill=tk.X, expand=True)
 
+    def _build_limits_ui(self, parent):
+        frame = tk.LabelFrame(parent, text="MOTION LIMITS (drive)", padx=5, pady=5)
+        frame.pack(fill=tk.X, expand=True, padx=5, pady=5)
+
+        for k, var in self.limit_fields.items():
+            row = tk.Frame(frame)
+            row.pack(fill=tk.X, pady=2)
+            tk.Label(row, text=k, width=22, anchor="w").pack(side=tk.LEFT)
+            tk.Entry(row, textvariable=var).pack(side=tk.LEFT, fill=tk.X, expand=True)
+
+        tk.Button(frame, text="⚙ Calculate JOINT/AXIS limits", command=self.apply_motion_limits).pack(anchor="w")
+
+    def apply_motion_limits(self):
+        """Fill the JOINT/AXIS limits from the drive data and SERVO_PERIOD."""
+        try:
+            v = {k: float(var.get()) for k, var in self.limit_fields.items()}
+            period = float(self.sections["EMCMOT"]["fields"]["SERVO_PERIOD"].get())
+            limits = motion_limits(v["RATED_RPM"], v["ENCODER_COUNTS"], v["LEAD"], v["RATIO"], v["ACCEL_TIME"], period)
+        except ValueError as e:
+            messagebox.showerror("Error", str(e))
+            return
+
+        for name in ("JOINT", "AXIS"):
+            fields = self.sections[name]["fields"]
+            fields["MAX_VELOCITY"].set(fmt_limit(limits["max_velocity"]))
+            fields["MAX_ACCELERATION"].set(fmt_limit(limits["max_acceleration"]))
+        self.sections["JOINT"]["fields"]["FERROR"].set(fmt_limit(limits["ferror"]))
+        self.sections["JOINT"]["fields"]["MIN_FERROR"].set(fmt_limit(limits["min_ferror"]))
+
+        self.show_limits(limits)
+
+    def show_limits(self, limits):
+        def number(section, key):
+            try:
+                return float(self.sections[section]["fields"][key].get())
+            except ValueError:
+                return None
+
+        def param(value):
+            """setp value as a number; [SECTION]KEY is read from the INI fields (JOINT_0 -> JOINT)."""
+            m = RE_INI_REF.fullmatch(value.strip())
+            if m:
+                section = self.sections.get(m.group(1)) or self.sections.get(m.group(1).partition("_")[0])
+                value = section["fields"][m.group(2)].get() if section and m.group(2) in section["fields"] else ""
+            try:
+                return float(value)
+            except ValueError:
+                return None
+
+        pos_scale = None
+        if self.model:
+            scales = (param(v) for k, v in self.model.params.items() if pin_role(k) == "posscale")
+            pos_scale = next((v for v in scales if v is not None), None)
+        warnings = limit_warnings(
+            limits,
+            velocity=number("TRAJ", "MAX_LINEAR_VELOCITY"),
+            min_limit=number("JOINT", "MIN_LIMIT"),
+            max_limit=number("JOINT", "MAX_LIMIT"),
+            pos_scale=pos_scale,
+        )
+
+        if self.limits_id and self.tree.exists(self.limits_id):
+            self.tree.delete(self.limits_id)
+        self.limits_id = self.tree.insert("", "end", text="MOTION LIMITS",
+                                          tags=("warn" if warnings else "ok",))
+        for text, value in (
+            ("pos-scale (counts/unit)", limits["pos_scale"]),
+            ("MAX_VELOCITY (units/s)", limits["max_velocity"]),
+            ("MAX_ACCELERATION (units/s²)", limits["max_acceleration"]),
+            ("counts per servo period", limits["counts_per_period"]),
+            ("s32 travel ± (units)", limits["s32_travel"]),
+            ("s32 wrap at full speed (s)", limits["s32_wrap_time"]),
+            ("FERROR / MIN_FERROR", f"{fmt_limit(limits['ferror'])} / {fmt_limit(limits['min_ferror'])}"),
+        ):
+            value = fmt_limit(value) if isinstance(value, float) else value
+            self.tree.insert(self.limits_id, "end", text=text, values=(value,), tags=("ok",))
+        for w in warnings:
+            self.tree.insert(self.limits_id, "end", text=w, tags=("warn",))
+        self.tree.item(self.limits_id, open=True)
+
     def load_hal(self):
         path = filedialog.askopenfilename(filetypes=[("HAL files", "*.hal"), ("All", "*")])
         if not path:
             return
 
         try:
-            with open(path, 'r', encoding='utf-8') as f:
-                text = f.read()
-
-            self.model = self.parser.parse(text)
+            lap = laps("ini.load_hal")
+            self.watcher = HalWatcher(path, self.parser)
+            self.model = self.watcher.load()
             self.analyzer.analyze(self.model)
-
-            coords = self._get_coordinates_string()
-            self.sections["TRAJ"]["fields"]["COORDINATES"].set(coords)
-
-            self.sections["KINS"]["fields"]["JOINTS"].set(str(len(self.model.joints)))
-            self.sections["KINS"]["fields"]["KINEMATICS"].set(self._get_kinematics_string())
+            lap("parse")
 
             self.sections["HAL"]["fields"]["HALFILE"].set(os.path.basename(path))
             self.sections["HAL"]["enabled"].set(True)
-
-            self.show_model()
-            self.update_ini()
-            self.show_validation()
+            self.show_hal()
+            lap("refresh")
+            count("ini.hal_statements", len(self.model.statements))
 
         except Exception as e:
             messagebox.showerror("Error", str(e))
 
-    def _get_coordinates_string(self):
-        if not self.model:
-            return ""
-        joints = sorted(self.model.joints.keys())
-        coords = []
-        for idx in joints:
-            if idx < len(AXIS_NAMES):
-                coords.append(AXIS_NAMES[idx])
-            else:
-                coords.append(f"J{idx}")
-        return " ".join(coords)
+    def _apply_joint_fields(self, prefill=True):
+        self.sections["KINS"]["fields"]["JOINTS"].set(str(len(self.model.joints)))
+        self.apply_gantry_mode(prefill)
 
-    def _get_kinematics_string(self):
-        if not self.model:
-            return ""
-        joints_count = len(self.model.joints)
-        letters = "XYZABCDEFGHIJKLMNOPQRST"
-        coords = letters[:joints_count]
-        return f"trivkins coordinates={coords}"
-    def apply_gantry_mode(self):
+    def show_hal(self, old=None):
+        """
+        Joint fields, axis table, tree, INI and validation from self.model. old: the model
+        before a watch reload – only its changed joint / servo rows are redrawn.
+        """
+        # a new HAL or other joints: "Joint axes" of the wrong length is refilled, not kept
+        self._apply_joint_fields(old is None or old.joints.keys() != self.model.joints.keys())
+        if old is None or old.joints.keys() != self.model.joints.keys() \
+                or old.servos.keys() != self.model.servos.keys():
+            self.show_model()
+        else:
+            for idx, j in self.model.joints.items():
+                if j != old.joints[idx]:
+                    self.tree.item(self.tree_items[("joint", idx)], **self._joint_row(j))
+            for name, s in self.model.servos.items():
+                if s != old.servos[name]:
+                    self.tree.item(self.tree_items[("servo", name)], **self._servo_row(s))
+        self.update_ini()
+        self.show_validation()
+
+    def toggle_watch(self):
+        if self.watch_after:
+            self.after_cancel(self.watch_after)
+            self.watch_after = None
+        if self.watch_var.get():
+            self.watch_after = self.after(WATCH_INTERVAL_MS, self._poll_watch)
+
+    def _poll_watch(self):
+        self.watch_after = None
+        if not self.watch_var.get():
+            return
+        try:
+            if self.watcher and self.watcher.changed():
+                self.reload_hal()
+        finally:
+            self.watch_after = self.after(WATCH_INTERVAL_MS, self._poll_watch)
+
+    @timed("ini.reload_hal")
+    def reload_hal(self):
+        """Re-parse the watched HAL and refresh the window the same way "Load HAL" does."""
+        old = self.model
+        try:
+            self.model = self.watcher.load()
+        except OSError:
+            return   # file is being replaced, try again on the next poll
+        self.analyzer.analyze(self.model)
+
+        # Gantry axis letters still prefilled from the old nets follow the renamed nets
+        if old is not None and self.gantry_var.get() \
+                and self.joint_axes_var.get().upper().split() == list(hal_joint_axes(old).values()):
+            self.joint_axes_var.set("")
+        self.show_hal(old)
+
+    def apply_gantry_mode(self, prefill=False):
+        """
+        Rebuild the axis table: 1:1, or the "Joint axes" mapping in gantry mode. The field is
+        prefilled from the HAL net names when gantry is switched on, the HAL's joints change
+        or the field is empty.
+        """
         if not self.model:
             return
 
-        if self.gantry_var.get():  # Checkbox checked
-            # 1) Change in the KINS section
-            joints_count = len(self.model.joints)
-            coords_letters = "XYZABCDEFGHIJKLMNOPQRST"[:joints_count]
-
-            # Insert kinstype=both and XYYZ for a 4-axis machine
-            if joints_count == 4:
-                kins_text = f"trivkins kinstype=both coordinates=XYYZ"
-            else:
-                kins_text = f"trivkins coordinates={coords_letters}"
-
-            self.sections["KINS"]["fields"]["KINEMATICS"].set(kins_text)
-
-            # 2) Change in the TRAJ section
-            if joints_count == 4:
-                traj_coords = "X Y Y Z"
+        joints = sorted(self.model.joints)
+        self.joint_axes_warning.set("")
+        try:
+            if self.gantry_var.get():
+                axes = self.joint_axes_var.get().upper().split()
+                if joints and (not axes or (prefill and len(axes) != len(joints))):
+                    # the trace on joint_axes_var re-enters here
+                    self.joint_axes_var.set(" ".join(hal_joint_axes(self.model).values()))
+                    return
+                if len(axes) != len(joints):
+                    # keep the last valid table while the letters are being edited
+                    self.joint_axes_warning.set(f"{len(axes)} letters for {len(joints)} joints")
+                    return
+                try:
+                    self.axis_table = axis_table(dict(zip(joints, axes)))
+                except ValueError as e:
+                    self.joint_axes_warning.set(str(e))
+                    return
             else:
-                traj_coords = " ".join(coords_letters)
-
-            self.sections["TRAJ"]["fields"]["COORDINATES"].set(traj_coords)
-
-        else:  # Checkbox unchecked → restore default values
-            joints_count = len(self.model.joints)
-            coords_letters = "XYZABCDEFGHIJKLMNOPQRST"[:joints_count]
-            self.sections["KINS"]["fields"]["KINEMATICS"].set(f"trivkins coordinates={coords_letters}")
-            self.sections["TRAJ"]["fields"]["COORDINATES"].set(" ".join(coords_letters))
+                self.axis_table = axis_table({idx: default_axis(idx) for idx in joints})
+        except ValueError as e:
+            self.axis_table = None
+            messagebox.showerror("Axes", f"{e}\nEnter the joint axes in gantry mode (\"Joint axes\").")
+            return
+        self.sections["KINS"]["fields"]["KINEMATICS"].set(self.axis_table["kinematics"])
+        self.sections["TRAJ"]["fields"]["COORDINATES"].set(self.axis_table["coordinates"])
 
         # Refresh INI display
         self.update_ini()
 
-
     def apply_gantry_axis_fix(self):
-        """
-        Zwraca mapowanie axis -> lista jointów
-        Automatycznie obsługuje tryb gantry (XYYZ dla 4 osi, itp.)
-        """
-        joints = sorted(self.model.joints.keys())
-        joints_count = len(joints)
-
-        axis_map = {}
-
-        if not self.gantry_var.get():
-            # Standard 1:1 assignment
-            for idx in joints:
-                axis = AXIS_NAMES[idx] if idx < len(AXIS_NAMES) else f"J{idx}"
-                axis_map[axis] = [idx]
-            return axis_map
-
-        # ===== GANTRY MODE =====
-        # Support for 2, 3, 4, and more joints
-        if joints_count == 2:
-            axis_map = {
-                "X": [0],
-                "Y": [1],
-            }
-        elif joints_count == 3:
-            axis_map = {
-                "X": [0],
-                "Y": [1, 2],
-                "Z": [2],
-            }
-        elif joints_count == 4:
-            axis_map = {
-                "X": [0],
-                "Y": [1, 2],  # master + slave
-                "Z": [3],
-            }
-        else:
-            # Fallback: last axis remains individual
-            for idx in joints[:-1]:
-                axis = AXIS_NAMES[idx] if idx < len(AXIS_NAMES) else f"J{idx}"
-                axis_map[axis] = [idx]
-            last_idx = joints[-1]
-            axis = AXIS_NAMES[last_idx] if last_idx < len(AXIS_NAMES) else f"J{last_idx}"
-            axis_map[axis] = [last_idx]
-
-        return axis_map
+        """Axis -> joints of the current axis table (1:1 until one is built)."""
+        if self.axis_table is None:
+            try:
+                return axis_table({idx: default_axis(idx) for idx in sorted(self.model.joints)})["axis_map"]
+            except ValueError:
+                return {}   # more joints than axis letters: no sections until they are mapped
+        return self.axis_table["axis_map"]
 
     def generate_ini_sections(self):
         """
         Generuje sekcje INI dla AXIS i JOINT dynamicznie.
         Uwzględnia tryb Gantry i standardowe przypisanie 1:1.
         """
-        out = []
-
-        # Retrieve axis -> joint list mapping
-        axis_map = self.apply_gantry_axis_fix()
-
-        # ===== GENERATE AXIS + JOINT SECTION =====
-        for axis, joint_list in axis_map.items():
-            # AXIS section
-            if self.sections["AXIS"]["enabled"].get():
-                out.append(f"[AXIS_{axis}]")
-                for k, v in self.sections["AXIS"]["fields"].items():
-                    value = v.get().strip()
-                    if value != "":
-                        out.append(f"{k} = {value}")
-                out.append("")
-
-            # JOINT sections associated with this AXIS
-            if self.sections["JOINT"]["enabled"].get():
-                for joint_idx in joint_list:
-                    out.append(f"[JOINT_{joint_idx}]")
-                    for k, v in self.sections["JOINT"]["fields"].items():
-                        value = v.get().strip()
-                        if value != "":
-                            out.append(f"{k} = {value}")
-                    out.append("")
-
-        return "\n".join(out)
+        return "\n".join(
+            text for header, text in self.render_ini_blocks()
+            if header.startswith(("AXIS_", "JOINT_"))
+        )
+
+    @staticmethod
+    def _joint_row(j: Joint):
+        servos_str = ", ".join(sorted(j.servos)) if j.servos else "NONE"
+        return {
+            "values": (f"servos={servos_str} type={j.axis_type} mode={j.motion_mode}",),
+            "tags": ("ok" if j.servos else "bad",),
+        }
 
+    @staticmethod
+    def _servo_row(s: ServoDrive):
+        joints_str = ", ".join(str(i) for i in sorted(s.joints)) if s.joints else "NONE"
+        return {
+            "values": (f"joints={joints_str} params={list(s.params.keys())}",),
+            "tags": ("ok" if s.joints else "bad",),
+        }
 
+    @timed("ini.show_model")
     def show_model(self):
         self.tree.delete(*self.tree.get_children())
+        self.tree_items = {}
+        self.validation_id = None
 
         if not self.model:
             return
 
         joints_id = self.tree.insert("", "end", text="JOINTS")
         for j in sorted(self.model.joints.values(), key=lambda x: x.index):
-            tag = "ok" if j.servos else "bad"
-            servos_str = ", ".join(sorted(j.servos)) if j.servos else "NONE"
-            self.tree.insert(
-                joints_id,
-                "end",
-                text=f"joint.{j.index}",
-                values=(f"servos={servos_str} type={j.axis_type} mode={j.motion_mode}",),
-                tags=(tag,)
+            self.tree_items[("joint", j.index)] = self.tree.insert(
+                joints_id, "end", text=f"joint.{j.index}", **self._joint_row(j)
             )
         self.tree.item(joints_id, open=False)
 
         servos_id = self.tree.insert("", "end", text="SERVOS")
         for s in sorted(self.model.servos.values(), key=lambda x: x.name):
-            tag = "ok" if s.joints else "bad"
-            joints_str = ", ".join(str(i) for i in sorted(s.joints)) if s.joints else "NONE"
-            self.tree.insert(
-                servos_id,
-                "end",
-                text=s.name,
-                values=(f"joints={joints_str} params={list(s.params.keys())}",),
-                tags=(tag,)
+            self.tree_items[("servo", s.name)] = self.tree.insert(
+                servos_id, "end", text=s.name, **self._servo_row(s)
             )
         self.tree.item(servos_id, open=False)
 
@@ -743,13 +508,16 @@ class App(tk.Tk):
 
         res = self.semantic_validator.validate(self.model)
 
-        validation_id = self.tree.insert("", "end", text="VALIDATION")
+        if self.validation_id and self.tree.exists(self.validation_id):
+            self.tree.delete(self.validation_id)
+        validation_id = self.validation_id = self.tree.insert("", "end", text="VALIDATION")
 
         def row(text, ok):
             tag = "ok" if ok else "bad"
             return self.tree.insert(validation_id, "end", text=text, tags=(tag,))
 
         row("Essential signals", res["essential"])
+        row("Expected signals", res["expected"])
         cohesion_id = row("Axis cohesion", res["cohesion"])
 
         if not res["cohesion"]:
@@ -761,17 +529,52 @@ class App(tk.Tk):
 
         self.tree.item(validation_id, open=True)
 
-    def update_ini(self):
+    def update_ini(self, section=None):
+        """Schedule an INI refresh; section limits re-reading to that section's fields."""
+        if section:
+            self.ini_dirty.add(section)
+        else:
+            self.ini_dirty.update(self.sections)
+        if not self.model:
+            return
+        if self.ini_after:
+            self.after_cancel(self.ini_after)
+        self.ini_after = self.after(INI_DEBOUNCE_MS, self._render_ini)
+
+    @timed("ini.update_ini")
+    def _render_ini(self):
+        """Patch only the INI sections whose text changed."""
+        self.ini_after = None
         if not self.model:
             return
 
-        current_view = self.ini_text.yview()
+        lap = laps("ini.update_ini")
+        old = self.ini_blocks
+        blocks = self.render_ini_blocks()
+        self.ini_blocks = blocks
+        lap("render")
 
-        ini = self.generate_ini()
+        current_view = self.ini_text.yview()
         self.ini_text.configure(state='normal')
-        self.ini_text.delete('1.0', tk.END)
-        self.ini_text.insert(tk.END, ini)
+        if [h for h, _ in old] != [h for h, _ in blocks]:
+            self.ini_text.delete('1.0', tk.END)
+            self.ini_text.insert(tk.END, "\n".join(text for _, text in blocks))
+        else:
+            starts = []
+            line = 1
+            for _, text in old:
+                starts.append(line)
+                line += text.count("\n") + 1
+            # bottom-up so the line numbers of the blocks above stay valid
+            for i in reversed(range(len(blocks))):
+                text, old_text = blocks[i][1], old[i][1]
+                if text != old_text:
+                    end = starts[i] + old_text.count("\n")
+                    self.ini_text.delete(f"{starts[i]}.0", f"{end}.0")
+                    self.ini_text.insert(f"{starts[i]}.0", text)
+                    count("ini.sections_patched")
         self.ini_text.configure(state='disabled')
+        lap("text_insert")
 
         self.ini_text.yview_moveto(current_view[0])
 
@@ -781,6 +584,7 @@ class App(tk.Tk):
             self.ini_scroll.state(["disabled"])
         else:
             self.ini_scroll.state(["!disabled"])
+        lap("layout")
 
     def save_ini(self):
         if not self.model:
@@ -796,113 +600,47 @@ class App(tk.Tk):
 
         ini_text = self.generate_ini()
 
-        with open(path, "w", encoding="utf-8") as f:
-            f.write(ini_text)
+        if self.merge_var.get() and os.path.exists(path):
+            with open(path, "r", encoding="utf-8", newline="") as f:
+                ini_text = merge_ini(normalize_text(f.read()), ini_text, self.owned_ini_keys())
 
-        messagebox.showinfo("Saved", f"INI saved to:\n{path}")
+        if write_atomic(path, normalize_text(ini_text)):
+            messagebox.showinfo("Saved", f"INI saved to:\n{path}")
+        else:
+            messagebox.showinfo("Unchanged", f"INI already up to date:\n{path}")
+
+        issues = check_project(path)
+        if issues:
+            messagebox.showwarning("Config check", "\n".join(str(i) for i in issues))
+
+    def section_values(self, name):
+        """(enabled, ((KEY, value), ...)) of a section, re-read from the widgets only when dirty."""
+        if name in self.ini_dirty or name not in self.ini_values:
+            sec = self.sections[name]
+            self.ini_values[name] = (
+                sec["enabled"].get(),
+                tuple((k, v.get()) for k, v in sec["fields"].items()),
+            )
+            self.ini_dirty.discard(name)
+        return self.ini_values[name]
+
+    def render_ini_blocks(self):
+        """[(header, text)] of every enabled INI section, each rendered once per distinct value set."""
+        values = {name: self.section_values(name) for name in self.sections}
+        return ini_blocks(values, self.apply_gantry_axis_fix())
+
+    def owned_ini_keys(self):
+        """Per INI section: keys derived from the HAL plus fields edited away from their defaults."""
+        owned = {}
+        for header, _ in self.render_ini_blocks():
+            name = header.split("_")[0] if header.startswith(("AXIS_", "JOINT_")) else header
+            defaults = self.ini_defaults[name]
+            _, fields = self.section_values(name)
+            owned[header] = {k for k, v in fields if v != defaults.get(k)} | GENERATED_KEYS.get(name, set())
+        return owned
 
     def generate_ini(self) -> str:
-        out = []
-
-        # 1) EMC (column 1)
-        if self.sections["EMC"]["enabled"].get():
-            out.append("[EMC]")
-            for k, v in self.sections["EMC"]["fields"].items():
-                if v.get().strip() != "":
-                    out.append(f"{k} = {v.get()}")
-            out.append("")
-
-        # 2) DISPLAY (column 1)
-        if self.sections["DISPLAY"]["enabled"].get():
-            out.append("[DISPLAY]")
-            for k, v in self.sections["DISPLAY"]["fields"].items():
-                if v.get().strip() != "":
-                    out.append(f"{k} = {v.get()}")
-            out.append("")
-
-        # 3) KINS (column 1)
-        if self.sections["KINS"]["enabled"].get():
-            out.append("[KINS]")
-            for k, v in self.sections["KINS"]["fields"].items():
-                if v.get().strip() != "":
-                    out.append(f"{k} = {v.get()}")
-            out.append("")
-
-        # 4) TASK (column 2)
-        if self.sections["TASK"]["enabled"].get():
-            out.append("[TASK]")
-            for k, v in self.sections["TASK"]["fields"].items():
-                if v.get().strip() != "":
-                    out.append(f"{k} = {v.get()}")
-            out.append("")
-
-        # 5) EMCMOT (column 2)
-        if self.sections["EMCMOT"]["enabled"].get():
-            out.append("[EMCMOT]")
-            for k, v in self.sections["EMCMOT"]["fields"].items():
-                if v.get().strip() != "":
-                    out.append(f"{k} = {v.get()}")
-            out.append("")
-
-        # 6) TRAJ (column 2)
-        if self.sections["TRAJ"]["enabled"].get():
-            out.append("[TRAJ]")
-            for k, v in self.sections["TRAJ"]["fields"].items():
-                if v.get().strip() != "":
-                    out.append(f"{k} = {v.get()}")
-            out.append("")
-
-        # 7) HAL (column 2)
-        if self.sections["HAL"]["enabled"].get():
-            out.append("[HAL]")
-            if self.sections['HAL']['fields']['HALFILE'].get().strip() != "":
-                out.append(f"HALFILE = {self.sections['HAL']['fields']['HALFILE'].get()}")
-            if self.sections['HAL']['fields']['HALUI'].get().strip() != "":
-                out.append(f"HALUI = {self.sections['HAL']['fields']['HALUI'].get()}")
-            out.append("")
-
-        # 8) EMCIO (column 2) - NEW
-        if self.sections["EMCIO"]["enabled"].get():
-            out.append("[EMCIO]")
-            for k, v in self.sections["EMCIO"]["fields"].items():
-                if v.get().strip() != "":
-                    out.append(f"{k} = {v.get()}")
-            out.append("")
-                   
-        if self.sections["RS274NGC"]["enabled"].get():
-            out.append("[RS274NGC]")
-            for k, v in self.sections["RS274NGC"]["fields"].items():
-                if v.get().strip() != "":
-                    out.append(f"{k} = {v.get()}")
-            out.append("")     
-
-
-
-        #        9) JOINT + AXIS (column 3) - dynamic with gantry support
-        axis_map = self.apply_gantry_axis_fix()
-
-        for axis, joint_list in axis_map.items():
-            #        sekcja AXIS
-            if self.sections["AXIS"]["enabled"].get():
-                out.append(f"[AXIS_{axis}]")
-                for k, v in self.sections["AXIS"]["fields"].items():
-                    value = v.get().strip()
-                    if value != "":
-                        out.append(f"{k} = {value}")
-                out.append("")
-
-            #        JOINT sections associated with this AXIS
-            if self.sections["JOINT"]["enabled"].get():
-                for joint_idx in joint_list:
-                    out.append(f"[JOINT_{joint_idx}]")
-                    for k, v in self.sections["JOINT"]["fields"].items():
-                        value = v.get().strip()
-                        if value != "":
-                            out.append(f"{k} = {value}")
-                    out.append("")
-
-
-        return "\n".join(out)
+        return "\n".join(text for _, text in self.render_ini_blocks())
 
 
 if __name__ == "__main__":
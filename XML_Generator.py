@@ -2,50 +2,14 @@ import tkinter as tk
 from tkinter import filedialog, messagebox
 import xml.etree.ElementTree as ET
 
-# =========================
-# Auxiliary
-# =========================
-def parse_int(val):
-    if not val:
-        return 0
-    v = val.strip().lower().replace("#", "")
-    if v.startswith("0x"):
-        return int(v, 16)
-    if v.startswith("x"):
-        return int("0x" + v[1:], 16)
-    return int(v)
-
-def hex8(v):
-    return f"{v:08X}"
-
-def dec(v):
-    return str(v)
+from drive_profiles import for_esi
+from lf_normalize import save_text
+from profiling import count, stage
+from xml_core import (
+    SDO_PROFILE, duplicate_slave, esi_to_xml, parse_int, prune_pdos, read_esi, reduce_pdos, rename_pins,
+    sdo_commands, set_sdo_config, xml_text,
+)
 
-# =========================
-# HAL MAPPINGS (CiA-402)
-# =========================
-CIA402_HAL = {
-    "6040": "control-word",
-    "6041": "status-word",
-    "6060": "modes-of-operation",
-    "6061": "modes-of-operation-display",
-    "607A": "target-position",
-    "6064": "actual-position",
-    "60FF": "target-velocity",
-    "606C": "actual-velocity",
-    "6071": "target-torque",
-    "6077": "actual-torque",
-}
-
-CUSTOM_HAL_PINS = {
-    "60B8": "probe-cmd",
-    "6060": "opmode",
-    "603F": "error-code",
-    "60B9": "probe-status",
-    "60BA": "probe1-rising",
-    "60FD": "mydigitalin",
-    "6061": "opmode-display",
-}
 
 # =========================
 # Main Class
@@ -81,9 +45,46 @@ class ESI2LinuxCNC:
         # NEW BUTTON: reduce PDO to CSP essentials
         tk.Button(self.left, text="Reduce pdo to csp essential", command=self.reduce_pdo_csp)\
             .pack(**btn_opts)
+        tk.Button(self.left, text="Reduce pdo to csv essential", command=lambda: self.reduce_pdo("CSV"))\
+            .pack(**btn_opts)
+        tk.Button(self.left, text="Reduce pdo to cst essential", command=lambda: self.reduce_pdo("CST"))\
+            .pack(**btn_opts)
+
+        # Velocity/torque offset PDOs kept by the reduce buttons
+        self.feedforward = tk.BooleanVar(value=False)
+        tk.Checkbutton(self.left, text="Feed-forward offsets (60B1/60B2)", variable=self.feedforward)\
+            .pack(fill="x", padx=6, pady=6)
+
+        # Touch probe PDOs (drive-latched probe position) kept by the reduce buttons
+        self.probe = tk.BooleanVar(value=False)
+        tk.Checkbutton(self.left, text="Touch probe (60B8/60B9/60BA)", variable=self.probe)\
+            .pack(fill="x", padx=6, pady=6)
 
         tk.Button(self.left, text="Duplicate slave", command=self.duplicate_slave)\
             .pack(**btn_opts)
+
+        # Drop the PDO entries a generated HAL file does not use
+        tk.Button(self.left, text="Prune pdo to HAL file", command=self.prune_to_hal)\
+            .pack(**btn_opts)
+
+        # Drive-side SDO init profile
+        sdo = tk.LabelFrame(self.left, text="SDO init (homing / timing)")
+        sdo.pack(fill="x", padx=6, pady=6)
+        sdo.columnconfigure(1, weight=1)
+        self.sdo_slave = tk.StringVar(value="all")
+        self.sdo_vars = {key: tk.StringVar(value="") for _, _, key in SDO_PROFILE}
+        self.sdo_period = tk.BooleanVar(value=True)
+
+        tk.Label(sdo, text="slave (idx / all)").grid(row=0, column=0, sticky="w")
+        tk.Entry(sdo, textvariable=self.sdo_slave, width=12).grid(row=0, column=1, sticky="we")
+        for row, (idx, sub, key) in enumerate(SDO_PROFILE, start=1):
+            tk.Label(sdo, text=f"{idx}:{sub} {key}").grid(row=row, column=0, sticky="w")
+            tk.Entry(sdo, textvariable=self.sdo_vars[key], width=12).grid(row=row, column=1, sticky="we")
+        tk.Checkbutton(sdo, text="60C2 = appTimePeriod", variable=self.sdo_period)\
+            .grid(row=len(SDO_PROFILE) + 1, column=0, columnspan=2, sticky="w")
+
+        tk.Button(self.left, text="Add SDO config", command=self.add_sdo_config)\
+            .pack(**btn_opts)
         tk.Button(self.left, text="Save XML", command=self.save_xml)\
             .pack(**btn_opts)
 
@@ -114,57 +115,13 @@ class ESI2LinuxCNC:
         if not path:
             return
 
-        root = ET.parse(path).getroot()
-        vendor = parse_int(root.findtext(".//Vendor/Id"))
-        t = root.find(".//Device/Type")
-        product = parse_int(t.attrib.get("ProductCode"))
-        revision = parse_int(t.attrib.get("RevisionNo"))
-        name = t.text.strip() if t.text else "EtherCAT-Slave"
-
-        def pdos(tag):
-            out = []
-            for p in root.findall(f".//{tag}"):
-                idx = p.findtext("Index", "0").replace("#x", "").replace("0x", "").upper()
-                entries = []
-                for e in p.findall("Entry"):
-                    entries.append({
-                        "idx": e.findtext("Index", "0").replace("#x", "").replace("0x", "").upper(),
-                        "sub": e.findtext("SubIndex", "0"),
-                        "bits": e.findtext("BitLen", "0"),
-                        "dtype": e.findtext("DataType", "").upper()
-                    })
-                out.append({"index": idx, "entries": entries})
-            return out
-
-        self.esi = {
-            "vendor": vendor,
-            "product": product,
-            "revision": revision,
-            "name": name,
-            "rx": pdos("RxPdo"),
-            "tx": pdos("TxPdo")
-        }
+        with stage("xml.parse_esi"):
+            tree = ET.parse(path)
+        self.esi = read_esi(tree.getroot())
 
         # Automatic conversion after loading
         self.convert()
-        messagebox.showinfo("OK", "ESI loaded and converted")
-
-    # =========================
-    # HAL for pdoEntry – only 6040, 6041 = u32, others = s32
-    # =========================
-    def _hal_for(self, idx, dtype):
-        idx = idx.upper()
-        halPin = CIA402_HAL.get(idx, f"obj-{idx.lower()}")
-        halType = "u32" if idx in ["6040", "6041"] else "s32"
-        return halPin, halType
-
-    # =========================
-    # Fixing tags
-    # =========================
-    def _fix_close_tags(self, xml_text):
-        xml_text = xml_text.replace(" />", "/>")
-        xml_text = xml_text.replace("</slave></master>", "</slave>\n </master>")
-        return xml_text
+        messagebox.showinfo("OK", f"ESI loaded and converted\nDrive profile: {for_esi(self.esi).name}")
 
     # =========================
     # Conversion
@@ -174,52 +131,14 @@ class ESI2LinuxCNC:
             messagebox.showerror("error", "first load ESI")
             return
 
-        s = self.esi
-        o = []
-        o.append("<masters>")
-        o.append(' <master idx="0" appTimePeriod="1000000" refClockSyncCycles="1">')
-        o.append('  <slave idx="0" type="EK1100"/>')
-
-        o.append(
-            '  <slave idx="1" type="generic" '
-            f'vid="{hex8(s["vendor"])}" '
-            f'pid="{hex8(s["product"])}" '
-            f'configPdos="true">'
-        )
+        xml = esi_to_xml(self.esi)
+        self.show_xml(xml)
 
-        o.append('   <dcConf assignActivate="300" sync0Cycle="*1" sync0Shift="0"/>')
-
-        o.append('   <syncManager idx="2" dir="out">')
-        for pdo in s["rx"]:
-            o.append(f'     <pdo idx="{pdo["index"]}">')
-            for e in pdo["entries"]:
-                halPin, halType = self._hal_for(e["idx"], e["dtype"])
-                o.append(
-                    f'       <pdoEntry idx="{e["idx"]}" subIdx="{int(e["sub"]):02}" '
-                    f'bitLen="{e["bits"]}" halPin="{halPin}" halType="{halType}"/>'
-                )
-            o.append("     </pdo>")
-        o.append("   </syncManager>")
-
-        o.append('   <syncManager idx="3" dir="in">')
-        for pdo in s["tx"]:
-            o.append(f'     <pdo idx="{pdo["index"]}">')
-            for e in pdo["entries"]:
-                halPin, halType = self._hal_for(e["idx"], e["dtype"])
-                o.append(
-                    f'       <pdoEntry idx="{e["idx"]}" subIdx="{int(e["sub"]):02}" '
-                    f'bitLen="{e["bits"]}" halPin="{halPin}" halType="{halType}"/>'
-                )
-            o.append("     </pdo>")
-        o.append("   </syncManager>")
-
-        o.append("  </slave>")
-        o.append(" </master>")
-        o.append("</masters>")
-
-        xml_text = self._fix_close_tags("\n".join(o))
-        self.text.delete("1.0", "end")
-        self.text.insert("1.0", xml_text)
+    def show_xml(self, xml):
+        with stage("xml.text_insert"):
+            self.text.delete("1.0", "end")
+            self.text.insert("1.0", xml)
+        count("xml.chars_inserted", len(xml))
 
     # =========================
     # Replace names (halPin only)
@@ -231,52 +150,71 @@ class ESI2LinuxCNC:
             return
 
         try:
-            root = ET.fromstring(txt)
+            with stage("xml.parse_text"):
+                root = ET.fromstring(txt)
         except ET.ParseError as e:
             messagebox.showerror("Błąd", f"Invalid XML: {e}")
             return
 
-        for p in root.findall(".//pdoEntry"):
-            idx = p.attrib.get("idx", "").replace("0x", "").upper()
-            if idx in CUSTOM_HAL_PINS:
-                p.set("halPin", CUSTOM_HAL_PINS[idx])
+        rename_pins(root, self.esi)
 
-        xml = self._fix_close_tags(ET.tostring(root, encoding="unicode"))
-        self.text.delete("1.0", "end")
-        self.text.insert("1.0", xml)
+        xml = xml_text(root)
+        self.show_xml(xml)
 
     # =========================
-    # Reduce PDO to CSP essentials
+    # Reduce PDO to mode essentials (CSP / CSV / CST)
     # =========================
     def reduce_pdo_csp(self):
+        self.reduce_pdo("CSP")
+
+    def reduce_pdo(self, mode):
         txt = self.text.get("1.0", "end").strip()
         if not txt:
             messagebox.showerror("error", "Generate XML first")
             return
         try:
-            root = ET.fromstring(txt)
+            with stage("xml.parse_text"):
+                root = ET.fromstring(txt)
         except ET.ParseError as e:
             messagebox.showerror("error", f"Invalid XML: {e}")
             return
 
-        keep_map = {
-            "1600": ["6040", "607A", "6060"],
-            "1A00": ["6041", "6064", "606C", "6061"]
-        }
-
-        for sm in root.findall(".//syncManager"):
-            for pdo in list(sm.findall("pdo")):
-                idx = pdo.attrib.get("idx", "").upper()
-                if idx not in keep_map:
-                    sm.remove(pdo)
-                else:
-                    for entry in list(pdo.findall("pdoEntry")):
-                        if entry.attrib.get("idx", "").upper() not in keep_map[idx]:
-                            pdo.remove(entry)
-
-        xml = self._fix_close_tags(ET.tostring(root, encoding="unicode"))
-        self.text.delete("1.0", "end")
-        self.text.insert("1.0", xml)
+        skipped = reduce_pdos(root, mode, self.esi, self.feedforward.get(), self.probe.get())
+
+        xml = xml_text(root)
+        self.show_xml(xml)
+
+        if skipped:
+            messagebox.showwarning("warning", f"Not PDO-mappable on this drive: {', '.join(sorted(skipped))}")
+
+    # =========================
+    # Prune PDOs to a HAL file
+    # =========================
+    def prune_to_hal(self):
+        txt = self.text.get("1.0", "end").strip()
+        if not txt:
+            messagebox.showerror("error", "Generate XML first")
+            return
+        try:
+            with stage("xml.parse_text"):
+                root = ET.fromstring(txt)
+        except ET.ParseError as e:
+            messagebox.showerror("error", f"Invalid XML: {e}")
+            return
+
+        path = filedialog.askopenfilename(filetypes=[("HAL files", "*.hal"), ("All files", "*.*")])
+        if not path:
+            return
+        with open(path, encoding="utf-8", errors="replace") as f:
+            removed = prune_pdos(root, f.read())
+        if not removed:
+            messagebox.showinfo("OK", "Every PDO entry is used by the HAL")
+            return
+
+        xml = xml_text(root)
+        self.show_xml(xml)
+        messagebox.showinfo("OK", f"Removed {len(removed)} PDO entries, "
+                                  f"{sum(bits for *_, bits in removed) / 8:g} bytes per cycle less")
 
     # =========================
     # Slave duplication
@@ -287,22 +225,52 @@ class ESI2LinuxCNC:
             messagebox.showerror("error", "Generate XML first")
             return
 
-        root = ET.fromstring(txt)
-        slaves = root.findall(".//slave")
-        max_idx = max(int(s.attrib.get("idx", "0")) for s in slaves)
-
-        slave1 = root.find(".//slave[@idx='1']")
-        if slave1 is None:
+        with stage("xml.parse_text"):
+            root = ET.fromstring(txt)
+        if duplicate_slave(root) is None:
             messagebox.showerror("Błąd", "Brak slave idx=1")
             return
 
-        new_slave = ET.fromstring(ET.tostring(slave1, encoding="unicode"))
-        new_slave.set("idx", str(max_idx + 1))
-        root.find(".//master").append(new_slave)
+        xml = xml_text(root)
+        self.show_xml(xml)
+
+    # =========================
+    # SDO init commands
+    # =========================
+    def add_sdo_config(self):
+        txt = self.text.get("1.0", "end").strip()
+        if not txt:
+            messagebox.showerror("error", "Generate XML first")
+            return
+        try:
+            with stage("xml.parse_text"):
+                root = ET.fromstring(txt)
+        except ET.ParseError as e:
+            messagebox.showerror("error", f"Invalid XML: {e}")
+            return
+
+        master = root.find(".//master")
+        period = parse_int(master.attrib.get("appTimePeriod")) if self.sdo_period.get() else None
+        profile = {key: var.get() for key, var in self.sdo_vars.items()}
+        try:
+            cmds = sdo_commands(profile, period, (self.esi or {}).get("objects"))
+        except ValueError as e:
+            messagebox.showerror("error", str(e))
+            return
+
+        target = self.sdo_slave.get().strip().lower()
+        slaves = [s for s in root.findall(".//slave") if s.find("syncManager") is not None]
+        if target not in ("", "all"):
+            slaves = [s for s in slaves if s.attrib.get("idx") == target]
+        if not slaves:
+            messagebox.showerror("error", f"No slave with PDOs matches '{target}'")
+            return
+
+        for slave in slaves:
+            set_sdo_config(slave, cmds)
 
-        xml = self._fix_close_tags(ET.tostring(root, encoding="unicode"))
-        self.text.delete("1.0", "end")
-        self.text.insert("1.0", xml)
+        xml = xml_text(root)
+        self.show_xml(xml)
 
     # =========================
     # Save
@@ -320,8 +288,7 @@ class ESI2LinuxCNC:
         if not path:
             return
 
-        with open(path, "w", encoding="utf-8") as f:
-            f.write(txt)
+        save_text(path, txt)
         messagebox.showinfo("OK", "File saved")
 
 # =========================
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Golden-output regression + throughput for lichuan-example-configurations
+- Every example directory with a machine.json (stored profile) is regenerated from the ESI
+  by pipeline.run() into a temp directory
+- ethercat-conf.xml / hal.hal / ini.ini are diffed byte for byte against the checked-in files
+- Each regeneration is timed, cache off: the first run (ESI parsed) and the best of --rounds
+  (ESI already in memory, as in a fleet build); exits 1 on any difference
+
+Usage:
+  python benchmarks/bench_golden.py [CONFIG_DIR ...] [--rounds 5] [--json out.json]
+"""
+
+import argparse
+import difflib
+import json
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+from pipeline import STAGES, DEFAULT_OUTPUT, run
+from hal_gen import profile_path
+
+EXAMPLES = os.path.join(ROOT, "lichuan-example-configurations")
+ROUNDS = 5
+
+
+def find_configs(paths):
+    """Example directories that have a machine.json."""
+    if not paths:
+        paths = [os.path.join(EXAMPLES, name) for name in sorted(os.listdir(EXAMPLES))]
+    return [p for p in paths if os.path.isfile(os.path.join(p, "machine.json"))]
+
+
+def regenerate(config_dir, tmp):
+    """{stage: (golden path, generated path)} after one pipeline run of config_dir/machine.json into tmp."""
+    machine_file = os.path.join(config_dir, "machine.json")
+    with open(machine_file, encoding="utf-8") as f:
+        machine = json.load(f)
+    for key in ("esi", "comp"):
+        if isinstance(machine.get(key), str):
+            machine[key] = profile_path(machine_file, machine[key])
+
+    outputs = machine.get("output", {})
+    files = {stage: (profile_path(machine_file, outputs.get(stage, DEFAULT_OUTPUT[stage])),
+                     os.path.join(tmp, os.path.basename(outputs.get(stage, DEFAULT_OUTPUT[stage]))))
+             for stage in STAGES}
+    # generated files go to tmp under the golden names (the INI's HALFILE depends on them)
+    machine["output"] = {stage: generated for stage, (_, generated) in files.items()}
+    for _, generated in files.values():
+        if os.path.exists(generated):
+            os.remove(generated)   # no merge with the previous round's INI
+    run(os.path.join(tmp, "machine.json"), force=True, machine=machine, cache=None)
+    return files
+
+
+def diff(golden, generated):
+    with open(golden, encoding="utf-8", newline="") as f:
+        a = f.read()
+    with open(generated, encoding="utf-8", newline="") as f:
+        b = f.read()
+    if a == b:
+        return []
+    return list(difflib.unified_diff(a.splitlines(True), b.splitlines(True),
+                                     os.path.basename(golden), "generated", n=2))
+
+
+def check(config_dir, rounds):
+    """(differences {file: diff lines}, first ms, best ms) for one example."""
+    name = os.path.basename(os.path.normpath(config_dir))
+    times = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for _ in range(rounds):
+            t = time.perf_counter()
+            files = regenerate(config_dir, tmp)
+            times.append(time.perf_counter() - t)
+        differences = {}
+        for golden, generated in files.values():
+            if not os.path.exists(golden):
+                differences[f"{name}/{os.path.basename(golden)}"] = ["golden file missing\n"]
+            elif lines := diff(golden, generated):
+                differences[f"{name}/{os.path.basename(golden)}"] = lines
+    return differences, times[0] * 1000, min(times) * 1000
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Regenerate the example configs and diff them against the golden files")
+    ap.add_argument("configs", nargs="*", help="example directories (default: all with a machine.json)")
+    ap.add_argument("--rounds", type=int, default=ROUNDS, help="regenerations per config (best time is reported)")
+    ap.add_argument("--json", help="write the timings to this file")
+    args = ap.parse_args(argv)
+
+    configs = find_configs(args.configs)
+    if not configs:
+        print(f"no machine.json in {', '.join(args.configs) or EXAMPLES}", file=sys.stderr)
+        return 1
+
+    failed, results = 0, {}
+    for config_dir in configs:
+        name = os.path.basename(os.path.normpath(config_dir))
+        differences, first, best = check(config_dir, max(args.rounds, 1))
+        results[name] = {"first_ms": first, "best_ms": best}
+        print(f"{'❌' if differences else '✅'} {name:12} first {first:8.1f} ms   best {best:8.1f} ms"
+              f"  ({1000 / best:.0f} configs/s)")
+        for file, lines in differences.items():
+            failed += 1
+            print(f"   {file} differs:")
+            sys.stdout.writelines("   " + line for line in lines)
+            if lines and not lines[-1].endswith("\n"):
+                print()
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"time": time.strftime("%Y-%m-%dT%H:%M:%S"), "results": results}, f, indent=1)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Benchmark: HalParser.parse on a 10,000-line, 64-joint HAL file
+- Synthetic hal.hal in the layout HAL_Generator writes (cia402 + lcec nets)
+- Comments, arrows in both directions and backslash continuations
+- Exits 1 when a parse takes longer than the budget (default 100 ms)
+
+Usage:
+  python benchmarks/bench_hal_parser.py [--budget MS]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from ini_core import HalAnalyzer, HalParser
+from synthetic import synthetic_hal
+
+JOINTS = 64
+LINES = 10000
+ROUNDS = 20
+BUDGET_MS = 100
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--budget", type=float, default=BUDGET_MS, help="ms per parse; exit 1 above it")
+    args = ap.parse_args(argv)
+
+    text = synthetic_hal(JOINTS, LINES)
+    parser = HalParser()
+
+    model = parser.parse(text)
+    HalAnalyzer().analyze(model)
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        parser.parse(text)
+    elapsed = (time.perf_counter() - start) / ROUNDS
+
+    ms = elapsed * 1000
+    ok = ms <= args.budget
+    print(f"{'✅' if ok else '❌'} HalParser.parse: {len(text.splitlines())} lines, {len(model.joints)} joints, "
+          f"{len(model.nets)} nets, {ms:.2f} ms/run (budget {args.budget:g} ms)")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
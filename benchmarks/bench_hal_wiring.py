@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Benchmark: HalGenerator.generate_hal on a 64-axis bus
+- Synthetic ethercat-conf.xml with 64 CSP slaves
+- Joint <-> CiA-402 nets rendered from the compiled wiring table
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from hal_core import AXIS_ORDER, JOINT_SUGGESTIONS, HalGenerator
+
+AXES = 64
+ROUNDS = 50
+
+SLAVE = """  <slave idx="{idx}" type="generic" vid="00000766" pid="00000402" configPdos="true">
+   <syncManager idx="2" dir="out">
+     <pdo idx="1600">
+       <pdoEntry idx="6040" subIdx="00" bitLen="16" halPin="control-word" halType="u32"/>
+       <pdoEntry idx="607A" subIdx="00" bitLen="32" halPin="target-position" halType="s32"/>
+       <pdoEntry idx="6060" subIdx="00" bitLen="8" halPin="opmode" halType="s32"/>
+     </pdo>
+   </syncManager>
+   <syncManager idx="3" dir="in">
+     <pdo idx="1A00">
+       <pdoEntry idx="6041" subIdx="00" bitLen="16" halPin="status-word" halType="u32"/>
+       <pdoEntry idx="6064" subIdx="00" bitLen="32" halPin="actual-position" halType="s32"/>
+       <pdoEntry idx="6061" subIdx="00" bitLen="8" halPin="opmode-display" halType="s32"/>
+     </pdo>
+   </syncManager>
+  </slave>"""
+
+PDO_PINS = {
+    0x6040: "controlword",
+    0x607A: "drv_target_position",
+    0x6060: "opmode",
+    0x6041: "statusword",
+    0x6064: "drv_actual_position",
+    0x6061: "opmode_display",
+}
+
+
+def write_bus(path, count):
+    slaves = "\n".join(SLAVE.format(idx=i) for i in range(1, count + 1))
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('<masters>\n <master idx="0" appTimePeriod="1000000" refClockSyncCycles="1">\n')
+        f.write(slaves)
+        f.write("\n </master>\n</masters>\n")
+
+
+def main():
+    axes = (AXIS_ORDER + [f"J{i}" for i in range(len(AXIS_ORDER), AXES)])[:AXES]
+    axis_map = {i: {"axis": axis, "slave": i + 1} for i, axis in enumerate(axes)}
+
+    enabled = {}
+    pdo_pins = {}
+    for slave in range(1, AXES + 1):
+        for obj, pin in PDO_PINS.items():
+            enabled[(slave, obj)] = True
+            pdo_pins[(slave, obj)] = pin
+
+    with tempfile.TemporaryDirectory() as tmp:
+        xml_path = os.path.join(tmp, "ethercat-conf.xml")
+        write_bus(xml_path, AXES)
+
+        gen = HalGenerator(
+            xml_path,
+            enabled,
+            {},
+            axis_map,
+            pdo_pins,
+            dict(JOINT_SUGGESTIONS),
+            {"pos_scale": "1677721.6", "csp_mode": "1"},
+            enabled_joint={pin: True for pin in JOINT_SUGGESTIONS},
+        )
+
+        hal = gen.generate_hal()
+        start = time.perf_counter()
+        for _ in range(ROUNDS):
+            gen.generate_hal()
+        elapsed = (time.perf_counter() - start) / ROUNDS
+
+    print(f"generate_hal: {AXES} axes, {len(hal.splitlines())} lines, {elapsed * 1000:.3f} ms/run")
+
+
+if __name__ == "__main__":
+    main()
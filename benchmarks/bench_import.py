@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Benchmark: import time of the core modules and the GUI layers
+- Each module is imported in a fresh interpreter without DISPLAY (headless box), best of --rounds
+- Reports the time of the import statement itself (interpreter startup excluded), the number of
+  modules it loaded and whether tkinter came with it
+- Exits 1 if a core module imports tkinter or takes longer than --budget-ms
+
+Usage:
+  python benchmarks/bench_import.py [--rounds 7] [--budget-ms 50] [--json out.json]
+"""
+
+import argparse
+import compileall
+import json
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+CORE = ["profiling", "drive_profiles", "xml_core", "hal_core", "ini_core", "config_check", "hal_gen", "pipeline", "lf_normalize"]
+GUI = ["XML_Generator", "HAL_Generator", "INI_Generator"]
+ROUNDS = 7
+
+PROBE = """
+import sys, time
+sys.path.insert(0, {root!r})
+before = len(sys.modules)
+t = time.perf_counter()
+import {module}
+print(time.perf_counter() - t, len(sys.modules) - before, "tkinter" in sys.modules)
+"""
+
+
+def import_time(module, rounds):
+    """(best ms, modules loaded, tkinter imported) of `import module` in fresh interpreters."""
+    env = {k: v for k, v in os.environ.items() if k not in ("DISPLAY", "WAYLAND_DISPLAY")}
+    best = float("inf")
+    for _ in range(rounds):
+        out = subprocess.run([sys.executable, "-c", PROBE.format(root=ROOT, module=module)], env=env,
+                             capture_output=True, text=True, check=True).stdout.split()
+        best = min(best, float(out[0]))
+    return best * 1000, int(out[1]), out[2] == "True"
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Import time of the core modules and GUI layers")
+    ap.add_argument("--rounds", type=int, default=ROUNDS, help="fresh interpreters per module (best is reported)")
+    ap.add_argument("--budget-ms", type=float, help="fail if a core module takes longer to import")
+    ap.add_argument("--json", help="write the results to this file")
+    args = ap.parse_args(argv)
+
+    # time loading bytecode, not compiling it (PYTHONDONTWRITEBYTECODE would recompile every round)
+    for module in CORE + GUI:
+        compileall.compile_file(os.path.join(ROOT, module + ".py"), quiet=1)
+
+    failed, results = 0, {}
+    for module in CORE + GUI:
+        try:
+            ms, loaded, tk = import_time(module, max(args.rounds, 1))
+        except subprocess.CalledProcessError as e:
+            print(f"❌ {module:14} import failed: {e.stderr.strip().splitlines()[-1] if e.stderr else e}")
+            failed += 1
+            continue
+        results[module] = {"ms": ms, "modules": loaded, "tkinter": tk}
+        problem = ""
+        if module in CORE and tk:
+            problem = "imports tkinter"
+        elif module in CORE and args.budget_ms is not None and ms > args.budget_ms:
+            problem = f"over budget ({args.budget_ms:g} ms)"
+        failed += bool(problem)
+        kind = "core" if module in CORE else "gui "
+        print(f"{'❌' if problem else '✅'} {kind} {module:14} {ms:8.1f} ms  {loaded:4} modules"
+              f"{'  tkinter' if tk else ''}  {problem}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"python": sys.version.split()[0], "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                       "results": results}, f, indent=1)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Benchmark: every stage of ESI → XML → HAL → INI at 1..256 drives
+- Synthetic ESI (see synthetic.py), buses and HAL files of each size
+- Best-of timing per stage, results written as JSON
+- --baseline compares with an earlier JSON and exits 1 on regressions
+
+Usage:
+  python benchmarks/bench_stages.py [--sizes 1 8 64 256] [--json out.json] [--baseline old.json]
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import xml.etree.ElementTree as ET
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from hal_core import AXIS_ORDER, JOINT_SUGGESTIONS, HalGenerator
+from ini_core import (
+    AXIS_NAMES, INI_SECTIONS, HalAnalyzer, HalParser, HalValidator, SemanticValidator, axis_table, default_axis,
+    ini_blocks, render_section,
+)
+from xml_core import duplicate_slave, esi_to_xml, read_esi, reduce_pdos, rename_pins, xml_text
+from synthetic import synthetic_bus, synthetic_esi, synthetic_hal
+
+SIZES = [1, 8, 64, 256]
+MIN_TIME = 0.2          # seconds spent per stage, at least MIN_ROUNDS rounds
+MIN_ROUNDS = 3
+TOLERANCE = 0.25        # --baseline: slower by more than this fraction ...
+NOISE_MS = 0.05         # ... and by more than this is a regression
+
+PDO_PINS = {
+    0x6040: "controlword",
+    0x607A: "drv_target_position",
+    0x6060: "opmode",
+    0x6041: "statusword",
+    0x6064: "drv_actual_position",
+    0x606C: "drv_actual_velocity",
+    0x6061: "opmode_display",
+}
+
+
+def measure(fn, setup=lambda: None):
+    """Best time of fn(setup()) in ms; setup is not timed."""
+    best = float("inf")
+    rounds = 0
+    start = time.perf_counter()
+    while rounds < MIN_ROUNDS or time.perf_counter() - start < MIN_TIME:
+        arg = setup()
+        t = time.perf_counter()
+        fn(arg)
+        best = min(best, time.perf_counter() - t)
+        rounds += 1
+    return best * 1000
+
+
+def hal_generator(xml_path, drives):
+    axes = (AXIS_ORDER + [f"J{i}" for i in range(len(AXIS_ORDER), drives)])[:drives]
+    axis_map = {i: {"axis": axis, "slave": i + 1} for i, axis in enumerate(axes)}
+    enabled = {(slave, obj): True for slave in range(1, drives + 1) for obj in PDO_PINS}
+    pdo_pins = {(slave, obj): pin for slave in range(1, drives + 1) for obj, pin in PDO_PINS.items()}
+    return HalGenerator(
+        xml_path, enabled, {}, axis_map, pdo_pins, dict(JOINT_SUGGESTIONS),
+        {"pos_scale": "1677721.6", "csp_mode": "1"},
+        enabled_joint={pin: True for pin in JOINT_SUGGESTIONS},
+    )
+
+
+def generate_ini(drives):
+    values = {name: (sec["enabled"], tuple(sec["fields"].items())) for name, sec in INI_SECTIONS.items()}
+    # trivkins has 9 axis letters: larger buses share them (several joints per axis)
+    table = axis_table({idx: default_axis(idx % len(AXIS_NAMES)) for idx in range(drives)})
+    render_section.cache_clear()   # measure rendering, not the memoized result
+    return "\n".join(text for _, text in ini_blocks(values, table["axis_map"]))
+
+
+def run(sizes, esi_args):
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        esi_path = os.path.join(tmp, "esi.xml")
+        with open(esi_path, "w", encoding="utf-8") as f:
+            f.write(synthetic_esi(**esi_args))
+
+        # ESI stages do not depend on the bus size
+        esi = read_esi(ET.parse(esi_path).getroot())
+        results["load_esi"] = measure(lambda _: read_esi(ET.parse(esi_path).getroot()))
+        results["convert"] = measure(lambda _: esi_to_xml(esi))
+        converted = esi_to_xml(esi)
+
+        def reduce_csp(root):
+            rename_pins(root)
+            reduce_pdos(root, "CSP", esi)
+
+        results["reduce_pdo_csp"] = measure(reduce_csp, lambda: ET.fromstring(converted))
+        root = ET.fromstring(converted)
+        reduce_csp(root)
+        reduced = xml_text(root)
+
+        for n in sizes:
+            def duplicate(root):
+                for _ in range(n - 1):
+                    duplicate_slave(root)
+
+            results[f"duplicate_slave/{n}"] = measure(duplicate, lambda: ET.fromstring(reduced))
+
+            bus_path = os.path.join(tmp, f"bus{n}.xml")
+            with open(bus_path, "w", encoding="utf-8") as f:
+                f.write(synthetic_bus(n))
+            gen = hal_generator(bus_path, n)
+
+            def parse_xml(_):
+                gen.slaves = {}
+                gen.parse_xml()
+
+            results[f"parse_xml/{n}"] = measure(parse_xml)
+            results[f"generate_hal/{n}"] = measure(lambda _: gen.generate_hal())
+
+            hal = synthetic_hal(n)
+            parser = HalParser()
+            results[f"HalParser.parse/{n}"] = measure(lambda _: parser.parse(hal))
+            model = parser.parse(hal)
+            HalAnalyzer().analyze(model)
+            results[f"HalValidator/{n}"] = measure(lambda _: HalValidator().validate(model))
+            results[f"SemanticValidator/{n}"] = measure(lambda _: SemanticValidator().validate(model))
+            results[f"generate_ini/{n}"] = measure(lambda _: generate_ini(n))
+    return results
+
+
+def regressions(results, baseline, tolerance):
+    """[(stage, baseline ms, ms)] of the stages slower than the baseline."""
+    out = []
+    for stage, ms in results.items():
+        old = baseline.get(stage)
+        if old is not None and ms > old * (1 + tolerance) and ms - old > NOISE_MS:
+            out.append((stage, old, ms))
+    return out
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Time every generator stage on synthetic inputs")
+    ap.add_argument("--sizes", type=int, nargs="+", default=SIZES, help="drive counts")
+    ap.add_argument("--devices", type=int, default=1, help="devices in the ESI")
+    ap.add_argument("--pdos", type=int, default=4, help="Rx and Tx PDOs per device")
+    ap.add_argument("--entries", type=int, default=8, help="entries per PDO")
+    ap.add_argument("--objects", type=int, default=256, help="object dictionary size")
+    ap.add_argument("--image-kb", type=int, default=16, help="image blob per device")
+    ap.add_argument("--json", help="write the results to this file")
+    ap.add_argument("--baseline", help="earlier --json file; exit 1 if a stage got slower")
+    ap.add_argument("--tolerance", type=float, default=TOLERANCE, help="allowed slowdown (fraction)")
+    args = ap.parse_args(argv)
+
+    esi_args = {"devices": args.devices, "rx_pdos": args.pdos, "tx_pdos": args.pdos,
+                "entries": args.entries, "objects": args.objects, "image_kb": args.image_kb}
+    results = run(args.sizes, esi_args)
+    for stage, ms in results.items():
+        print(f"{stage:28} {ms:9.3f} ms")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "esi": esi_args,
+                "results": results,
+            }, f, indent=1)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        slower = regressions(results, baseline, args.tolerance)
+        for stage, old, ms in slower:
+            print(f"❌ {stage}: {old:.3f} → {ms:.3f} ms (+{(ms / old - 1) * 100:.0f}%)")
+        return 1 if slower else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
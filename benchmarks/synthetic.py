@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Synthetic inputs for the benchmarks
+- ESI files of configurable size (devices, PDOs, entries, object dictionary, image blobs)
+- ethercat-conf.xml buses with 1..256 CSP slaves
+- hal.hal files wired to those buses (cia402 + lcec nets, optional filler lines)
+"""
+
+# CiA-402 objects every synthetic drive has: (index, bits, dtype, PDO mapping)
+CIA402_OBJECTS = [
+    ("6040", 16, "UINT", "R"), ("607A", 32, "DINT", "R"), ("60FF", 32, "DINT", "R"),
+    ("6071", 16, "INT", "R"), ("6060", 8, "SINT", "R"), ("60B1", 32, "DINT", "R"),
+    ("60B2", 16, "INT", "R"), ("60B8", 16, "UINT", "R"),
+    ("6041", 16, "UINT", "T"), ("6064", 32, "DINT", "T"), ("606C", 32, "DINT", "T"),
+    ("6077", 16, "INT", "T"), ("6061", 8, "SINT", "T"), ("603F", 16, "UINT", "T"),
+    ("60B9", 16, "UINT", "T"), ("60BA", 32, "DINT", "T"),
+]
+
+
+# =========================
+# ESI
+# =========================
+def _image(image_kb):
+    # BMP-like hex blob, 2 characters per byte as in real ESI files
+    return f"<ImageData16x14>{'424D' + 'F0' * (image_kb * 1024 - 2)}</ImageData16x14>" if image_kb else ""
+
+def _entry(idx, bits, dtype):
+    return (f"<Entry><Index>#x{idx}</Index><SubIndex>0</SubIndex><BitLen>{bits}</BitLen>"
+            f"<Name>obj {idx}</Name><DataType>{dtype}</DataType></Entry>")
+
+def _object(idx, bits, dtype, mapping):
+    return (f"<Object><Index>#x{idx}</Index><Name>obj {idx}</Name><Type>{dtype}</Type><BitSize>{bits}</BitSize>"
+            f"<Info><MinValue>0</MinValue><MaxValue>#x7FFF</MaxValue></Info>"
+            f"<Flags><Access>rw</Access><PdoMapping>{mapping}</PdoMapping></Flags></Object>")
+
+def synthetic_esi(devices=1, rx_pdos=4, tx_pdos=4, entries=8, objects=256, image_kb=0):
+    """
+    ESI text: devices x (rx_pdos + tx_pdos) PDOs of `entries` entries each, `objects` dictionary
+    objects and an image blob of image_kb per device. 1600 / 1A00 map the CiA-402 objects.
+    """
+    rx_std = [o for o in CIA402_OBJECTS if o[3] == "R"]
+    tx_std = [o for o in CIA402_OBJECTS if o[3] == "T"]
+    extra = [(f"{0x2000 + i:04X}", 32, "DINT", "RT") for i in range(max(objects - len(CIA402_OBJECTS), 0))]
+
+    def pdos(tag, base, count, std):
+        out = []
+        for n in range(count):
+            objs = std if n == 0 else extra[n * entries:(n + 1) * entries] or std
+            body = "".join(_entry(idx, bits, dtype) for idx, bits, dtype, _ in objs[:entries])
+            out.append(f"<{tag} Fixed=\"0\" Sm=\"{2 if tag == 'RxPdo' else 3}\"><Index>#x{base + n:04X}</Index>"
+                       f"<Name>{tag} {n}</Name>{body}</{tag}>")
+        return "".join(out)
+
+    dictionary = "".join(_object(*o) for o in CIA402_OBJECTS + extra)
+    out = [
+        '<?xml version="1.0" encoding="utf-8"?>',
+        '<EtherCATInfo Version="1.6">',
+        f"<Vendor><Id>#x00000766</Id><Name>Synthetic</Name>{_image(image_kb)}</Vendor>",
+        "<Descriptions><Groups><Group><Type>Drive</Type><Name>Drive</Name></Group></Groups><Devices>",
+    ]
+    for d in range(devices):
+        out.append(
+            f'<Device Physics="YY"><Type ProductCode="#x{0x400 + d:08X}" RevisionNo="#x00000001">SYN-{d}</Type>'
+            f"<Name>Synthetic drive {d}</Name><GroupType>Drive</GroupType>"
+            f"<Profile><ProfileNo>402</ProfileNo><Dictionary><DataTypes/><Objects>{dictionary}</Objects>"
+            f"</Dictionary></Profile>"
+            f"{pdos('RxPdo', 0x1600, rx_pdos, rx_std)}{pdos('TxPdo', 0x1A00, tx_pdos, tx_std)}"
+            f"{_image(image_kb)}</Device>"
+        )
+    out.append("</Devices></Descriptions></EtherCATInfo>")
+    return "\n".join(out)
+
+
+# =========================
+# Bus (ethercat-conf.xml)
+# =========================
+SLAVE = """  <slave idx="{idx}" type="generic" vid="00000766" pid="00000402" configPdos="true">
+   <dcConf assignActivate="300" sync0Cycle="*1" sync0Shift="0"/>
+   <syncManager idx="2" dir="out">
+     <pdo idx="1600">
+       <pdoEntry idx="6040" subIdx="00" bitLen="16" halPin="control-word" halType="u32"/>
+       <pdoEntry idx="607A" subIdx="00" bitLen="32" halPin="target-position" halType="s32"/>
+       <pdoEntry idx="6060" subIdx="00" bitLen="8" halPin="opmode" halType="s32"/>
+     </pdo>
+   </syncManager>
+   <syncManager idx="3" dir="in">
+     <pdo idx="1A00">
+       <pdoEntry idx="6041" subIdx="00" bitLen="16" halPin="status-word" halType="u32"/>
+       <pdoEntry idx="6064" subIdx="00" bitLen="32" halPin="actual-position" halType="s32"/>
+       <pdoEntry idx="606C" subIdx="00" bitLen="32" halPin="actual-velocity" halType="s32"/>
+       <pdoEntry idx="6061" subIdx="00" bitLen="8" halPin="opmode-display" halType="s32"/>
+     </pdo>
+   </syncManager>
+  </slave>"""
+
+def synthetic_bus(slaves):
+    """ethercat-conf.xml text: EK1100 + `slaves` CSP drives (idx 1..slaves)."""
+    return "\n".join([
+        "<masters>",
+        ' <master idx="0" appTimePeriod="1000000" refClockSyncCycles="1">',
+        '  <slave idx="0" type="EK1100"/>',
+        *(SLAVE.format(idx=i) for i in range(1, slaves + 1)),
+        " </master>",
+        "</masters>",
+    ])
+
+
+# =========================
+# HAL
+# =========================
+AXIS = """# ---------- joint {j} ----------
+setp cia402.{j}.csp-mode 1
+setp cia402.{j}.pos-scale 1677721.6
+net {a}-pos-cmd joint.{j}.motor-pos-cmd => cia402.{j}.pos-cmd
+net {a}-pos-fb joint.{j}.motor-pos-fb <= cia402.{j}.pos-fb
+net {a}-enable joint.{j}.amp-enable-out => cia402.{j}.enable
+net {a}-amp-fault joint.{j}.amp-fault-in <= cia402.{j}.drv-fault
+net {a}-home-request joint.{j}.request-custom-homing => cia402.{j}.home
+net {a}-controlword cia402.{j}.controlword => lcec.0.{s}.control-word
+net {a}-statusword lcec.0.{s}.status-word => cia402.{j}.statusword
+net {a}-drv-target-position cia402.{j}.drv-target-position \\
+    => lcec.0.{s}.target-position
+net {a}-drv-actual-position lcec.0.{s}.actual-position => cia402.{j}.drv-actual-position  # feedback
+"""
+
+FILLER = "setp pid.{j}.Pgain{k} 0.{k}\nnet {a}-aux{k} lcec.0.{s}.din-{k} => motion.digital-in-{k:02d}\n"
+
+def synthetic_hal(joints=64, lines=0):
+    """hal.hal text for `joints` drives on lcec.0.1..joints, padded with filler up to `lines` lines."""
+    out = [f"loadrt cia402 count={joints}", "loadrt [KINS]KINEMATICS", "addf lcec.read-all servo-thread"]
+    for j in range(joints):
+        out.append(f"addf cia402.{j}.read-all servo-thread")
+    blocks = [AXIS.format(j=j, a=f"j{j}", s=j + 1) for j in range(joints)]
+    out.extend(blocks)
+    k = 0
+    while sum(b.count("\n") for b in out) + len(out) < lines:
+        j = k % joints
+        out.append(FILLER.format(j=j, a=f"j{j}", s=j + 1, k=k // joints))
+        k += 1
+    return "\n".join(out)
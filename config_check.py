@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+"""
+Cross-file consistency check: ethercat-conf.xml <-> HAL <-> INI
+- appTimePeriod / sync0Cycle vs [EMCMOT]SERVO_PERIOD and servo_period_nsec
+- cia402 count= / num_joints= / [KINS]JOINTS / joint.N / [JOINT_N]
+- lcec.M.S.* pins vs the masters, slaves and PDO halPins in the XML
+- each joint's motion mode (CSP/CSV/CST) vs the command PDO its drive receives
+- [HAL]HALFILE and loadusr lcec_conf file names
+
+Usage:
+  python config_check.py CONFIG.ini [CONFIG.ini ...]      (HAL files from [HAL]HALFILE,
+  python config_check.py CONFIG_DIR [CONFIG_DIR ...]       XML from loadusr lcec_conf)
+"""
+
+import argparse
+import os
+import re
+import sys
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+import profiling
+from ini_core import HalAnalyzer, HalModel, HalParser, parse_ini, pin_owner
+
+
+# =====================
+# Data model
+# =====================
+
+@dataclass
+class Issue:
+    level: str       # "error" / "warning"
+    file: str
+    message: str
+
+    def __str__(self):
+        return f"{self.level.upper():7} {os.path.basename(self.file)}: {self.message}"
+
+@dataclass
+class EcMaster:
+    idx: int
+    app_time_period: int | None
+    slaves: Dict[str, dict] = field(default_factory=dict)   # slave name/idx -> {"idx", "pins", "objs", "sync0"}
+
+@dataclass
+class ConfigProject:
+    ini_path: str = ""
+    hal_paths: List[str] = field(default_factory=list)
+    xml_path: str = ""
+    ini: Dict[str, Dict[str, List[str]]] = field(default_factory=dict)   # section -> KEY -> values
+    hal: HalModel | None = None
+    masters: Dict[int, EcMaster] = field(default_factory=dict)
+    issues: List[Issue] = field(default_factory=list)
+
+    def ini_value(self, section, key, default=None):
+        values = self.ini.get(section, {}).get(key)
+        return values[0] if values else default
+
+    def error(self, path, message):
+        self.issues.append(Issue("error", path, message))
+
+    def warning(self, path, message):
+        self.issues.append(Issue("warning", path, message))
+
+
+# lcec pins every slave has, besides its PDO halPins
+LCEC_SLAVE_PINS = {
+    "slave-online", "slave-oper", "slave-state-init", "slave-state-preop",
+    "slave-state-safeop", "slave-state-op",
+}
+
+RE_INI_REF = re.compile(r"\[(\w+)\](\w+)")
+
+# Command object a drive must receive per motion mode (target position / velocity / torque)
+MODE_COMMANDS = {"CSP": "607A", "CSV": "60FF", "CST": "6071"}
+
+
+# =====================
+# Loading
+# =====================
+
+def load_ini(path):
+    ini = {}
+    with open(path, "r", encoding="utf-8") as f:
+        doc = parse_ini(f.read())
+    for sec, lines in doc:
+        if not sec:
+            continue
+        keys = ini.setdefault(sec, {})
+        for line in lines[1:]:
+            if "=" in line and not line.lstrip().startswith(("#", ";")):
+                key, _, value = line.partition("=")
+                keys.setdefault(key.strip(), []).append(value.strip())
+    return ini
+
+def load_masters(path):
+    masters = {}
+    root = ET.parse(path).getroot()
+    for m in root.iter("master"):
+        period = m.get("appTimePeriod")
+        master = EcMaster(idx=int(m.get("idx", "0")), app_time_period=int(period) if period else None)
+        for s in m.findall("slave"):
+            dc = s.find("dcConf")
+            master.slaves[s.get("name") or s.get("idx")] = {
+                "idx": s.get("idx"),
+                "pins": {e.get("halPin") for e in s.iter() if e.get("halPin")},
+                "objs": {e.get("halPin"): e.get("idx", "").upper() for e in s.iter("pdoEntry") if e.get("halPin")},
+                "sync0": dc.get("sync0Cycle") if dc is not None else None,
+            }
+        masters[master.idx] = master
+    return masters
+
+def load_project(ini_path, hal_paths=None, xml_path=None) -> ConfigProject:
+    """INI + HAL file(s) + ethercat-conf.xml in one model; HAL/XML found from the INI if not given."""
+    project = ConfigProject(ini_path=ini_path)
+    base = os.path.dirname(os.path.abspath(ini_path))
+    project.ini = load_ini(ini_path)
+
+    if hal_paths is None:
+        hal_paths = [os.path.join(base, h) for h in project.ini.get("HAL", {}).get("HALFILE", [])]
+    project.hal_paths = [p for p in hal_paths if os.path.exists(p)]
+    for p in hal_paths:
+        if p not in project.hal_paths:
+            project.error(ini_path, f"HALFILE {os.path.basename(p)} not found")
+
+    parser = HalParser()
+    text = ""
+    for p in project.hal_paths:
+        try:
+            with open(p, "r", encoding="utf-8") as f:
+                text += f.read() + "\n"
+        except (OSError, UnicodeDecodeError) as e:
+            project.error(p, f"cannot read: {e}")
+    project.hal = parser.parse(text, project.hal_paths[0] if project.hal_paths else "")
+
+    if xml_path is None:
+        for st in project.hal.statements:
+            if st.kind == "loadusr" and "lcec_conf" in st.args:
+                xml_path = os.path.join(base, st.args[-1])
+                break
+    if xml_path:
+        project.xml_path = xml_path
+        try:
+            project.masters = load_masters(xml_path)
+        except (OSError, ET.ParseError) as e:
+            project.error(xml_path, f"cannot read: {e}")
+    return project
+
+
+# =====================
+# Checks
+# =====================
+
+def resolve(project, value):
+    """HAL argument with [SECTION]KEY references replaced by INI values."""
+    return RE_INI_REF.sub(lambda m: project.ini_value(m.group(1), m.group(2), m.group(0)), value)
+
+def hal_arg(project, module, name):
+    """name=value argument of a loadrt line (INI references resolved)."""
+    for st in project.hal.statements:
+        if st.kind == "loadrt" and st.args and resolve(project, st.args[0]) == module:
+            for arg in st.args[1:]:
+                key, _, value = arg.partition("=")
+                if key == name:
+                    return resolve(project, value)
+    return None
+
+def as_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+def check_timing(project):
+    ini, hal = project.ini_path, project.hal_paths[0] if project.hal_paths else project.ini_path
+    servo_period = as_int(project.ini_value("EMCMOT", "SERVO_PERIOD"))
+    if servo_period is None:
+        project.error(ini, "[EMCMOT]SERVO_PERIOD missing or not an integer")
+
+    hal_period = as_int(hal_arg(project, project.ini_value("EMCMOT", "EMCMOT", "motmod"), "servo_period_nsec"))
+    if hal_period is not None and servo_period is not None and hal_period != servo_period:
+        project.error(hal, f"servo_period_nsec={hal_period} but [EMCMOT]SERVO_PERIOD = {servo_period}")
+    period = hal_period or servo_period
+
+    for master in project.masters.values():
+        if master.app_time_period is None:
+            project.warning(project.xml_path, f"master {master.idx}: no appTimePeriod")
+        elif period is not None and master.app_time_period != period:
+            project.error(project.xml_path,
+                          f"master {master.idx}: appTimePeriod={master.app_time_period} but servo period is {period} ns "
+                          f"(DC sync errors)")
+        for name, slave in master.slaves.items():
+            sync0 = slave["sync0"]
+            if not sync0 or sync0.startswith("*") or master.app_time_period is None:
+                continue
+            if as_int(sync0) is None or as_int(sync0) % master.app_time_period:
+                project.error(project.xml_path,
+                              f"slave {name}: sync0Cycle={sync0} is not a multiple of appTimePeriod "
+                              f"{master.app_time_period}")
+
+def check_joints(project):
+    ini, hal = project.ini_path, project.hal_paths[0] if project.hal_paths else project.ini_path
+    joints = as_int(project.ini_value("KINS", "JOINTS"))
+    if joints is None:
+        project.error(ini, "[KINS]JOINTS missing or not an integer")
+
+    num_joints = as_int(hal_arg(project, project.ini_value("EMCMOT", "EMCMOT", "motmod"), "num_joints"))
+    if num_joints is not None and joints is not None and num_joints != joints:
+        project.error(hal, f"num_joints={num_joints} but [KINS]JOINTS = {joints}")
+    joints = num_joints if num_joints is not None else joints
+
+    used = sorted(project.hal.joints)
+    if joints is not None:
+        for idx in used:
+            if idx >= joints:
+                project.error(hal, f"joint.{idx} used but only {joints} joints configured")
+        for idx in range(joints):
+            if f"JOINT_{idx}" not in project.ini:
+                project.warning(ini, f"[JOINT_{idx}] section missing")
+        for sec in project.ini:
+            if sec.startswith("JOINT_") and as_int(sec[6:]) is not None and as_int(sec[6:]) >= joints:
+                project.warning(ini, f"[{sec}] beyond [KINS]JOINTS = {joints}")
+
+    count = as_int(hal_arg(project, "cia402", "count"))
+    drives = sorted(int(name.split(".")[1]) for name in project.hal.servos)
+    if count is not None:
+        for idx in drives:
+            if idx >= count:
+                project.error(hal, f"cia402.{idx} used but loadrt cia402 count={count}")
+        if joints is not None and count < joints:
+            project.warning(hal, f"cia402 count={count} for {joints} joints")
+    elif drives:
+        project.error(hal, "cia402 pins used but cia402 is not loaded with count=")
+
+def check_slaves(project):
+    hal = project.hal_paths[0] if project.hal_paths else project.ini_path
+    if not project.masters:
+        if any(pin.startswith("lcec.") for pin in project.hal.pins):
+            project.error(hal, "lcec pins used but no ethercat-conf.xml found")
+        return
+
+    for pin in sorted(project.hal.pins):
+        parts = pin.split(".", 3)
+        if parts[0] != "lcec" or len(parts) < 4 or not parts[1].isdigit():
+            continue
+        master = project.masters.get(int(parts[1]))
+        if master is None:
+            project.error(hal, f"{pin}: no master {parts[1]} in {os.path.basename(project.xml_path)}")
+            continue
+        slave = master.slaves.get(parts[2])
+        if slave is None:
+            project.error(hal, f"{pin}: no slave {parts[2]} on master {parts[1]}")
+        elif parts[3] not in slave["pins"] and parts[3] not in LCEC_SLAVE_PINS:
+            project.error(hal, f"{pin}: slave {parts[2]} has no PDO halPin {parts[3]}")
+
+def check_modes(project):
+    """The command PDO of each joint's motion mode is wired to a drive (through cia402 / pid)."""
+    hal = project.hal_paths[0] if project.hal_paths else project.ini_path
+    if not project.masters:
+        return
+    model = project.hal
+    HalAnalyzer().analyze(model)
+    owner_nets = {}
+    for pin, net in model.pins.items():
+        owner_nets.setdefault(pin_owner(pin), set()).add(net)
+
+    for idx, joint in sorted(model.joints.items()):
+        obj = MODE_COMMANDS.get(joint.motion_mode)
+        if not obj:
+            continue
+        owners = {pin_owner(pin) for net in joint.nets for pin in model.nets[net].pins}
+        nets = set().union(*(owner_nets.get(o, ()) for o in owners if not o.startswith(("joint.", "lcec."))))
+        wired = []
+        for net in nets:
+            for pin in model.nets[net].pins:
+                parts = pin.split(".", 3)
+                if parts[0] != "lcec" or len(parts) < 4 or not parts[1].isdigit():
+                    continue
+                master = project.masters.get(int(parts[1]))
+                slave = master.slaves.get(parts[2]) if master else None
+                if slave:
+                    wired.append(slave["objs"].get(parts[3]))
+        if wired and obj not in wired:
+            project.error(hal, f"joint.{idx} runs {joint.motion_mode} but its drive gets no {obj} command PDO")
+
+def check_files(project):
+    if project.xml_path and not os.path.exists(project.xml_path):
+        project.error(project.hal_paths[0] if project.hal_paths else project.ini_path,
+                      f"lcec_conf file {os.path.basename(project.xml_path)} not found")
+    if not project.hal_paths:
+        project.warning(project.ini_path, "no HAL file to check ([HAL]HALFILE)")
+    for st in project.hal.statements:
+        if st.kind == "source":
+            project.warning(st.file or project.ini_path, f"line {st.line}: sourced file {st.args[0]} not found")
+
+CHECKS = [check_files, check_timing, check_joints, check_slaves, check_modes]
+
+def check_project(ini_path, hal_paths=None, xml_path=None) -> List[Issue]:
+    with profiling.stage("check.load_project"):
+        try:
+            project = load_project(ini_path, hal_paths, xml_path)
+        except (OSError, UnicodeDecodeError) as e:
+            return [Issue("error", ini_path, f"cannot read: {e}")]
+    for check in CHECKS:
+        with profiling.stage(f"check.{check.__name__}"):
+            check(project)
+    return project.issues
+
+
+# =====================
+# CLI
+# =====================
+
+def find_inis(path):
+    if os.path.isdir(path):
+        return sorted(
+            os.path.join(root, name)
+            for root, _, files in os.walk(path) for name in files if name.lower().endswith(".ini")
+        )
+    return [path]
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Cross-check ethercat-conf.xml, HAL and INI of LinuxCNC configs")
+    ap.add_argument("paths", nargs="+", help="INI files or directories searched for *.ini")
+    ap.add_argument("--hal", action="append", help="HAL file (default: [HAL]HALFILE)")
+    ap.add_argument("--xml", help="ethercat-conf.xml (default: loadusr lcec_conf in the HAL)")
+    ap.add_argument("-W", "--warnings-as-errors", action="store_true")
+    profiling.add_arguments(ap)
+    args = ap.parse_args(argv)
+    profiling.from_args(args)
+
+    errors = 0
+    for path in args.paths:
+        for ini in find_inis(path):
+            issues = check_project(ini, args.hal, args.xml)
+            print(f"{'❌' if issues else '✅'} {ini}")
+            for issue in issues:
+                print(f"   {issue}")
+                if issue.level == "error" or args.warnings_as_errors:
+                    errors += 1
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Drive profile store (no GUI)
+- Per drive family: halPin naming, renamed pins, halType overrides, essential / feed-forward /
+  touch probe PDO sets per mode, default cia402 parameters (pos-scale, csp-mode) and the
+  acc-cmd -> 60B2 torque offset gain
+- Selected by the ESI / slave ids: vendor + product + revision, then vendor + product, then
+  vendor; drives without a match get the generic CiA-402 profile
+- A profile can extend another one ("base"); dict fields are merged key by key
+- Extra profiles: ETHERCAT_GEN_PROFILES=FILE.json|DIR[:...] – a JSON object {key: profile} in the
+  PROFILES format, ids as numbers or "0x..." strings
+All profiles are compiled into lookup tables once, at import.
+Used by xml_core.py, hal_core.py and the GUIs.
+"""
+
+import os
+from dataclasses import dataclass
+
+ENV = "ETHERCAT_GEN_PROFILES"
+DEFAULT = "cia402"
+
+PROFILES = {
+    "cia402": {
+        "name": "Generic CiA-402 drive",
+        "match": [],
+        # halPin of each object when the ESI is converted
+        "pins": {
+            "6040": "control-word",
+            "6041": "status-word",
+            "6060": "modes-of-operation",
+            "6061": "modes-of-operation-display",
+            "607A": "target-position",
+            "6064": "actual-position",
+            "60FF": "target-velocity",
+            "606C": "actual-velocity",
+            "6071": "target-torque",
+            "6077": "actual-torque",
+            "60B1": "velocity-offset",
+            "60B2": "torque-offset",
+            "60B8": "touch-probe-function",
+            "60B9": "touch-probe-status",
+            "60BA": "touch-probe-pos1-pos-value",
+        },
+        # halPin names set by "Rename HAL pins"
+        "rename": {
+            "60B8": "probe-cmd",
+            "6060": "opmode",
+            "603F": "error-code",
+            "60B9": "probe-status",
+            "60BA": "probe1-rising",
+            "60FD": "mydigitalin",
+            "6061": "opmode-display",
+        },
+        # halType of the plain entries (float / complex are set by the PDO reduction)
+        "hal_types": {"6040": "u32", "6041": "u32"},
+        "default_hal_type": "s32",
+        # Essential entries of the first Rx (1600) and Tx (1A00) PDO per mode
+        "essential": {
+            "CSP": {"1600": ["6040", "607A", "6060"], "1A00": ["6041", "6064", "606C", "6061"]},
+            "CSV": {"1600": ["6040", "60FF", "6060"], "1A00": ["6041", "6064", "606C", "6061"]},
+            "CST": {"1600": ["6040", "6071", "6060"], "1A00": ["6041", "6064", "606C", "6077", "6061"]},
+        },
+        # Optional velocity/torque offsets fed from LinuxCNC joint vel-cmd / acc-cmd
+        "feedforward": {
+            "CSP": {"1600": ["60B1", "60B2"]},
+            "CSV": {"1600": ["60B2"]},
+            "CST": {},
+        },
+        # lcec scale of 60B2 (torque offset per machine unit/s² of acc-cmd); 60B2 is left out of
+        # the feed-forward PDOs until a drive profile sets it
+        "torque_gain": None,
+        # Touch probe: 60B8 function (rx), 60B9 status and 60BA latched position (tx)
+        "probe": {"1600": ["60B8"], "1A00": ["60B9", "60BA"]},
+        # Suggested cia402 parameter values; pos-scale = encoder counts per machine unit
+        "params": {"pos-scale": "1677721.6", "csp-mode": "1"},
+    },
+    "lichuan-lc10e": {
+        "base": "cia402",
+        "name": "Lichuan LC10E",
+        "match": [{"vendor": 0x766, "product": 0x402}],
+        # 2^24 counts per revolution, 10 mm ball screw
+        "params": {"pos-scale": "1677721.6"},
+    },
+}
+
+
+@dataclass(frozen=True)
+class DriveProfile:
+    key: str
+    name: str
+    pins: dict              # object -> halPin
+    rename: dict            # object -> renamed halPin
+    hal_types: dict         # object -> halType
+    default_hal_type: str
+    params: dict            # normalized cia402 parameter -> value
+    torque_gain: str        # lcec scale of 60B2, "" if not set
+    keep_maps: dict         # (mode, feedforward, probe) -> {pdo: (objects, ...)}
+
+    def hal_for(self, idx):
+        """halPin / halType of a pdoEntry."""
+        idx = idx.upper()
+        return self.pins.get(idx, f"obj-{idx.lower()}"), self.hal_types.get(idx, self.default_hal_type)
+
+    def keep_map(self, mode, feedforward=False, probe=False):
+        """{pdo: objects} kept by the PDO reduction."""
+        return self.keep_maps[(mode, bool(feedforward), bool(probe))]
+
+    def float_scale(self, pos_scale=None):
+        """
+        {object: lcec scale} of the entries mapped as float pins for a cia402 pos-scale
+        (default: the profile's): 60B1 velocity offset, 60B2 torque offset, 60BA latched
+        probe position converted back to machine units.
+        """
+        pos_scale = float(pos_scale or self.params.get("posscale") or 1.0)
+        scale = {"60B1": repr(pos_scale), "60BA": repr(1 / pos_scale)}
+        if self.torque_gain:
+            scale["60B2"] = self.torque_gain
+        return scale
+
+
+# =========================
+# Compilation
+# =========================
+def parse_id(value):
+    """Vendor / product / revision id from a number, "0x766", "#x766" or "766" (hex, as in lcec)."""
+    if isinstance(value, int):
+        return value
+    text = str(value).strip().lower().replace("#x", "0x")
+    return int(text, 0) if text.startswith("0x") else int(text, 16)
+
+def normalize_param(name):
+    """cia402 parameter key as hal_core.normalize() gives it (pos_scale, pos-scale -> posscale)."""
+    return name.lower().replace("-", "").replace("_", "")
+
+def resolve(key, raw, seen=()):
+    """Profile with its base chain merged in; "match" is never inherited."""
+    if key not in raw:
+        raise ValueError(f"unknown drive profile '{key}'")
+    if key in seen:
+        raise ValueError(f"drive profile '{key}' extends itself")
+    entry = raw[key]
+    if not entry.get("base"):
+        return dict(entry)
+    merged = resolve(entry["base"], raw, seen + (key,))
+    for field, value in entry.items():
+        if isinstance(value, dict) and isinstance(merged.get(field), dict):
+            merged[field] = {**merged[field], **value}
+        else:
+            merged[field] = value
+    merged["match"] = entry.get("match", [])
+    return merged
+
+def compile_profile(key, entry):
+    pins = {obj.upper(): pin for obj, pin in entry.get("pins", {}).items()}
+    params = {normalize_param(name): str(value) for name, value in entry.get("params", {}).items()}
+    torque_gain = repr(float(entry["torque_gain"])) if entry.get("torque_gain") is not None else ""
+
+    keep_maps = {}
+    for mode in entry.get("essential", {}):
+        for feedforward in (False, True):
+            for probe in (False, True):
+                keep = {pdo: list(objs) for pdo, objs in entry["essential"][mode].items()}
+                extra = [entry.get("feedforward", {}).get(mode, {})] if feedforward else []
+                extra += [entry.get("probe", {})] if probe else []
+                for sets in extra:
+                    for pdo, objs in sets.items():
+                        objs = [obj for obj in objs if torque_gain or obj.upper() != "60B2"]
+                        keep.setdefault(pdo, []).extend(objs)
+                keep_maps[(mode, feedforward, probe)] = {pdo: tuple(objs) for pdo, objs in keep.items()}
+
+    return DriveProfile(
+        key=key,
+        name=entry.get("name", key),
+        pins=pins,
+        rename={obj.upper(): pin for obj, pin in entry.get("rename", {}).items()},
+        hal_types={obj.upper(): t for obj, t in entry.get("hal_types", {}).items()},
+        default_hal_type=entry.get("default_hal_type", "s32"),
+        params=params,
+        torque_gain=torque_gain,
+        keep_maps=keep_maps,
+    )
+
+def load_files(paths):
+    """{key: profile} of the JSON files / directories of *.json in paths, and the files read."""
+    import json
+    raw, files = {}, []
+    for path in paths:
+        if os.path.isdir(path):
+            files += sorted(os.path.join(path, n) for n in os.listdir(path) if n.endswith(".json"))
+        elif path:
+            files.append(path)
+    for file in files:
+        with open(file, encoding="utf-8") as f:
+            try:
+                raw.update(json.load(f))
+            except ValueError as e:
+                raise ValueError(f"{file}: {e}") from None
+    return raw, files
+
+def build(raw):
+    """(profiles by key, {(vendor, product, revision): profile}) – product / revision None = any."""
+    profiles, index = {}, {}
+    for key in raw:
+        entry = resolve(key, raw)
+        profile = profiles[key] = compile_profile(key, entry)
+        for match in entry.get("match", []):
+            ids = tuple(None if match.get(k) is None else parse_id(match[k])
+                        for k in ("vendor", "product", "revision"))
+            index[ids] = profile
+    return profiles, index
+
+SOURCES = []    # user profile files read at import (part of the pipeline's code key)
+_raw = dict(PROFILES)
+if os.environ.get(ENV):
+    _user, SOURCES = load_files(os.environ[ENV].split(os.pathsep))
+    _raw.update(_user)
+_PROFILES, _INDEX = build(_raw)
+del _raw
+
+
+# =========================
+# Lookup
+# =========================
+def get(key=DEFAULT):
+    return _PROFILES[key]
+
+def lookup(vendor, product=None, revision=None):
+    """Most specific profile for the ids, the generic CiA-402 profile if none matches."""
+    for ids in ((vendor, product, revision), (vendor, product, None), (vendor, None, None)):
+        if ids in _INDEX:
+            return _INDEX[ids]
+    return _PROFILES[DEFAULT]
+
+def for_esi(esi):
+    if not esi:
+        return _PROFILES[DEFAULT]
+    return lookup(esi.get("vendor"), esi.get("product"), esi.get("revision"))
+
+def for_slave(slave, esi=None):
+    """
+    Profile of an ethercat-conf.xml <slave> from its vid / pid. The XML has no revision: a slave
+    of the loaded ESI's device gets the ESI's profile, revision included.
+    """
+    vid, pid = slave.attrib.get("vid"), slave.attrib.get("pid")
+    if not vid:
+        return _PROFILES[DEFAULT]
+    try:
+        ids = parse_id(vid), pid and parse_id(pid)
+    except ValueError:
+        return _PROFILES[DEFAULT]
+    if esi and ids == (esi.get("vendor"), esi.get("product")):
+        return for_esi(esi)
+    return lookup(*ids)
+
+def for_config(root):
+    """Profile of the first slave with PDOs in a <masters> tree."""
+    for slave in root.iter("slave"):
+        if slave.find("syncManager") is not None:
+            return for_slave(slave)
+    return _PROFILES[DEFAULT]
@@ -0,0 +1,531 @@
+#!/usr/bin/env python3
+"""
+ethercat-conf.xml -> HAL core (no GUI)
+- cia402.comp pin / parameter parsing and pin name matching
+- Joint <-> CiA-402 wiring tables, modes, touch probe nets
+- HalGenerator: hal.hal text from plain data or a saved mapping profile
+Used by HAL_Generator.py (GUI), hal_gen.py and pipeline.py.
+"""
+
+import re
+import xml.etree.ElementTree as ET
+
+import drive_profiles
+from profiling import timed
+
+def normalize(name):
+    """Normalize pin and halpin names: lowercase, remove underscores and hyphens."""
+    name = name.lower().replace("-", "").replace("_", "")
+    if name.startswith("drv"):
+        name = name[3:]
+    return name
+
+def normalize_param(name):
+    """Normalize parameter names: lowercase, replace _ with -"""
+    return name.lower().replace("_", "-")
+
+def match_pin(name, pins):
+    """First comp pin whose normalized name equals name, "" if there is none."""
+    norm = normalize(name)
+    for pin in pins:
+        if normalize(pin) == norm:
+            return pin
+    return ""
+
+@timed("hal.parse_comp")
+def parse_comp(text):
+    """Pins and parameters declared in a cia402.comp file."""
+    pins = re.findall(r'pin\s+(in|out|io)\s+(unsigned|signed|float|bit)\s+(\w+)', text)
+    params = re.findall(r'param\s+(rw|ro)\s+(unsigned|signed|float|bit)\s+(\w+)', text)
+    return [name for _, _, name in pins], [name for _, _, name in params]
+
+# =========================
+# Joint ↔ CiA-402 wiring
+# =========================
+AXIS_ORDER = ["X", "Y", "Y2", "Z", "A", "B"]
+
+MODES = ["CSP", "CSV", "CST"]
+
+# (joint pin, direction, net name template, cia402 role, modes enabled by default, GUI group)
+#   "out" – joint pin drives the cia402 pin, "in" – cia402 pin drives the joint pin
+#   cia402 role – cia402.comp pin suggested for the joint pin
+#   "pid.<pin>" – pin of the per-joint pid loop (CSV / CST), everything else is a joint pin
+#   GUI group – heading the HAL wizard lists the pin under ("" – no heading)
+JOINT_WIRING = [
+    ("motor-pos-cmd", "out", "{axis}-pos-cmd", "pos_cmd", ("CSP", "CST"), ""),
+    ("vel-cmd", "out", "{axis}-vel-cmd", "velocity_cmd", ("CSV",), "For CSV / CST mode"),
+    ("motor-pos-fb", "in", "{axis}-pos-fb", "pos_fb", ("CSP", "CSV", "CST"), ""),
+    ("vel-fb", "in", "{axis}-vel-fb", "velocity_fb", ("CSV",), "For CSV / CST mode"),
+    ("pid.output", "out", "{axis}-torque-cmd", "torque_cmd", ("CST",), "For CSV / CST mode"),
+    ("amp-enable-out", "out", "{axis}-enable", "enable", ("CSP", "CSV", "CST"), ""),
+    ("amp-fault-in", "in", "{axis}-amp-fault", "drv_fault", ("CSP", "CSV", "CST"), ""),
+    ("request-custom-homing", "out", "{axis}-custom-home", "home", ("CSP", "CSV", "CST"), "Homing"),
+    ("is-custom-homing", "in", "{axis}-is-custom-homing", "stat_homing", ("CSP", "CSV", "CST"), "Homing"),
+    ("custom-homing-finished", "in", "{axis}-custom-home-done", "stat_homed", ("CSP", "CSV", "CST"), "Homing"),
+]
+
+# CSV / CST: LinuxCNC closes the position loop with pid.N
+#   (joint pin, net name, pid pin) – a joint output whose table row is unchecked is linked
+#   here, so the pid never loses its command
+PID_INPUTS = {
+    "CSV": [
+        ("joint.0.motor-pos-cmd", "{axis}-pos-cmd", "command"),
+        ("joint.0.vel-cmd", "{axis}-vel-cmd", "command-deriv"),
+        ("joint.0.motor-pos-fb", "{axis}-pos-fb", "feedback"),
+        ("joint.0.amp-enable-out", "{axis}-enable", "enable"),
+    ],
+    "CST": [
+        ("joint.0.motor-pos-cmd", "{axis}-pos-cmd", "command"),
+        ("joint.0.motor-pos-fb", "{axis}-pos-fb", "feedback"),
+        ("joint.0.amp-enable-out", "{axis}-enable", "enable"),
+    ],
+}
+# Starting gains; CSV: FF1 passes the joint velocity through, Pgain removes the following error
+PID_GAINS = {
+    "CSV": {"FF1": "1", "Pgain": "50"},
+    "CST": {},
+}
+# CSV: pid.N.output takes the joint pin's place at its cia402 pin – (joint pin, net name)
+PID_OUTPUT = {
+    "CSV": ("joint.0.vel-cmd", "{axis}-vel-out"),
+}
+
+# cia402.comp mode parameters (normalized name) per mode
+MODE_PARAMS = {
+    "CSP": {"cspmode": "1", "csvmode": "0", "cstmode": "0"},
+    "CSV": {"cspmode": "0", "csvmode": "1", "cstmode": "0"},
+    "CST": {"cspmode": "0", "csvmode": "0", "cstmode": "1"},
+}
+# Modes a comp without the mode's own parameter cannot run (cia402.comp: csp_mode 1 = CSP, 0 = CSV):
+# its mode parameters are left alone and the drive's mode of operation (6060) is set instead
+DIRECT_OPMODES = {"CST": "10"}
+# CST without a torque pin in the comp (torque_cmd row unmatched): pid.N.output drives the
+# drive's target torque PDO itself – obj -> net name
+PID_PDO = {
+    "CST": (0x6071, "{axis}-torque-cmd"),
+}
+
+# Velocity/torque offset PDOs (60B1/60B2) fed from joint commands: obj -> (joint pin, net name)
+FEEDFORWARD_NETS = {
+    0x60B1: ("joint.0.vel-cmd", "{axis}-vel-cmd"),
+    0x60B2: ("joint.0.acc-cmd", "{axis}-acc-cmd"),
+}
+
+# Touch probe: the drive latches the position (60BA) when its probe input trips, the latched
+# value replaces motor-pos-fb for the one servo cycle in which motion.probe-input rises –
+# on each axis whose own drive has latched (and2 of probe-latch and its probe1-pos-stored).
+# The first probe drive drives motion.probe-input. Armed (60B8) while motion runs a probing
+# move (motion-type 5).
+PROBE_LOADS = [
+    "loadrt conv_s32_float names=probe-motion-type",
+    "loadrt wcomp names=probe-arm-window",
+    "loadrt edge names=probe-edge",
+    "loadrt and2 names={gates}",
+    "loadrt mux2 names={muxes}",
+]
+PROBE_FUNCTS = ["probe-motion-type", "probe-arm-window", "probe-edge"]
+PROBE_NETS = [
+    "setp probe-arm-window.min 4.5",
+    "setp probe-arm-window.max 5.5",
+    "net probe-motion-type motion.motion-type => probe-motion-type.in",
+    "net probe-motion-type-f probe-motion-type.out => probe-arm-window.in",
+    "net probe-arm probe-arm-window.out",
+    "net probe-tripped lcec.0.{slave}.probe1-pos-stored => motion.probe-input probe-edge.in",
+    "net probe-latch probe-edge.out",
+]
+PROBE_AXIS_NETS = [
+    "net probe-arm lcec.0.{slave}.probe1-enable lcec.0.{slave}.probe1-pos-edge",
+    "net probe-latch {gate}.in0",
+    "{stored}",
+    "net {axis}-probe-sel {gate}.out => {mux}.sel",
+    "net {axis}-probe-pos lcec.0.{slave}.{latched} => {mux}.in1",
+    "net {axis}-pos-fb-probed {mux}.out => joint.{joint}.motor-pos-fb",
+]
+PROBE_BITS = {"probe1-enable", "probe1-pos-edge", "probe1-pos-stored"}
+
+def wiring_key(pin):
+    """GUI / profile key of a motion-side pin: joint.0.<pin> or <comp>.0.<pin>."""
+    comp, _, name = pin.rpartition(".")
+    return f"{comp or 'joint'}.0.{name}"
+
+def compile_joint_wiring(table):
+    """Validate the wiring table and compile it into (joint.0 pin, net line template) pairs."""
+    compiled = []
+    seen = set()
+    for pin, direction, net, role, modes, _group in table:
+        key = wiring_key(pin)
+        if key in seen:
+            raise ValueError(f"Duplicate joint pin in wiring table: {pin}")
+        if "{axis}" not in net:
+            raise ValueError(f"Net name for {pin} must contain {{axis}}: {net}")
+        if not role:
+            raise ValueError(f"Missing cia402 role for {pin}")
+        unknown = set(modes) - set(MODES)
+        if unknown:
+            raise ValueError(f"Unknown mode for {pin}: {', '.join(sorted(unknown))}")
+        seen.add(key)
+
+        comp, _, name = key.partition(".0.")
+        joint_pin = f"{comp}.{{cia}}.{name}" if comp != "joint" else f"joint.{{joint}}.{name}"
+        cia_pin = "cia402.{cia}.{halpin}"
+        if direction == "out":
+            compiled.append((key, f"net {net} {joint_pin} => {cia_pin}"))
+        elif direction == "in":
+            compiled.append((key, f"net {net} {cia_pin} => {joint_pin}"))
+        else:
+            raise ValueError(f"Invalid direction for {pin}: {direction}")
+    return compiled
+
+JOINT_NETS = compile_joint_wiring(JOINT_WIRING)
+JOINT_SUGGESTIONS = {wiring_key(pin): role for pin, _, _, role, _, _ in JOINT_WIRING}
+JOINT_MODES = {wiring_key(pin): modes for pin, _, _, _, modes, _ in JOINT_WIRING}
+JOINT_DIRECTIONS = {wiring_key(pin): direction for pin, direction, _, _, _, _ in JOINT_WIRING}
+JOINT_GROUPS = {}   # GUI heading -> joint pins, in table order
+for _pin, _, _, _, _, _group in JOINT_WIRING:
+    JOINT_GROUPS.setdefault(_group, []).append(wiring_key(_pin))
+
+def axis_sort_key(axis):
+    """Known axes keep their usual order, any other axis names follow alphabetically."""
+    if axis in AXIS_ORDER:
+        return (0, AXIS_ORDER.index(axis), "")
+    return (1, 0, axis)
+
+class HalGenerator:
+    """
+    Builds the HAL file from plain data:
+      enabled        {(slave, obj): bool}   – PDO entries to wire
+      pdo_pins       {(slave, obj): str}    – cia402 pin for each PDO entry
+      axis_map       {i: {"axis", "slave"}}
+      joint_pins     {"joint.0.<pin>": str} – cia402 pin for each joint pin
+      param_values   {param: str}           – cia402 parameters
+      enabled_joint  {"joint.0.<pin>": bool}
+    """
+    def __init__(self, xml_path, enabled, comp_map, axis_map, pdo_pins, joint_pins, param_values, mode="CSP",
+                 probe=False, enabled_joint=None):
+        if mode not in MODES:
+            raise ValueError(f"Unknown CiA-402 mode: {mode}")
+        self.mode = mode
+        self.probe = probe
+        self.xml_path = xml_path
+        self.enabled = enabled
+        self.comp_map = comp_map
+        self.axis_map = axis_map
+        self.pdo_pins = pdo_pins
+        self.slaves = {}
+        self.parse_xml()
+        self.enabled_joint = enabled_joint or {}
+
+        # Normalize joint pins and param values at the start
+        self.joint_pins = {
+            pin: val.strip().replace("_", "-") for pin, val in joint_pins.items() if val and val.strip()
+        }
+        self.param_values = {
+            pname: (val or "").strip().replace("_", "-") for pname, val in param_values.items()
+        }
+
+    @classmethod
+    def from_profile(cls, xml_path, comp_pins, comp_params, profile):
+        """
+        Generator for a saved mapping profile (see App.profile). Everything the profile
+        leaves out gets the same defaults the GUI suggests; cia402 parameters come from
+        the drive profile of the first drive in the XML.
+        """
+        if not isinstance(xml_path, ET.Element):
+            xml_path = ET.parse(xml_path).getroot()
+        mode = profile.get("mode", "CSP")
+        axes = profile.get("axes", {})
+        axis_map = {
+            i: {"axis": axis, "slave": int(axes[axis])}
+            for i, axis in enumerate(sorted(axes, key=axis_sort_key))
+        }
+
+        joint_pins = {key: match_pin(role, comp_pins) for key, role in JOINT_SUGGESTIONS.items()}
+        joint_pins.update(profile.get("joint_pins", {}))
+        enabled_joint = {key: mode in modes for key, modes in JOINT_MODES.items()}
+        enabled_joint.update(profile.get("joint_enabled", {}))
+
+        suggested = drive_profiles.for_config(xml_path).params
+        params = {name: suggested.get(normalize(name), "") for name in comp_params}
+        params.update(profile.get("params", {}))
+
+        gen = cls(
+            xml_path, {}, {pin: pin for pin in comp_pins}, axis_map, {}, joint_pins, params,
+            mode=mode, probe=profile.get("probe", False), enabled_joint=enabled_joint,
+        )
+
+        # PDO entries: all enabled and auto-matched unless the profile says otherwise
+        disabled = {key.upper() for key in profile.get("disabled_pdos", [])}
+        pdo_pins = {key.upper(): pin for key, pin in profile.get("pdo_pins", {}).items()}
+        for sidx, s in gen.slaves.items():
+            for obj, halpin in s["rx"] + s["tx"]:
+                key = f"{sidx}:{obj:04X}"
+                gen.enabled[(sidx, obj)] = key not in disabled
+                gen.pdo_pins[(sidx, obj)] = pdo_pins.get(key, match_pin(halpin, comp_pins))
+        return gen
+
+    @timed("hal.parse_xml")
+    def parse_xml(self):
+        """
+        Saves the PDOs and halPins of each slave from an EtherCAT XML file, or from an
+        already parsed <masters> element (pipeline.py passes the XML stage's tree).
+        """
+        if isinstance(self.xml_path, ET.Element):
+            root = self.xml_path
+        else:
+            root = ET.parse(self.xml_path).getroot()
+        for slave in root.findall(".//slave"):
+            sidx = int(slave.attrib["idx"])
+            self.slaves[sidx] = {"rx": [], "tx": [], "bits": set(), "float": {}}
+
+            for sm in slave.findall("syncManager"):
+                for pdo in sm.findall("pdo"):
+                    for entry in pdo.findall("pdoEntry"):
+                        obj_str = entry.attrib["idx"]
+                        obj = int(obj_str, 16)  # Always treat as hex
+                        halpin = entry.attrib.get("halPin", f"obj-{obj:04x}").replace("_", "-")
+
+                        # Bit pins of complex entries and float pins (touch probe)
+                        for bit in entry.findall("complexEntry"):
+                            if bit.attrib.get("halPin"):
+                                self.slaves[sidx]["bits"].add(bit.attrib["halPin"])
+                        if entry.attrib.get("halType") == "float":
+                            self.slaves[sidx]["float"][obj] = halpin
+
+                        # Direction based on 6040 (rx) and 6041 (tx)
+                        if obj == 0x6040:
+                            self.slaves[sidx]["rx"].append((obj, halpin))
+                        elif obj == 0x6041:
+                            self.slaves[sidx]["tx"].append((obj, halpin))
+                        else:
+                            self.slaves[sidx]["rx"].append((obj, halpin))
+
+    def probe_pin(self, slave):
+        """Latched probe position pin of a slave, None if its PDOs do not support the probe path."""
+        s = self.slaves.get(slave)
+        if not s or not PROBE_BITS <= s["bits"]:
+            return None
+        if not all(self.enabled.get((slave, obj)) for obj in (0x60B8, 0x60B9, 0x60BA)):
+            return None
+        return s["float"].get(0x60BA)
+
+    def hal_pin_name(self, cia, obj, halpin, selected):
+        """Generuje nazwę CIA402 dla neta, z normalizacją podkreśleń."""
+        if selected:
+            return f"cia402.{cia}.{selected.replace('_', '-')}"
+        return None
+
+    def joint_order(self):
+        """(axis -> joint, axis -> slave): joints are numbered in slave order."""
+        joint_order = []
+        for i in sorted(self.axis_map.keys()):
+            cfg = self.axis_map[i]
+            if cfg["axis"]:
+                joint_order.append((cfg["slave"], cfg["axis"], i))
+
+        axis_to_joint = {}
+        for idx, (slave, axis, _) in enumerate(sorted(joint_order, key=lambda x: x[0])):
+            axis_to_joint[axis] = idx
+        return axis_to_joint, {axis: slave for slave, axis, _ in joint_order}
+
+    def joint_axes(self):
+        """joint -> INI axis letter (Y2 -> Y), the same mapping the INI Generator reads from the nets."""
+        axis_to_joint, _ = self.joint_order()
+        return {joint: axis.rstrip("0123456789") for axis, joint in axis_to_joint.items()}
+
+    def pos_scales(self):
+        """slave -> cia402 pos-scale the HAL sets for its joint (xml_core.scale_floats)."""
+        value = next((v for name, v in self.param_values.items() if normalize(name) == "posscale"), "")
+        try:
+            pos_scale = float(value)
+        except ValueError:
+            return {}
+        _, slave_of = self.joint_order()
+        return {slave: pos_scale for slave in slave_of.values()} if pos_scale else {}
+
+    @timed("hal.generate_hal")
+    def generate_hal(self):
+        """Generuje zawartość pliku HAL dla LinuxCNC + EtherCAT + CIA402."""
+
+        # Joint order and axis-to-joint mapping
+        axis_to_joint, slave_of = self.joint_order()
+
+        # Dynamic count – number of joints in CiA-402
+        cia_count = len(axis_to_joint)
+
+        # Joint ↔ CiA-402 pin choices are the same for every axis – resolve them once
+        joint_nets = []
+        wired = set()
+        pid_out, pid_net = PID_OUTPUT.get(self.mode, (None, None))
+        for key, line in JOINT_NETS:
+            halpin = self.joint_pins.get(key)
+            if not halpin or not self.enabled_joint.get(key):
+                continue
+            if key == pid_out:
+                # The joint pin feeds the pid, the pid output drives the cia402 pin
+                joint_line, _, cia_pin = line.partition(" => ")
+                joint_nets.append((joint_line, halpin))
+                joint_nets.append((f"net {pid_net} pid.{{cia}}.output => {cia_pin}", halpin))
+            else:
+                joint_nets.append((line, halpin))
+            wired.add(key)
+
+        # Touch probe axes – the latched position is switched into motor-pos-fb
+        probe_axes = {}
+        if self.probe and "joint.0.motor-pos-fb" in wired:
+            for axis in sorted(axis_to_joint, key=axis_sort_key):
+                latched = self.probe_pin(slave_of[axis])
+                if latched:
+                    probe_axes[axis] = (f"{axis.lower()}-probe-mux", latched, f"{axis.lower()}-probe-gate")
+
+        probe_slave = slave_of[next(iter(probe_axes))] if probe_axes else None
+
+        h = []
+        h += [
+            "# ==========================================",
+            "# AUTO GENERATED HAL – FULL PDO SUPPORT",
+            "# ==========================================\n",
+            "loadrt [KINS]KINEMATICS",
+            "loadrt [EMCMOT]EMCMOT servo_period_nsec=[EMCMOT]SERVO_PERIOD num_joints=[KINS]JOINTS",
+            "loadusr -W lcec_conf ethercat-conf.xml",
+            f"loadrt cia402 count={cia_count}",  # <- dynamic number of joints
+        ]
+        if self.mode in PID_INPUTS:
+            h.append(f"loadrt pid num_chan={cia_count}")
+        if probe_axes:
+            muxes = ",".join(mux for mux, _, _ in probe_axes.values())
+            gates = ",".join(gate for _, _, gate in probe_axes.values())
+            h += [line.format(muxes=muxes, gates=gates) for line in PROBE_LOADS]
+        h += ["loadrt lcec", ""]
+
+        # Add servo function
+        h.append("addf lcec.read-all servo-thread")
+        for axis in axis_to_joint:
+            h.append(f"addf cia402.{axis_to_joint[axis]}.read-all servo-thread")
+        if probe_axes:
+            gates = [gate for _, _, gate in probe_axes.values()]
+            for funct in PROBE_FUNCTS + gates + [mux for mux, _, _ in probe_axes.values()]:
+                h.append(f"addf {funct} servo-thread")
+        h.append("addf motion-command-handler servo-thread")
+        h.append("addf motion-controller servo-thread")
+        if self.mode in PID_INPUTS:
+            for axis in axis_to_joint:
+                h.append(f"addf pid.{axis_to_joint[axis]}.do-pid-calcs servo-thread")
+       
+        for axis in axis_to_joint:
+            h.append(f"addf cia402.{axis_to_joint[axis]}.write-all servo-thread")
+        h.append("addf lcec.write-all servo-thread")
+        h.append("")
+        h.append("setp iocontrol.0.emc-enable-in 1")
+        h.append("")
+        
+
+        # ==========================================
+        # AUTOMATIC JOINTS SECTION
+        # ==========================================
+        mode_params = MODE_PARAMS[self.mode]
+        direct_opmode = None
+        flag = next(name for name, value in mode_params.items() if value == "1")
+        if self.mode in DIRECT_OPMODES and flag not in {normalize(p) for p in self.param_values}:
+            mode_params = dict.fromkeys(mode_params, "")
+            direct_opmode = DIRECT_OPMODES[self.mode]
+        pid_pdo, pid_pdo_net = PID_PDO.get(self.mode, (None, None))
+        if "pid.0.output" in wired:
+            pid_pdo = None
+
+        # Probe axes read the drive feedback through the probe mux
+        probe_nets = [
+            (line.replace("joint.{joint}.motor-pos-fb", "{mux}.in0"), halpin)
+            for line, halpin in joint_nets
+        ]
+
+        # Generate nets for each axis
+        for axis in sorted(axis_to_joint, key=axis_sort_key):
+            joint = axis_to_joint[axis]
+            cia = joint
+            slave = slave_of[axis]
+
+            h.append(f"# -------- AXIS {axis} / joint.{joint} / cia402.{cia} / slave.{slave} --------")
+
+            # CiA-402 parameters – automatic
+            for pname, value in self.param_values.items():
+                val = mode_params.get(normalize(pname), value)
+                if val:
+                    pname_norm = normalize_param(pname)
+                    h.append(f"setp cia402.{cia}.{pname_norm} {val}")
+
+            h.append("")
+
+            # Joint ↔ CiA-402 nets – checkboxes updated dynamically
+            mux, latched, gate = probe_axes.get(axis, (None, None, None))
+            for line, halpin in (probe_nets if mux else joint_nets):
+                h.append(line.format(axis=axis, joint=joint, cia=cia, halpin=halpin, mux=mux))
+
+            if mux:
+                # The probe drive's probe1-pos-stored is already on probe-tripped
+                if slave == probe_slave:
+                    stored = f"net probe-tripped {gate}.in1"
+                else:
+                    stored = f"net {axis}-probe-stored lcec.0.{slave}.probe1-pos-stored => {gate}.in1"
+                for line in PROBE_AXIS_NETS:
+                    h.append(line.format(axis=axis, joint=joint, slave=slave, mux=mux, latched=latched,
+                                         gate=gate, stored=stored))
+
+            if self.mode in PID_INPUTS:
+                h.append(f"# tune pid.{cia}.Pgain / Igain / Dgain / FF1 / FF2 on the machine")
+                for name, value in PID_GAINS[self.mode].items():
+                    h.append(f"setp pid.{cia}.{name} {value}")
+                for key, net, pin in PID_INPUTS[self.mode]:
+                    net = net.format(axis=axis)
+                    if key in wired or JOINT_DIRECTIONS[key] == "in":
+                        h.append(f"net {net} pid.{cia}.{pin}")
+                    else:
+                        h.append(f"net {net} joint.{joint}.{key.split('.')[-1]} => pid.{cia}.{pin}")
+
+            h.append("")
+
+            # Auto-generate PDO nets (Rx → lcec)
+            pid_driven = pid_pdo is None
+            for obj, halpin in self.slaves.get(slave, {}).get("rx", []):
+                if self.enabled.get((slave, obj)):
+                    src = self.hal_pin_name(cia, obj, halpin, self.pdo_pins.get((slave, obj)))
+                    if obj == 0x6060 and direct_opmode:
+                        h.append(f"setp lcec.0.{slave}.{halpin} {direct_opmode}")
+                    elif obj == pid_pdo and not src:
+                        h.append(f"net {pid_pdo_net.format(axis=axis)} pid.{cia}.output => lcec.0.{slave}.{halpin}")
+                        pid_driven = True
+                    elif src:
+                        lcec_net = f"lcec.0.{slave}.{halpin}"
+                        h.append(f"net {axis}-{halpin} {src} => {lcec_net}")
+                    elif obj in FEEDFORWARD_NETS:
+                        # Feed-forward offset straight from the joint command
+                        key, net = FEEDFORWARD_NETS[obj]
+                        net = net.format(axis=axis)
+                        lcec_net = f"lcec.0.{slave}.{halpin}"
+                        if key in wired:
+                            h.append(f"net {net} {lcec_net}")
+                        else:
+                            h.append(f"net {net} joint.{joint}.{key.split('.')[-1]} => {lcec_net}")
+            if not pid_driven:
+                h.append(f"# WARNING: pid.{cia}.output drives nothing – no torque pin in the comp, "
+                         f"no {pid_pdo:04X} PDO on slave {slave}")
+
+            # Auto-generate PDO nets (Tx ← lcec)
+            for obj, halpin in self.slaves.get(slave, {}).get("tx", []):
+                if self.enabled.get((slave, obj)):
+                    dst = self.hal_pin_name(cia, obj, halpin, self.pdo_pins.get((slave, obj)))
+                    if dst:
+                        lcec_net = f"lcec.0.{slave}.{halpin}"
+                        h.append(f"net {axis}-{halpin} {lcec_net} => {dst}")
+
+            h.append("")
+
+        # ==========================================
+        # TOUCH PROBE (drive latched position)
+        # ==========================================
+        if probe_axes:
+            h.append("# -------- TOUCH PROBE / drive latched position --------")
+            for line in PROBE_NETS:
+                h.append(line.format(slave=probe_slave))
+            h.append("")
+
+        return "\n".join(h)
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Headless HAL generator
+- Builds hal.hal from ethercat-conf.xml + cia402.comp + a mapping profile
+- Profiles are saved from the HAL Generator GUI ("💾 Save profile")
+- Several profiles can be generated in one run (CI regeneration)
+
+Usage:
+  python hal_gen.py PROFILE.json [PROFILE.json ...] [--xml FILE] [--comp FILE] [-o FILE]
+
+Paths stored in a profile ("xml", "comp", "output") are relative to the profile file.
+"""
+
+import argparse
+import json
+import os
+import sys
+
+import xml.etree.ElementTree as ET
+
+import profiling
+from hal_core import HalGenerator, parse_comp
+from lf_normalize import save_text
+
+# cia402.comp path -> (pins, params), parsed once per run
+_COMP_CACHE = {}
+
+
+def load_comp(path):
+    path = os.path.abspath(path)
+    if path not in _COMP_CACHE:
+        with open(path, encoding="utf-8") as f:
+            _COMP_CACHE[path] = parse_comp(f.read())
+    return _COMP_CACHE[path]
+
+
+def profile_path(profile_file, value):
+    """Resolve a path stored in a profile relative to the profile file."""
+    if not value or os.path.isabs(value):
+        return value
+    return os.path.join(os.path.dirname(os.path.abspath(profile_file)), value)
+
+
+def profile_relpath(profile_file, path):
+    """path as stored in a profile: relative to the profile file (absolute on another drive)."""
+    try:
+        return os.path.relpath(path, os.path.dirname(os.path.abspath(profile_file))).replace(os.sep, "/")
+    except ValueError:
+        return os.path.abspath(path)
+
+
+def generate(profile_file, xml=None, comp=None):
+    """(HAL file text, output path or None) for one profile; xml/comp override the profile."""
+    with open(profile_file, encoding="utf-8") as f:
+        profile = json.load(f)
+
+    xml = xml or profile_path(profile_file, profile.get("xml"))
+    comp = comp or profile_path(profile_file, profile.get("comp"))
+    if not xml or not comp:
+        raise ValueError(f"{profile_file}: ethercat-conf.xml and cia402.comp are required (--xml / --comp)")
+
+    pins, params = load_comp(comp)
+    # Same file text as the GUI's "Save HAL" and pipeline.py: trailing newline
+    hal = HalGenerator.from_profile(xml, pins, params, profile).generate_hal() + "\n"
+    return hal, profile_path(profile_file, profile.get("output"))
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Generate LinuxCNC HAL files from saved mapping profiles")
+    ap.add_argument("profiles", nargs="+", help="mapping profile(s) saved from the HAL Generator")
+    ap.add_argument("--xml", help="ethercat-conf.xml (overrides the profile)")
+    ap.add_argument("--comp", help="cia402.comp (overrides the profile)")
+    ap.add_argument("-o", "--output", help="output file (single profile only, default: profile's output or stdout)")
+    profiling.add_arguments(ap)
+    args = ap.parse_args(argv)
+    profiling.from_args(args)
+
+    if args.output and len(args.profiles) > 1:
+        ap.error("-o/--output needs a single profile")
+
+    failed = 0
+    for profile_file in args.profiles:
+        try:
+            hal, output = generate(profile_file, args.xml, args.comp)
+        except (OSError, ValueError, KeyError, ET.ParseError) as e:
+            print(f"❌ {profile_file}: {e}", file=sys.stderr)
+            failed += 1
+            continue
+
+        output = args.output or output
+        if output:
+            save_text(output, hal)
+            print(f"✅ {output}", file=sys.stderr)
+        else:
+            sys.stdout.write(hal)
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,884 @@
+#!/usr/bin/env python3
+"""
+HAL -> INI core (no GUI)
+- Single-pass HAL tokenizer and parser: joints, cia402 drives, motion links
+- Structural and semantic validation, watch mode, motion limits
+- INI rendering, parsing and merging
+Used by INI_Generator.py (GUI), config_check.py and pipeline.py.
+"""
+
+import os
+import re
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Dict, List, Set
+
+from profiling import timed
+
+
+# =====================
+# Data model
+# =====================
+
+@dataclass
+class ServoDrive:
+    name: str
+    joints: Set[int] = field(default_factory=set)
+    nets: Set[str] = field(default_factory=set)
+    params: Dict[str, str] = field(default_factory=dict)
+    roles: Dict[str, str] = field(default_factory=dict)   # pin role -> net
+
+@dataclass
+class Joint:
+    index: int
+    servos: Set[str] = field(default_factory=set)
+    nets: Set[str] = field(default_factory=set)
+    roles: Dict[str, str] = field(default_factory=dict)   # pin role -> net
+    motion_mode: str | None = None   # CSP / CSV / CST / UNKNOWN
+    axis_type: str | None = None     # LINEAR / ANGULAR
+
+@dataclass
+class HalStatement:
+    kind: str            # loadrt / addf / net / setp / sets / linkps / ...
+    args: List[str]
+    line: int            # first line of the statement (continuations joined)
+    text: str
+    file: str = ""       # "" for the top-level text, else the sourced file
+
+@dataclass
+class HalNet:
+    name: str
+    pins: Dict[str, str] = field(default_factory=dict)   # pin -> "out" / "in" / "io" / "" (no arrow)
+    lines: List[int] = field(default_factory=list)
+    value: str | None = None                             # sets
+
+    @property
+    def owners(self) -> Dict[str, List[str]]:
+        """joint.N / cia402.N / lcec.M.S / ... -> pins of this net"""
+        owners: Dict[str, List[str]] = {}
+        for pin in self.pins:
+            owners.setdefault(pin_owner(pin), []).append(pin)
+        return owners
+
+    @property
+    def writer(self) -> str | None:
+        return next((pin for pin, d in self.pins.items() if d == "out"), None)
+
+    @property
+    def readers(self) -> List[str]:
+        writer = self.writer
+        return [pin for pin in self.pins if pin != writer]
+
+@dataclass
+class HalModel:
+    joints: Dict[int, Joint] = field(default_factory=dict)
+    servos: Dict[str, ServoDrive] = field(default_factory=dict)
+    raw_lines: List[str] = field(default_factory=list)
+    statements: List[HalStatement] = field(default_factory=list)
+    nets: Dict[str, HalNet] = field(default_factory=dict)
+    pins: Dict[str, str] = field(default_factory=dict)             # pin -> net
+    params: Dict[str, str] = field(default_factory=dict)           # setp pin/param -> value
+    components: Dict[str, List[str]] = field(default_factory=dict)  # loadrt module -> args
+    functions: List[tuple] = field(default_factory=list)           # addf (funct, thread)
+    missing_sources: List[str] = field(default_factory=list)
+
+
+def pin_role(name: str) -> str:
+    """Role of a pin/param: last name component without case, "-" or "_" (motorposcmd)."""
+    return name.rpartition(".")[2].lower().replace("-", "").replace("_", "")
+
+# Owner of a pin: lcec.M.S (slave), <comp>.N (joint.N, cia402.N, pid.N ...) or the component name
+RE_OWNER = re.compile(r"lcec\.\d+\.\d+(?=\.)|[^.\s]+\.\d+(?=\.)|[^.\s]*")
+
+def pin_owner(pin: str) -> str:
+    """joint.N / cia402.N / lcec.M.S (slave) / other component instance owning a pin."""
+    return RE_OWNER.match(pin).group()
+
+
+# =====================
+# HAL tokenizer (single pass)
+# =====================
+
+# Net arrows: (direction of the pins before, direction of the pins after)
+HAL_ARROWS = {
+    "=>": ("out", "in"),
+    "<=": ("in", "out"),
+    "<=>": ("io", "io"),
+}
+
+def tokenize_hal(text: str, path: str = "", seen: Set[str] | None = None, cache: Dict[str, tuple] | None = None):
+    """
+    Yields one HalStatement per HAL command: comments stripped, backslash
+    continuations joined, `source`d files expanded in place (relative to path).
+    A sourced file that cannot be read is yielded as a "source" statement.
+    cache (abspath -> (text, statements)) keeps unchanged sourced files from being re-tokenized.
+    """
+    seen = set() if seen is None else seen
+    if path:
+        seen.add(os.path.abspath(path))
+
+    pending = ""
+    start = 0
+    for lineno, raw in enumerate(text.splitlines(), 1):
+        if "#" in raw:
+            raw = raw[:raw.index("#")]
+        line = raw.strip()
+        if line.endswith("\\"):
+            if not pending:
+                start = lineno
+            pending += line[:-1] + " "
+            continue
+        if pending:
+            line = " ".join((pending + line).split())
+            pending = ""
+        else:
+            start = lineno
+        if not line:
+            continue
+
+        words = line.split()
+        kind = words[0]
+        if kind == "source" and len(words) > 1:
+            src = os.path.join(os.path.dirname(path), words[1]) if path else words[1]
+            if os.path.abspath(src) in seen:
+                continue
+            try:
+                with open(src, "r", encoding="utf-8") as f:
+                    sub = f.read()
+            except OSError:
+                yield HalStatement(kind, words[1:], start, line, path)
+                continue
+            if cache is None:
+                yield from tokenize_hal(sub, src, seen)
+                continue
+            key = os.path.abspath(src)
+            if key not in cache or cache[key][0] != sub:
+                cache[key] = (sub, list(tokenize_hal(sub, src, seen, cache)))
+            yield from cache[key][1]
+            continue
+
+        yield HalStatement(kind, words[1:], start, line, path)
+
+
+# =====================
+# HAL parser
+# =====================
+
+# Pin owners linked into the model (joint.N, cia402.N)
+LINKED_OWNERS = ("joint.", "cia402.")
+
+class HalParser:
+    @timed("ini.parse_hal")
+    def parse(self, text: str, path: str = "", cache: Dict[str, tuple] | None = None) -> HalModel:
+        model = HalModel(raw_lines=text.splitlines())
+
+        axis_nets: Dict[str, Set[str]] = {}
+        axis_setp: Dict[str, Set[str]] = {}
+        axis_netlines: Dict[str, Set[str]] = {}
+
+        for st in tokenize_hal(text, path, cache=cache):
+            model.statements.append(st)
+            kind, args = st.kind, st.args
+
+            if kind == "net" and len(args) > 1:
+                net = self._net(model, args[0])
+                net.lines.append(st.line)
+                self._index_net(model, net, args[1:], st.text, axis_nets, axis_netlines)
+
+            elif kind in ("setp", "sets") and len(args) > 1:
+                value = " ".join(args[1:])
+                if kind == "sets":
+                    self._net(model, args[0]).value = value
+                    continue
+                model.params[args[0]] = value
+                if args[0].startswith("cia402."):
+                    name, _, param = args[0].rpartition(".")
+                    param = param.lower()
+                    axis_setp.setdefault(name, set()).add(f"{param}={value}")
+                    self._servo(model, name).params[param] = value
+
+            elif kind in ("linkps", "linksp") and len(args) > 1:
+                pin, netname = (args[0], args[-1]) if kind == "linkps" else (args[-1], args[0])
+                net = self._net(model, netname)
+                net.lines.append(st.line)
+                self._index_net(model, net, [pin], st.text, axis_nets, axis_netlines)
+
+            elif kind == "loadrt" and args:
+                model.components[args[0]] = args[1:]
+
+            elif kind == "addf" and args:
+                model.functions.append((args[0], args[1] if len(args) > 1 else ""))
+
+            elif kind == "source":
+                model.missing_sources.append(args[0])
+
+        # Joint <-> drive links through the nets they share: linear in the number of nets
+        net_servos: Dict[str, List[ServoDrive]] = {}
+        for s in model.servos.values():
+            for netname in s.nets:
+                net_servos.setdefault(netname, []).append(s)
+        for j in model.joints.values():
+            for netname in j.nets:
+                for s in net_servos.get(netname, ()):
+                    j.servos.add(s.name)
+                    s.joints.add(j.index)
+
+        model.axis_nets = axis_nets
+        model.axis_setp = axis_setp
+        model.axis_netlines = axis_netlines
+
+        return model
+
+    @staticmethod
+    def _net(model: HalModel, name: str) -> HalNet:
+        name = name.lower()
+        net = model.nets.get(name)
+        if net is None:
+            net = model.nets[name] = HalNet(name=name)
+        return net
+
+    @staticmethod
+    def _servo(model: HalModel, name: str) -> ServoDrive:
+        servo = model.servos.get(name)
+        if servo is None:
+            servo = model.servos[name] = ServoDrive(name=name)
+        return servo
+
+    def _index_net(self, model, net, tokens, text, axis_nets, axis_netlines):
+        """
+        Record the pins of a net (direction implied by its arrows, owner, role)
+        and attach it to the joints and cia402 drives among them.
+        """
+        netname = net.name
+        linked = False
+        pending = []
+        direction = ""
+
+        for pin in tokens:
+            arrow = HAL_ARROWS.get(pin)
+            if arrow:
+                for p in pending:
+                    net.pins[p] = arrow[0]
+                pending = []
+                direction = arrow[1]
+                continue
+            if direction:
+                net.pins[pin] = direction
+            else:
+                pending.append(pin)
+            model.pins[pin] = netname
+
+            if not pin.startswith(LINKED_OWNERS):
+                continue
+            comp, idx, _ = pin.split(".", 2)
+            if not idx.isdigit():
+                continue
+            if comp == "joint":
+                idx = int(idx)
+                node = model.joints.get(idx)
+                if node is None:
+                    node = model.joints[idx] = Joint(index=idx)
+            else:
+                node = self._servo(model, f"cia402.{idx}")
+            linked = True
+            node.nets.add(netname)
+            node.roles[pin_role(pin)] = netname
+
+        for p in pending:
+            net.pins.setdefault(p, "")
+
+        if linked and netname[0] in "xyzabuvw":
+            axis_nets.setdefault(netname[0], set()).add(netname)
+            axis_netlines.setdefault(netname[0], set()).add(text)
+
+
+# =====================
+# Analyzer (CSP/CSV/CST detection)
+# =====================
+
+# cia402 mode parameters (pin_role) -> motion mode
+MODE_PARAMS = {
+    "cspmode": "CSP",
+    "csvmode": "CSV",
+    "cstmode": "CST",
+}
+
+# Drive command pin role -> motion mode, checked in order when no mode parameter is set
+MODE_ROLES = [
+    ("torquecmd", "CST"),
+    ("velocitycmd", "CSV"),
+    ("poscmd", "CSP"),
+]
+
+# Drive PDO pin role fed straight from the joint's pid output -> motion mode
+#   (CST with a comp that has no torque pin: pid.N.output => lcec.0.S.target-torque)
+PID_PDO_ROLES = {
+    "targettorque": "CST",
+}
+
+class HalAnalyzer:
+    @timed("ini.analyze")
+    def analyze(self, model: HalModel):
+        for j in model.joints.values():
+            self._analyze_axis_type(j)
+            self._analyze_motion_mode(j, model)
+
+    def _analyze_axis_type(self, joint: Joint):
+        if any("deg" in net or "angle" in net for net in joint.nets):
+            joint.axis_type = "ANGULAR"
+        else:
+            joint.axis_type = "LINEAR"
+
+    def _analyze_motion_mode(self, joint: Joint, model: HalModel):
+        servos = [model.servos[name] for name in sorted(joint.servos) if name in model.servos]
+        for servo in servos:
+            for param, value in servo.params.items():
+                if value == "1" and pin_role(param) in MODE_PARAMS:
+                    joint.motion_mode = MODE_PARAMS[pin_role(param)]
+                    return
+
+        pids = {pin_owner(pin) for net in joint.nets for pin in model.nets[net].pins if pin.startswith("pid.")}
+        for pid in sorted(pids):
+            net = model.nets.get(model.pins.get(f"{pid}.output", ""))
+            for pin in (net.readers if net else ()):
+                if pin.startswith("lcec.") and pin_role(pin) in PID_PDO_ROLES:
+                    joint.motion_mode = PID_PDO_ROLES[pin_role(pin)]
+                    return
+
+        for role, mode in MODE_ROLES:
+            if any(role in servo.roles for servo in servos):
+                joint.motion_mode = mode
+                return
+
+        if "motorposcmd" in joint.roles:
+            joint.motion_mode = "CSP"
+        elif "velcmd" in joint.roles:
+            joint.motion_mode = "CSV"
+        else:
+            joint.motion_mode = "UNKNOWN"
+
+
+# =====================
+# Validator (separate section, no impact on INI)
+# =====================
+
+@dataclass
+class ValidationResult:
+    errors: List[str] = field(default_factory=list)
+    warnings: List[str] = field(default_factory=list)
+
+
+class HalValidator:
+    @timed("ini.validate")
+    def validate(self, model: HalModel) -> ValidationResult:
+        res = ValidationResult()
+
+        for j in model.joints.values():
+            if not j.servos:
+                res.errors.append(f"joint.{j.index} has no servo mapping")
+
+        for s in model.servos.values():
+            if not s.joints:
+                res.errors.append(f"{s.name} has no joint mapping")
+
+        for j in model.joints.values():
+            if j.motion_mode == "UNKNOWN":
+                res.warnings.append(f"joint.{j.index} motion mode UNKNOWN")
+
+        for src in model.missing_sources:
+            res.warnings.append(f"sourced file not found: {src}")
+
+        for s in model.servos.values():
+            if len(s.joints) > 1:
+                res.errors.append(f"{s.name} mapped to multiple joints: {sorted(s.joints)}")
+
+        for j in model.joints.values():
+            if len(j.servos) > 1:
+                res.errors.append(f"joint.{j.index} mapped to multiple servos: {sorted(j.servos)}")
+
+        return res
+
+
+# =====================
+# Semantic Validator
+# =====================
+
+def norm_line(line: str) -> str:
+    return re.sub(r"[0-9xyzabuvwXYZABUVW]", "", line).strip()
+
+# Pin roles (pin_role) each joint and its drive must have wired, per motion mode
+EXPECTED_NETS = {
+    "CSP": {
+        "joint": {"motorposcmd", "motorposfb", "ampenableout"},
+        "servo": {"poscmd", "posfb", "enable"},
+    },
+    "CSV": {
+        "joint": {"velcmd", "velfb", "ampenableout"},
+        "servo": {"velocitycmd", "velocityfb", "enable"},
+    },
+    "CST": {   # the torque command is on the drive (torquecmd) or goes pid -> lcec (PID_PDO_ROLES)
+        "joint": {"motorposcmd", "motorposfb", "ampenableout"},
+        "servo": {"posfb", "enable"},
+    }
+}
+
+
+class SemanticValidator:
+    @timed("ini.semantic_validate")
+    def validate(self, model: HalModel) -> Dict[str, object]:
+        result = {
+            "essential": True,
+            "expected": True,
+            "cohesion": True,
+            "unmatched": {}
+        }
+
+        for j in model.joints.values():
+            if not j.servos:
+                result["essential"] = False
+
+        for j in model.joints.values():
+            if j.motion_mode not in EXPECTED_NETS:
+                result["expected"] = False
+                continue
+
+            servo_name = next(iter(j.servos), None)
+            if not servo_name:
+                result["expected"] = False
+                continue
+
+            servo = model.servos.get(servo_name)
+            if not servo:
+                result["expected"] = False
+                continue
+
+            exp = EXPECTED_NETS[j.motion_mode]
+
+            if not exp["joint"] <= j.roles.keys() or not exp["servo"] <= servo.roles.keys():
+                result["expected"] = False
+
+        axis_netlines = getattr(model, "axis_netlines", {})
+
+        if axis_netlines:
+            ref = None
+            ref_norm = None
+
+            for axis, lines in axis_netlines.items():
+                normalized = {norm_line(l) for l in lines}
+
+                if ref is None:
+                    ref = axis
+                    ref_norm = normalized
+                    continue
+
+                if ref_norm != normalized:
+                    result["cohesion"] = False
+
+                    unmatched = set()
+                    for l in lines:
+                        if norm_line(l) not in ref_norm:
+                            unmatched.add(l)
+
+                    result["unmatched"][axis] = unmatched
+
+        return result
+
+
+# =====================
+# Watch mode
+# =====================
+
+WATCH_INTERVAL_MS = 100
+
+def file_stamp(path: str):
+    """(mtime_ns, size) of a file, None if it does not exist."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+def file_digest(path: str) -> str | None:
+    import hashlib   # hashlib / tempfile on first use keep `import ini_core` fast
+    try:
+        with open(path, "rb") as f:
+            return hashlib.sha1(f.read()).hexdigest()
+    except OSError:
+        return None
+
+
+class HalWatcher:
+    """
+    Polls a HAL file and the files it sources: mtime/size first, content hash
+    only when those moved. Only sourced files are incremental: the ones that did not
+    change are not re-tokenized. The main file always is, and the model is rebuilt from
+    all statements in one linear pass (about 20 ms for 10,000 lines); nets and joints
+    are not patched statement by statement.
+    """
+    def __init__(self, path: str, parser: HalParser):
+        self.path = os.path.abspath(path)
+        self.parser = parser
+        self.cache: Dict[str, tuple] = {}
+        self.files: Dict[str, tuple] = {}   # path -> (stamp, digest)
+
+    def load(self) -> HalModel:
+        with open(self.path, "r", encoding="utf-8") as f:
+            text = f.read()
+        model = self.parser.parse(text, self.path, cache=self.cache)
+        self.files = {p: (file_stamp(p), file_digest(p)) for p in self.watched(model)}
+        return model
+
+    def watched(self, model: HalModel) -> Set[str]:
+        """The HAL file, every file it sources and sourced files that do not exist yet."""
+        files = {self.path}
+        for st in model.statements:
+            base = st.file or self.path
+            files.add(os.path.abspath(base))
+            if st.kind == "source":
+                files.add(os.path.abspath(os.path.join(os.path.dirname(base), st.args[0])))
+        return files
+
+    def changed(self) -> bool:
+        changed = False
+        for path, (stamp, digest) in self.files.items():
+            new_stamp = file_stamp(path)
+            if new_stamp == stamp:
+                continue
+            new_digest = file_digest(path)
+            self.files[path] = (new_stamp, new_digest)
+            if new_digest != digest:
+                changed = True
+        return changed
+
+
+# =====================
+# Motion limits (servo period aware)
+# =====================
+
+S32_RANGE = 2 ** 31          # 607A / 6064 are signed 32-bit encoder counts
+FERROR_PERIODS = 20          # following error allowed at full speed, in servo periods
+MIN_FERROR_COUNTS = 100      # lower bound for FERROR / MIN_FERROR, in encoder counts
+
+# Drive / mechanics defaults: 3000 rpm, 24-bit encoder, 10 mm lead -> pos-scale 1677721.6
+LIMIT_DEFAULTS = {
+    "RATED_RPM": "3000",
+    "ENCODER_COUNTS": "16777216",
+    "LEAD": "10",
+    "RATIO": "1",
+    "ACCEL_TIME": "0.1",
+}
+
+def motion_limits(rated_rpm, counts_per_rev, lead, ratio=1.0, accel_time=0.1, servo_period_ns=1000000):
+    """
+    Joint limits a drive can reach. rated_rpm: motor speed, counts_per_rev: encoder
+    resolution, lead: machine units per load revolution, ratio: motor revolutions per
+    load revolution, accel_time: seconds from standstill to rated speed.
+    """
+    if min(rated_rpm, counts_per_rev, lead, ratio, accel_time, servo_period_ns) <= 0:
+        raise ValueError("rated speed, encoder counts, lead, ratio, accel time and servo period must be > 0")
+
+    period = servo_period_ns / 1e9
+    units_per_rev = lead / ratio
+    pos_scale = counts_per_rev / units_per_rev
+    max_velocity = rated_rpm / 60 * units_per_rev
+    ferror = max(max_velocity * period * FERROR_PERIODS, MIN_FERROR_COUNTS / pos_scale)
+    return {
+        "pos_scale": pos_scale,
+        "max_velocity": max_velocity,
+        "max_acceleration": max_velocity / accel_time,
+        "counts_per_period": max_velocity * pos_scale * period,
+        "s32_travel": S32_RANGE / pos_scale,
+        "s32_wrap_time": S32_RANGE / (max_velocity * pos_scale),
+        "ferror": ferror,
+        "min_ferror": max(ferror / 10, MIN_FERROR_COUNTS / pos_scale),
+        "servo_period": period,
+    }
+
+def fmt_limit(value: float) -> str:
+    return f"{value:.6f}".rstrip("0").rstrip(".")
+
+def limit_warnings(limits, velocity=None, min_limit=None, max_limit=None, pos_scale=None) -> List[str]:
+    """Configured feed / travel / HAL scale that do not fit the calculated limits."""
+    warnings = []
+    period = limits["servo_period"]
+    if velocity is not None and velocity > limits["max_velocity"]:
+        warnings.append(
+            f"MAX_VELOCITY {velocity:g} needs {velocity * limits['pos_scale'] * period:.0f} counts/period "
+            f"at SERVO_PERIOD {period * 1e9:.0f} ns, the drive reaches {limits['counts_per_period']:.0f} "
+            f"({limits['max_velocity']:g}/s)"
+        )
+    travel = [abs(v) for v in (min_limit, max_limit) if v is not None]
+    if travel and max(travel) >= limits["s32_travel"]:
+        travel = max(travel)
+        warnings.append(f"soft limit {travel:g} beyond the s32 position range ±{limits['s32_travel']:g} (607A/6064 wrap)")
+    if pos_scale and abs(pos_scale - limits["pos_scale"]) > limits["pos_scale"] * 1e-3:
+        warnings.append(f"HAL pos-scale {pos_scale:g} differs from the calculated {limits['pos_scale']:g} counts/unit")
+    return warnings
+
+
+# =====================
+# INI rendering
+# =====================
+
+INI_DEBOUNCE_MS = 30
+
+# Fixed sections in INI order; [AXIS_*]/[JOINT_*] follow the axis map
+INI_SECTION_ORDER = ["EMC", "DISPLAY", "KINS", "TASK", "EMCMOT", "TRAJ", "HAL", "EMCIO", "RS274NGC"]
+
+# Sections and their default values; [AXIS]/[JOINT] are the templates of every [AXIS_*]/[JOINT_*]
+INI_SECTIONS = {
+    "EMC": {"enabled": True, "fields": {
+        "MACHINE": "Generated_EtherCAT",
+        "DEBUG": "0",
+        "VERSION": "1.1",
+    }},
+    "TRAJ": {"enabled": True, "fields": {
+        "COORDINATES": "",
+        "LINEAR_UNITS": "mm",
+        "ANGULAR_UNITS": "degree",
+        "DEFAULT_LINEAR_VELOCITY": "5",
+        "MAX_LINEAR_VELOCITY": "50",
+    }},
+    "RS274NGC": {"enabled": True, "fields": {
+        "PARAMETER_FILE": "gcodeparam.var",
+    }},
+    "EMCMOT": {"enabled": True, "fields": {
+        "EMCMOT": "motmod",
+        "COMM_TIMEOUT": "1.0",
+        "SERVO_PERIOD": "1000000",
+        "HOMEMOD": "cia402_homecomp",
+    }},
+    "EMCIO": {"enabled": True, "fields": {
+        "EMCIO": "io",
+        "CYCLE_TIME": "0.100",
+    }},
+    "HAL": {"enabled": False, "fields": {
+        "HALFILE": "",
+        "HALUI": "halui",
+    }},
+    "JOINT": {"enabled": True, "fields": {
+        "TYPE": "LINEAR",
+        "HOME": "0",
+        "MIN_LIMIT": "-1000",
+        "MAX_LIMIT": "1000",
+        "MAX_VELOCITY": "50",
+        "MAX_ACCELERATION": "100",
+        "FERROR": "1000",
+        "MIN_FERROR": "1000",
+        "HOME_ABSOLUTE_ENCODER": "2",
+    }},
+    "AXIS": {"enabled": True, "fields": {
+        "MAX_VELOCITY": "50",
+        "MAX_ACCELERATION": "100",
+        "MIN_LIMIT": "-1000",
+        "MAX_LIMIT": "1000",
+    }},
+    "DISPLAY": {"enabled": True, "fields": {
+        "DISPLAY": "axis",
+        "EDITOR": "gedit",
+        "POSITION_OFFSET": "RELATIVE",
+        "POSITION_FEEDBACK": "ACTUAL",
+        "ARCDIVISION": "64",
+        "GRIDS": "10mm 20mm 50mm 100mm 1in 2in 5in 10in",
+        "MAX_FEED_OVERRIDE": "1.2",
+        "DEFAULT_LINEAR_VELOCITY": "5",
+        "MAX_ANGULAR_VELOCITY": "50",
+        "MIN_LINEAR_VELOCITY": "0",
+        "MAX_LINEAR_VELOCITY": "50",
+        "CYCLE_TIME": "0.100",
+        "INTRO_GRAPHIC": "linuxcnc.gif",
+        "INTRO_TIME": "1",
+        "INCREMENTS": "5mm 1mm .5mm .1mm .05mm .01mm .005mm",
+    }},
+    "KINS": {"enabled": True, "fields": {
+        "JOINTS": "",
+        "KINEMATICS": "",
+    }},
+    "TASK": {"enabled": True, "fields": {
+        "TASK": "milltask",
+        "CYCLE_TIME": "0.010",
+    }},
+}
+
+@lru_cache(maxsize=1024)
+def render_section(header: str, fields: tuple, strip: bool = False) -> str:
+    """[header] + "KEY = value" for every non-empty (KEY, value) field + blank line."""
+    out = [f"[{header}]"]
+    for k, v in fields:
+        if v.strip() != "":
+            out.append(f"{k} = {v.strip() if strip else v}")
+    out.append("")
+    return "\n".join(out)
+
+@timed("ini.ini_blocks")
+def ini_blocks(values: Dict[str, tuple], axis_map: Dict[str, List[int]]) -> List[tuple]:
+    """[(header, text)] of every enabled section; values: section -> (enabled, ((KEY, value), ...))."""
+    blocks = []
+    for name in INI_SECTION_ORDER:
+        enabled, fields = values[name]
+        if enabled:
+            blocks.append((name, render_section(name, fields)))
+
+    axis_enabled, axis_fields = values["AXIS"]
+    joint_enabled, joint_fields = values["JOINT"]
+    for axis, joint_list in axis_map.items():
+        if axis_enabled:
+            blocks.append((f"AXIS_{axis}", render_section(f"AXIS_{axis}", axis_fields, True)))
+        if joint_enabled:
+            for joint_idx in joint_list:
+                blocks.append((f"JOINT_{joint_idx}", render_section(f"JOINT_{joint_idx}", joint_fields, True)))
+    return blocks
+
+
+# =====================
+# INI merge (round trip)
+# =====================
+
+# Keys derived from the HAL model: always overwritten when merging into an existing INI
+GENERATED_KEYS = {
+    "KINS": {"JOINTS", "KINEMATICS"},
+    "TRAJ": {"COORDINATES"},
+    "HAL": {"HALFILE"},
+}
+
+RE_INI_SECTION = re.compile(r"^\s*\[([^\]]+)\]")
+RE_INI_KEY = re.compile(r"^(\s*)([^\s#;=\[][^=]*?)(\s*=\s*)(.*?)\s*$")
+
+def parse_ini(text: str) -> List[list]:
+    """
+    [[section, [lines]], ...] in file order (section None for lines before the first header).
+    Lines are kept verbatim, so comments, blank lines, order and unknown keys survive a merge.
+    """
+    doc = [[None, []]]
+    for line in text.splitlines():
+        m = RE_INI_SECTION.match(line)
+        if m:
+            doc.append([m.group(1).strip(), [line]])
+        else:
+            doc[-1][1].append(line)
+    return doc
+
+def ini_keys(lines: List[str]) -> Dict[str, str]:
+    """KEY -> value of the first occurrence of each key in a section's lines."""
+    keys = {}
+    for line in lines:
+        m = RE_INI_KEY.match(line)
+        if m and m.group(2) not in keys:
+            keys[m.group(2)] = m.group(4)
+    return keys
+
+@timed("ini.merge_ini")
+def merge_ini(existing: str, generated: str, owned: Dict[str, Set[str]] | None = None) -> str:
+    """
+    existing with the generated keys applied: an owned key (owned[section], all keys if
+    owned is None) overwrites the first occurrence of that key in its section, a missing
+    key is added after the section's last key, generated sections that do not exist yet
+    are appended. Everything else (hand-tuned values, comments, order) is kept.
+    """
+    newline = "\r\n" if "\r\n" in existing else "\n"
+    generated_keys = {sec: ini_keys(lines) for sec, lines in parse_ini(generated) if sec}
+    doc = parse_ini(existing)
+
+    merged = set()
+    for sec, lines in doc:
+        if sec not in generated_keys or sec in merged:
+            continue
+        merged.add(sec)
+        pending = dict(generated_keys[sec])
+        last_key = 0
+        for i, line in enumerate(lines):
+            m = RE_INI_KEY.match(line)
+            if not m:
+                continue
+            last_key = i
+            key = m.group(2)
+            if key not in pending:
+                continue
+            value = pending.pop(key)
+            if owned is None or key in owned.get(sec, ()):
+                lines[i] = f"{m.group(1)}{key}{m.group(3)}{value}"
+        lines[last_key + 1:last_key + 1] = [f"{k} = {v}" for k, v in pending.items()]
+
+    out = [line for _, lines in doc for line in lines]
+    for sec, keys in generated_keys.items():
+        if sec not in merged:
+            if out and out[-1].strip():
+                out.append("")
+            out.append(f"[{sec}]")
+            out.extend(f"{k} = {v}" for k, v in keys.items())
+    return newline.join(out) + newline
+
+def write_atomic(path: str, text: str) -> bool:
+    """
+    Atomically replace path with text, keeping its permissions (0644 for a new file);
+    False (nothing written) if the content is unchanged.
+    """
+    try:
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            if f.read() == text:
+                return False
+    except OSError:
+        pass
+    try:
+        mode = os.stat(path).st_mode & 0o7777
+    except OSError:
+        mode = 0o644
+
+    import tempfile
+    fd, tmp = tempfile.mkstemp(prefix=f".{os.path.basename(path)}-", dir=os.path.dirname(os.path.abspath(path)))
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8", newline="") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp, mode)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+    return True
+
+
+# =====================
+# Axis / joint mapping (gantry, tandem)
+# =====================
+
+AXIS_NAMES = "XYZABCUVW"
+
+# Axis letter of a net written by HAL_Generator: X-pos-cmd, Y2-pos-cmd -> Y
+RE_AXIS_NET = re.compile(r"^([xyzabcuvw])\d*-")
+
+def default_axis(idx: int) -> str:
+    """Axis letter of joint idx in a 1:1 mapping; trivkins has no letter past the ninth joint."""
+    if idx >= len(AXIS_NAMES):
+        raise ValueError(f"joint {idx}: trivkins has only {len(AXIS_NAMES)} axis letters ({AXIS_NAMES}), "
+                         "give every joint an axis letter (gantry mapping / \"joint_axes\")")
+    return AXIS_NAMES[idx]
+
+def hal_joint_axes(model: HalModel) -> Dict[int, str]:
+    """joint -> axis letter taken from its command/feedback net names."""
+    axes = {}
+    for idx in sorted(model.joints):
+        joint = model.joints[idx]
+        nets = [joint.roles[r] for r in ("motorposcmd", "velcmd", "motorposfb") if r in joint.roles]
+        matches = [m for m in map(RE_AXIS_NET.match, nets + sorted(joint.nets)) if m]
+        axes[idx] = matches[0].group(1).upper() if matches else default_axis(idx)
+    return axes
+
+def axis_table(joint_axes: Dict[int, str]) -> dict:
+    """
+    INI axis mapping for {joint: axis letter}. Any axis may own any number of joints
+    (Y Y gantry, X X, dual Z): axis -> joints, [TRAJ]COORDINATES and [KINS]KINEMATICS.
+    """
+    axis_map: Dict[str, List[int]] = {}
+    for idx in sorted(joint_axes):
+        if joint_axes[idx] not in AXIS_NAMES or len(joint_axes[idx]) != 1:
+            raise ValueError(f"joint {idx}: axis {joint_axes[idx]!r} is not a trivkins axis ({AXIS_NAMES})")
+        axis_map.setdefault(joint_axes[idx], []).append(idx)
+    letters = [joint_axes[idx] for idx in sorted(joint_axes)]
+    kinstype = " kinstype=both" if len(axis_map) < len(letters) else ""
+    return {
+        "axis_map": axis_map,
+        "coordinates": " ".join(letters),
+        "kinematics": f"trivkins{kinstype} coordinates={''.join(letters)}",
+    }
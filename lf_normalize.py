@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""
+Line ending + encoding normalizer (headless core of the DosStyle -> UTF-8 LF converter)
+- Text files end up as UTF-8 without BOM with LF line endings: CRLF / lone CR -> LF, UTF-8 BOM
+  stripped, UTF-16 (with BOM) and non-UTF-8 text (--encoding, cp1250 by default) re-encoded
+- Binary files (NUL byte in the first 8 KB) are skipped; LF / UTF-8 files are not rewritten
+- Files are streamed in chunks into a temp file that replaces the original atomically
+- Paths, folders (scanned with .gitignore rules, see scan_tree) and globs are processed in a thread pool
+- normalize_text() / save_text() are the pre-save hook of the generators
+
+Usage:
+  python lf_normalize.py PATH|GLOB [...] [--check] [--include "*.hal *.ini"] [--exclude GLOB ...]
+                         [--no-gitignore] [--encoding cp1250] [--jobs N] [-q]
+  --check changes nothing and exits 1 if a file would be rewritten (CI / pre-commit)
+"""
+
+import codecs
+import mmap
+import os
+import re
+import sys
+import tempfile
+from dataclasses import dataclass
+
+CHUNK_SIZE = 1 << 20        # bytes per read while converting
+BINARY_SNIFF = 8192         # a NUL byte in the first 8 KB marks a binary file (PNG, PDF, ...)
+FALLBACK_ENCODING = "cp1250"  # Windows editors on a Polish locale save "ANSI" text in it
+
+DEFAULT_INCLUDE = "*.hal *.ini *.xml *.ngc *.comp *.tbl *.var"
+ALWAYS_SKIP = {".git", ".hg", ".svn", "__pycache__"}
+STATUSES = ("converted", "needs_fix", "unchanged", "binary", "missing", "failed")
+
+
+# =========================
+# Text
+# =========================
+def normalize_text(text):
+    """text without a BOM and with CRLF / lone CR turned into LF."""
+    if text.startswith("\ufeff"):
+        text = text[1:]
+    return text.replace("\r\n", "\n").replace("\r", "\n") if "\r" in text else text
+
+def save_text(path, text):
+    """Writes text as UTF-8 / LF whatever the platform (text mode would write CRLF on Windows)."""
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        f.write(normalize_text(text))
+
+
+# =========================
+# Files
+# =========================
+def scan_file(file_path, encoding=FALLBACK_ENCODING):
+    """
+    (status, source encoding, reasons) without reading the file into memory; status is binary,
+    unchanged or convert. The source encoding is None when only line endings change.
+    """
+    with open(file_path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return "unchanged", None, []
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+            if m[:2] in (codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE):
+                return "convert", "utf-16", ["UTF-16"]
+            if m.find(b"\0", 0, BINARY_SNIFF) != -1:
+                return "binary", None, []
+
+            reasons = ["CRLF"] if m.find(b"\r") != -1 else []
+            source = None
+            decoder = codecs.getincrementaldecoder("utf-8")()
+            try:
+                for start in range(0, len(m), CHUNK_SIZE):
+                    decoder.decode(m[start:start + CHUNK_SIZE])
+                decoder.decode(b"", final=True)
+            except UnicodeDecodeError:
+                if not encoding:
+                    raise UnicodeError("not UTF-8 and no fallback encoding") from None
+                source = encoding
+                reasons.append(encoding)
+            if source is None and m[:3] == codecs.BOM_UTF8:
+                source = "utf-8-sig"
+                reasons.append("BOM")
+    return ("convert" if reasons else "unchanged"), source, reasons
+
+def convert_stream(src, dst):
+    """Copies src to dst in chunks with CRLF and lone CR turned into LF (binary or text streams)."""
+    carry = False
+    while True:
+        chunk = src.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        cr, lf = ("\r", "\n") if isinstance(chunk, str) else (b"\r", b"\n")
+        if carry:
+            chunk = cr + chunk
+        # A CR at the end may be the first half of a CRLF split across two chunks
+        carry = chunk.endswith(cr)
+        if carry:
+            chunk = chunk[:-1]
+        dst.write(chunk.replace(cr + lf, lf).replace(cr, lf))
+    if carry:
+        dst.write(lf)
+
+def normalize_file(file_path, check=False, encoding=FALLBACK_ENCODING):
+    """
+    (status, detail) for one file; status is one of STATUSES (needs_fix only with check=True),
+    detail the reasons ("CRLF, BOM") or the error.
+    """
+    if not os.path.isfile(file_path):
+        return "missing", None
+    try:
+        status, source, reasons = scan_file(file_path, encoding)
+        if status != "convert":
+            return status, None
+        if check:
+            return "needs_fix", ", ".join(reasons)
+
+        # Temp file next to the original + atomic rename: an interrupted run never truncates it
+        fd, tmp = tempfile.mkstemp(prefix=".lf-", dir=os.path.dirname(os.path.abspath(file_path)))
+        try:
+            if source is None:
+                with open(file_path, "rb") as src, os.fdopen(fd, "wb") as dst:
+                    convert_stream(src, dst)
+            else:
+                with open(file_path, encoding=source, newline="") as src, \
+                        os.fdopen(fd, "w", encoding="utf-8", newline="") as dst:
+                    convert_stream(src, dst)
+            os.chmod(tmp, os.stat(file_path).st_mode & 0o7777)
+            os.replace(tmp, file_path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        return "converted", ", ".join(reasons)
+    except (OSError, UnicodeError) as e:
+        return "failed", e
+
+def normalize_files(file_paths, check=False, encoding=FALLBACK_ENCODING, jobs=None, verbose=True, progress=None):
+    """
+    {status: [paths]} after normalizing the files in a thread pool (see normalize_file).
+    progress(done) is called after each file, on the calling thread.
+    """
+    from concurrent.futures import ThreadPoolExecutor   # not needed by the save hooks of the GUIs
+    results = {status: [] for status in STATUSES}
+    with ThreadPoolExecutor(jobs) as pool:
+        outcomes = pool.map(lambda p: normalize_file(p, check, encoding), file_paths)
+        for done, (file_path, (status, detail)) in enumerate(zip(file_paths, outcomes), 1):
+            results[status].append(file_path)
+            if progress:
+                progress(done)
+            if not verbose:
+                continue
+            if status == "missing":
+                print(f"File does not exist: {file_path}")
+            elif status == "failed":
+                print(f"Conversion failed: {file_path}: {detail}")
+            elif status in ("converted", "needs_fix"):
+                print(f"{'Converted' if status == 'converted' else 'Needs fixing'}: {file_path} ({detail})")
+    return results
+
+def summary(results):
+    lines = [f"Converted {len(results['converted'])} files"]
+    if results["needs_fix"]:
+        lines.append(f"Needs fixing: {len(results['needs_fix'])}")
+    lines += [f"Already UTF-8 LF: {len(results['unchanged'])}",
+              f"Skipped binary: {len(results['binary'])}",
+              f"Missing: {len(results['missing'])}",
+              f"Failed: {len(results['failed'])}"]
+    return "\n".join(lines)
+
+
+# =========================
+# Directory scan
+# =========================
+@dataclass(frozen=True)
+class FileEntry:
+    path: str
+    size: int
+
+def glob_regex(pattern):
+    """Regex source for a .gitignore-style glob on a "/"-separated relative path (*, ?, [..], **)."""
+    out, i = [], 0
+    while i < len(pattern):
+        if pattern.startswith("**/", i):
+            out.append("(?:.*/)?")
+            i += 3
+        elif pattern.startswith("**", i):
+            out.append(".*")
+            i += 2
+        elif pattern[i] == "*":
+            out.append("[^/]*")
+            i += 1
+        elif pattern[i] == "?":
+            out.append("[^/]")
+            i += 1
+        elif pattern[i] == "[" and "]" in pattern[i + 2:]:
+            end = pattern.index("]", i + 2)
+            body = pattern[i + 1:end]
+            out.append("[" + ("^" + body[1:] if body.startswith("!") else body).replace("\\", "\\\\") + "]")
+            i = end + 1
+        elif pattern[i] == "\\" and i + 1 < len(pattern):
+            out.append(re.escape(pattern[i + 1]))
+            i += 2
+        else:
+            out.append(re.escape(pattern[i]))
+            i += 1
+    return "".join(out)
+
+def parse_ignore(lines):
+    """[(regex, negate, dir_only)] of .gitignore lines; paths are matched relative to the file's directory."""
+    rules = []
+    for line in lines:
+        line = line.rstrip("\r\n")
+        if not line.strip() or line.startswith("#"):
+            continue
+        line = line.rstrip(" ") if not line.endswith("\\ ") else line
+        negate = line.startswith("!")
+        line = line[1:] if negate else line
+        dir_only = line.endswith("/")
+        line = line.rstrip("/")
+        # A slash at the start or in the middle anchors the pattern to the .gitignore directory
+        prefix = "" if "/" in line else "(?:.*/)?"
+        rules.append((re.compile(prefix + glob_regex(line.lstrip("/"))), negate, dir_only))
+    return rules
+
+def is_ignored(rel, is_dir, ignores):
+    """Last matching rule wins, from the top .gitignore down to the deepest one."""
+    ignored = False
+    for base, rules in ignores:
+        sub = rel[len(base):]
+        for regex, negate, dir_only in rules:
+            if (is_dir or not dir_only) and regex.fullmatch(sub):
+                ignored = not negate
+    return ignored
+
+def scan_tree(top, include=(), exclude=(), gitignore=True, stop=None):
+    """
+    FileEntry of every file under top (os.scandir, depth first, sorted by name) whose
+    relative path matches one of the include globs (all files if none) and is not
+    matched by an exclude glob or a .gitignore rule. Ignored directories are not entered.
+    """
+    includes = [re.compile("(?:.*/)?" + glob_regex(p.lstrip("/")), re.IGNORECASE) for p in include]
+    stack = [(top, "", [("", parse_ignore(exclude))])]
+    while stack:
+        path, rel, ignores = stack.pop()
+        if stop is not None and stop.is_set():
+            return
+        if gitignore:
+            try:
+                with open(os.path.join(path, ".gitignore"), encoding="utf-8", errors="replace") as f:
+                    ignores = ignores + [(rel, parse_ignore(f))]
+            except OSError:
+                pass
+        try:
+            with os.scandir(path) as it:
+                entries = sorted(it, key=lambda e: e.name)
+        except OSError:
+            continue
+
+        subdirs = []
+        for entry in entries:
+            entry_rel = rel + entry.name
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.name not in ALWAYS_SKIP and not is_ignored(entry_rel, True, ignores):
+                        subdirs.append((entry.path, entry_rel + "/", ignores))
+                elif entry.is_file() and not is_ignored(entry_rel, False, ignores):
+                    if not includes or any(r.fullmatch(entry_rel) for r in includes):
+                        yield FileEntry(entry.path, entry.stat().st_size)
+            except OSError:
+                continue
+        stack.extend(reversed(subdirs))
+
+def expand_paths(args, include=(), exclude=(), gitignore=True):
+    """Files named by args: folders are scanned (scan_tree), globs expanded, missing paths / globs kept as given."""
+    import glob
+    out = {}
+    for arg in args:
+        if any(c in arg for c in "*?[") and not os.path.exists(arg):
+            paths = sorted(glob.glob(arg, recursive=True)) or [arg]   # no match: reported missing
+        else:
+            paths = [arg]
+        for path in paths:
+            if os.path.isdir(path):
+                out.update((e.path, None) for e in scan_tree(path, include, exclude, gitignore))
+            else:
+                out[path] = None
+    return list(out)
+
+
+# =========================
+# CLI
+# =========================
+def main(argv=None):
+    import argparse
+    ap = argparse.ArgumentParser(description="Normalize text files to UTF-8 without BOM and LF line endings")
+    ap.add_argument("paths", nargs="+", help="files, folders or globs (quote them, ** is recursive)")
+    ap.add_argument("--check", action="store_true", help="change nothing, exit 1 if a file needs fixing")
+    ap.add_argument("--include", default=DEFAULT_INCLUDE,
+                    help=f'globs of files taken from folders (default "{DEFAULT_INCLUDE}", "" for all)')
+    ap.add_argument("--exclude", action="append", default=[], help="glob to leave out of folders (repeatable)")
+    ap.add_argument("--no-gitignore", action="store_true", help="also take files ignored by .gitignore")
+    ap.add_argument("--encoding", default=FALLBACK_ENCODING,
+                    help=f"encoding of files that are not UTF-8 (default {FALLBACK_ENCODING}, '' to fail instead)")
+    ap.add_argument("--jobs", type=int, help="worker threads (default: CPU based)")
+    ap.add_argument("-q", "--quiet", action="store_true", help="only print the summary")
+    args = ap.parse_args(argv)
+
+    files = expand_paths(args.paths, args.include.split(), args.exclude, not args.no_gitignore)
+    results = normalize_files(files, args.check, args.encoding or None, args.jobs, not args.quiet)
+    print(summary(results), file=sys.stderr)
+    return 1 if results["failed"] or results["missing"] or results["needs_fix"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,508 @@
+#!/usr/bin/env python3
+"""
+ESI → ethercat-conf.xml → HAL → INI in one process
+- The stages share one model in memory: the XML tree goes straight into the HAL
+  generator, its joint/axis table straight into the INI (nothing is re-read or re-parsed)
+- The three files are written once at the end, and only if their content changed
+- Stages whose inputs did not change since the last run are skipped (MACHINE.state.json)
+- Every generated text is kept in a content-addressed cache keyed by its inputs (ESI bytes,
+  options, comp file, mapping profile, generator version) and reused by any machine / run
+
+Usage:
+  python pipeline.py MACHINE.json [MACHINE.json ...] [--force] [--cache DIR | --no-cache]
+
+Machine file (paths are relative to it):
+  {
+    "esi": "LC10E.xml",                 ESI of the drive
+    "drives": 3,                        drive slaves 1..N (copies of the ESI drive)
+    "mode": "CSP",                      CSP / CSV / CST
+    "feedforward": false, "probe": false,
+    "prune": false,                     drop PDO entries the generated HAL does not use
+    "sdo": {"homing_method": "35"},     drive SDO init (SDO_PROFILE keys, optional)
+    "comp": "cia402.comp",              or the parsed comp: {"pins": [...], "params": [...]}
+    "hal": {"axes": {"X": 1, "Y": 2, "Z": 3}},      mapping profile as saved by the HAL Generator
+    "joint_axes": "X Y Y Z",            joint -> INI axis letter (default: from the HAL axes)
+    "ini": {"EMC": {"MACHINE": "mill"}},            INI field overrides
+    "output": {"xml": "ethercat-conf.xml", "hal": "hal.hal", "ini": "machine.ini"}
+  }
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import time
+import xml.etree.ElementTree as ET
+
+import drive_profiles
+import hal_core
+import ini_core
+import profiling
+import xml_core
+from config_check import check_project
+from hal_core import HalGenerator
+from hal_gen import load_comp, profile_path
+from ini_core import (
+    GENERATED_KEYS, INI_SECTIONS, axis_table, ini_blocks, merge_ini, write_atomic,
+)
+from xml_core import (
+    duplicate_slave, esi_to_xml, parse_int, prune_pdos, read_esi, reduce_pdos, rename_pins, scale_floats,
+    sdo_commands, set_sdo_config, xml_text,
+)
+
+STAGES = ["xml", "hal", "ini"]
+
+DEFAULT_OUTPUT = {"xml": "ethercat-conf.xml", "hal": "hal.hal", "ini": "machine.ini"}
+
+CACHE_DIR = os.environ.get("ETHERCAT_GEN_CACHE", os.path.join(os.path.expanduser("~"), ".cache", "ethercat-gen"))
+CACHE_MAX_MB = 64
+
+
+# =====================
+# Stage keys
+# =====================
+
+def digest(*parts) -> str:
+    """sha256 of bytes / JSON-able parts."""
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(part if isinstance(part, bytes) else json.dumps(part, sort_keys=True).encode())
+        h.update(b"\0")
+    return h.hexdigest()
+
+def read_bytes(path) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+# A new generator version or drive profile invalidates every stage
+CODE_KEY = digest(*(read_bytes(f) for f in (xml_core.__file__, hal_core.__file__, ini_core.__file__,
+                                            drive_profiles.__file__, *drive_profiles.SOURCES, __file__)))
+
+# ESI path -> {"key": sha256 of the file, "esi": read_esi() dict, parsed when a stage needs it}
+_ESI_CACHE = {}
+
+def esi_entry(path, parse=False) -> dict:
+    path = os.path.abspath(path)
+    if path not in _ESI_CACHE:
+        _ESI_CACHE[path] = {"key": digest(read_bytes(path)), "esi": None}
+    entry = _ESI_CACHE[path]
+    if parse and entry["esi"] is None:
+        with profiling.stage("pipeline.parse_esi"):
+            tree = ET.parse(path)
+        entry["esi"] = read_esi(tree.getroot())
+    return entry
+
+def state_path(machine_file):
+    return os.path.splitext(machine_file)[0] + ".state.json"
+
+def load_state(machine_file) -> dict:
+    try:
+        with open(state_path(machine_file), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+# =====================
+# Output cache
+# =====================
+
+class OutputCache:
+    """
+    Generated stage results by stage key, one JSON file per key (DIR/ab/abcd...json).
+    A hit refreshes the file's mtime; evict() drops the least recently used entries.
+    """
+    def __init__(self, path: str):
+        self.path = path
+
+    def _file(self, key):
+        return os.path.join(self.path, key[:2], key + ".json")
+
+    def get(self, key) -> dict | None:
+        try:
+            with open(self._file(key), encoding="utf-8") as f:
+                entry = json.load(f)
+            os.utime(self._file(key))
+            return entry
+        except (OSError, ValueError):
+            return None
+
+    def put(self, key, entry: dict):
+        path = self._file(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(prefix=".cache-", dir=os.path.dirname(path))
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(entry, f)
+        os.replace(tmp, path)
+
+    def entries(self):
+        """[(mtime, bytes, path)] of all entries, oldest first."""
+        out = []
+        for root, _, files in os.walk(self.path):
+            for name in files:
+                if name.endswith(".json"):
+                    st = os.stat(os.path.join(root, name))
+                    out.append((st.st_mtime, st.st_size, os.path.join(root, name)))
+        return sorted(out)
+
+    def evict(self, max_bytes) -> int:
+        """Remove least recently used entries until the cache fits max_bytes; number removed."""
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in entries:
+            if total <= max_bytes:
+                break
+            try:
+                os.unlink(path)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        return removed
+
+    def stats(self) -> dict:
+        entries = self.entries()
+        return {"entries": len(entries), "bytes": sum(size for _, size, _ in entries)}
+
+
+# =====================
+# Stages
+# =====================
+
+def build_xml(machine, esi):
+    """(<masters> tree, skipped objects): converted, renamed, reduced to the mode, N drives, SDO init."""
+    root = ET.fromstring(esi_to_xml(esi))
+    rename_pins(root, esi)
+    skipped = reduce_pdos(root, machine.get("mode", "CSP"), esi,
+                          machine.get("feedforward", False), machine.get("probe", False))
+    for _ in range(int(machine.get("drives", 1)) - 1):
+        duplicate_slave(root)
+
+    if machine.get("sdo"):
+        period = parse_int(root.find(".//master").attrib.get("appTimePeriod"))
+        cmds = sdo_commands(machine["sdo"], period, esi["objects"])
+        for slave in root.findall(".//slave"):
+            if slave.find("syncManager") is not None:
+                set_sdo_config(slave, cmds)
+    return root, skipped
+
+def hal_dependent(machine):
+    """The XML depends on the HAL: pruned to its nets, float entries scaled to its pos-scale."""
+    return any(machine.get(k) for k in ("prune", "feedforward", "probe"))
+
+def build_hal(machine, root, comp):
+    profile = dict(machine.get("hal", {}))
+    profile.setdefault("mode", machine.get("mode", "CSP"))
+    profile.setdefault("probe", machine.get("probe", False))
+    pins, params = comp
+    return HalGenerator.from_profile(root, pins, params, profile)
+
+def build_ini(machine, joint_axes, halfile):
+    """(INI text, owned keys per section) for {joint: axis letter}."""
+    fields = {name: dict(sec["fields"]) for name, sec in INI_SECTIONS.items()}
+    enabled = {name: sec["enabled"] for name, sec in INI_SECTIONS.items()}
+    overrides = machine.get("ini", {})
+    for name, keys in overrides.items():
+        if name not in fields:
+            raise ValueError(f"unknown INI section [{name}]")
+        fields[name].update({k: str(v) for k, v in keys.items()})
+
+    table = axis_table(joint_axes)
+    fields["KINS"].update(JOINTS=str(len(joint_axes)), KINEMATICS=table["kinematics"])
+    fields["TRAJ"]["COORDINATES"] = table["coordinates"]
+    fields["HAL"]["HALFILE"] = halfile
+    enabled["HAL"] = True
+
+    values = {name: (enabled[name], tuple(fields[name].items())) for name in fields}
+    blocks = ini_blocks(values, table["axis_map"])
+
+    owned = {}
+    for header, _ in blocks:
+        name = header.split("_")[0] if header.startswith(("AXIS_", "JOINT_")) else header
+        owned[header] = GENERATED_KEYS.get(name, set()) | set(overrides.get(name, {}))
+    return "\n".join(text for _, text in blocks), owned
+
+
+# =====================
+# Pipeline
+# =====================
+
+def run(machine_file, force=False, machine=None, cache=None):
+    """
+    [(stage, path, status, ms, cached)] with status "skipped" / "written" / "unchanged";
+    cached: the text came from cache (an OutputCache, None = no cache).
+    machine: the machine dict if it is not read from machine_file (paths stay relative to it).
+    """
+    if machine is None:
+        with open(machine_file, encoding="utf-8") as f:
+            machine = json.load(f)
+
+    def path(key):
+        value = profile_path(machine_file, machine.get(key))
+        if not value:
+            raise ValueError(f"{machine_file}: \"{key}\" is required")
+        return value
+
+    outputs = {stage: profile_path(machine_file, machine.get("output", {}).get(stage, DEFAULT_OUTPUT[stage]))
+               for stage in STAGES}
+    esi_path = path("esi")
+    if isinstance(machine.get("comp"), dict):
+        comp = machine["comp"].get("pins", []), machine["comp"].get("params", [])
+        comp_key = digest(machine["comp"])
+    else:
+        comp = load_comp(path("comp"))
+        comp_key = digest(read_bytes(path("comp")))
+    state = {} if force else load_state(machine_file)
+
+    keys = {}
+    keys["xml"] = digest(CODE_KEY, esi_entry(esi_path)["key"],
+                         {k: machine.get(k) for k in ("mode", "feedforward", "probe", "drives", "sdo", "prune")})
+    if hal_dependent(machine):
+        keys["xml"] = digest(keys["xml"], comp_key, machine.get("hal", {}))   # pruned / scaled to that HAL
+    keys["hal"] = digest(keys["xml"], comp_key, machine.get("hal", {}))
+    keys["ini"] = digest(keys["hal"], machine.get("joint_axes"), machine.get("ini", {}), outputs["hal"])
+
+    def fresh(stage):
+        if stage == "hal" and "joint_axes" not in state:
+            return False
+        return state.get(stage) == keys[stage] and os.path.exists(outputs[stage])
+
+    def cached(stage):
+        entry = cache.get(keys[stage]) if cache else None
+        if entry is not None:
+            hits.add(stage)
+        return entry
+
+    def store(stage, entry):
+        if cache:
+            cache.put(keys[stage], entry)
+
+    status, texts, ms, hits = {}, {}, {}, set()
+    root = joint_axes = gen = None
+
+    t = time.perf_counter()
+    if fresh("xml"):
+        status["xml"] = "skipped"
+    elif entry := cached("xml"):
+        texts["xml"] = entry["text"]
+    else:
+        esi = esi_entry(esi_path, parse=True)["esi"]
+        root, skipped = build_xml(machine, esi)
+        if hal_dependent(machine):
+            # Neither step changes the nets, so this HAL is also the final one
+            gen = build_hal(machine, root, comp)
+            scale_floats(root, gen.pos_scales(), esi)
+        if machine.get("prune"):
+            # The HAL profile may override the machine's mode: prune to the one the HAL uses
+            removed = prune_pdos(root, gen.generate_hal(), gen.mode)
+            if removed:
+                print(f"✂ {machine_file}: pruned {len(removed)} PDO entries the HAL does not use, "
+                      f"{sum(bits for *_, bits in removed) / 8:g} bytes/cycle less", file=sys.stderr)
+        texts["xml"] = xml_text(root)
+        store("xml", {"text": texts["xml"]})
+        if skipped:
+            print(f"⚠ {machine_file}: not PDO-mappable on this drive: {', '.join(sorted(skipped))}",
+                  file=sys.stderr)
+    ms["xml"] = time.perf_counter() - t
+
+    t = time.perf_counter()
+    if fresh("hal"):
+        status["hal"] = "skipped"
+        joint_axes = {int(j): a for j, a in state["joint_axes"].items()}
+    elif entry := cached("hal"):
+        texts["hal"] = entry["text"]
+        joint_axes = {int(j): a for j, a in entry["joint_axes"].items()}
+    else:
+        if root is None and "xml" in texts:
+            root = ET.fromstring(texts["xml"])
+        elif root is None:
+            root = ET.parse(outputs["xml"]).getroot()   # unchanged XML of the last run
+        gen = gen or build_hal(machine, root, comp)
+        texts["hal"] = gen.generate_hal() + "\n"   # as "Save HAL" writes it (Tk text ends with a newline)
+        joint_axes = gen.joint_axes()
+        store("hal", {"text": texts["hal"], "joint_axes": {str(j): a for j, a in joint_axes.items()}})
+    ms["hal"] = time.perf_counter() - t
+
+    t = time.perf_counter()
+    if fresh("ini"):
+        status["ini"] = "skipped"
+    elif entry := cached("ini"):
+        ini, owned = entry["text"], {sec: set(keys) for sec, keys in entry["owned"].items()}
+    else:
+        ini_axes = joint_axes
+        if machine.get("joint_axes"):
+            letters = machine["joint_axes"].upper().split()
+            if len(letters) != len(joint_axes):
+                raise ValueError(f"{machine_file}: joint_axes has {len(letters)} letters for {len(joint_axes)} joints")
+            ini_axes = dict(zip(sorted(joint_axes), letters))
+        ini, owned = build_ini(machine, ini_axes, os.path.basename(outputs["hal"]))
+        store("ini", {"text": ini, "owned": {sec: sorted(keys) for sec, keys in owned.items()}})
+    if "ini" not in status:
+        if os.path.exists(outputs["ini"]):
+            with open(outputs["ini"], "r", encoding="utf-8", newline="") as f:
+                ini = merge_ini(f.read(), ini, owned)
+        texts["ini"] = ini
+    ms["ini"] = time.perf_counter() - t
+
+    # All stages succeeded - write the files once at the end
+    results = []
+    for stage in STAGES:
+        t = time.perf_counter()
+        if stage in texts:
+            os.makedirs(os.path.dirname(os.path.abspath(outputs[stage])), exist_ok=True)
+            status[stage] = "written" if write_atomic(outputs[stage], texts[stage]) else "unchanged"
+        ms[stage] += time.perf_counter() - t
+        results.append((stage, outputs[stage], status[stage], ms[stage] * 1000, stage in hits))
+
+    state = {stage: keys[stage] for stage in STAGES}
+    state["joint_axes"] = {str(j): a for j, a in joint_axes.items()}
+    write_atomic(state_path(machine_file), json.dumps(state, indent=1))
+    return results
+
+
+# =====================
+# Fleet (manifest of machines)
+# =====================
+
+def load_manifest(manifest_file):
+    """
+    [(machine_file, machine)] of a manifest {"defaults": {...}, "machines": [...]}. A machine is
+    a machine file or an inline machine with a "name" (outputs in NAME/ next to the manifest);
+    each one is applied on top of the defaults.
+    """
+    with open(manifest_file, encoding="utf-8") as f:
+        manifest = json.load(f)
+    defaults = dict(manifest.get("defaults", {}))
+    for key in ("esi", "comp"):
+        if isinstance(defaults.get(key), str):
+            defaults[key] = os.path.abspath(profile_path(manifest_file, defaults[key]))
+
+    machines = []
+    for entry in manifest.get("machines", []):
+        if isinstance(entry, str):
+            machine_file = profile_path(manifest_file, entry)
+            with open(machine_file, encoding="utf-8") as f:
+                entry = json.load(f)
+        elif entry.get("name"):
+            machine_file = profile_path(manifest_file, os.path.join(entry["name"], entry["name"] + ".json"))
+        else:
+            raise ValueError(f"{manifest_file}: inline machines need a \"name\"")
+        machines.append((machine_file, dict(defaults, **entry)))
+    return machines
+
+def _init_worker(esi_cache):
+    _ESI_CACHE.update(esi_cache)
+
+def build_machine(machine_file, machine, force=False, cache_dir=None):
+    """Fleet task: (stage results, ms, [(level, issue)], error) of one machine."""
+    t = time.perf_counter()
+    try:
+        results = run(machine_file, force, machine, OutputCache(cache_dir) if cache_dir else None)
+        ini = next(row[1] for row in results if row[0] == "ini")
+        issues = [(i.level, str(i)) for i in check_project(ini)]
+    except (OSError, ValueError, KeyError, ET.ParseError) as e:
+        return [], (time.perf_counter() - t) * 1000, [], str(e)
+    return results, (time.perf_counter() - t) * 1000, issues, None
+
+def fleet(manifest_file, jobs=None, force=False, cache_dir=None):
+    """[(machine_file, build_machine() result)] in manifest order, built in a process pool."""
+    from concurrent.futures import ProcessPoolExecutor   # multiprocessing only for fleet builds
+    machines = load_manifest(manifest_file)
+
+    # Every distinct ESI is parsed once here and handed to all workers
+    for machine_file, machine in machines:
+        if machine.get("esi"):
+            try:
+                esi_entry(profile_path(machine_file, machine["esi"]), parse=True)
+            except (OSError, ET.ParseError):
+                pass   # reported by the machine's own build
+
+    with ProcessPoolExecutor(jobs, initializer=_init_worker, initargs=(dict(_ESI_CACHE),)) as pool:
+        futures = [pool.submit(build_machine, machine_file, machine, force, cache_dir) for machine_file, machine in machines]
+        return [(machine_file, future.result()) for (machine_file, _), future in zip(machines, futures)]
+
+def print_fleet(results):
+    """Per-machine summary; number of machines that failed or have config errors."""
+    failed = 0
+    for machine_file, (stages, ms, issues, error) in results:
+        name = os.path.splitext(os.path.basename(machine_file))[0]
+        errors = sum(1 for level, _ in issues if level == "error")
+        warnings = len(issues) - errors
+        if error:
+            print(f"❌ {name:20} {ms:7.1f} ms  {error}")
+            failed += 1
+            continue
+        changed = ", ".join(row[0] for row in stages if row[2] == "written") or "-"
+        check = "valid" if not issues else f"{errors} errors, {warnings} warnings"
+        print(f"{'❌' if errors else '✅'} {name:20} {ms:7.1f} ms  {check:22} changed: {changed}")
+        for _, issue in issues:
+            print(f"   {issue}")
+        failed += bool(errors)
+    return failed
+
+
+def cache_summary(cache, results, max_mb):
+    """One line of cache statistics after evicting down to max_mb."""
+    rows = [row for row in results if row[2] != "skipped"]
+    hits = sum(1 for row in rows if row[4])
+    evicted = cache.evict(max_mb * 1024 * 1024)
+    stats = cache.stats()
+    return (f"cache: {hits}/{len(rows)} hits, {stats['entries']} entries, {stats['bytes'] / 1024:.0f} kB, "
+            f"{evicted} evicted ({cache.path})")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Build ethercat-conf.xml, HAL and INI of LinuxCNC machines from the ESI")
+    ap.add_argument("machines", nargs="*", help="machine file(s), see the module docstring")
+    ap.add_argument("--manifest", action="append", default=[], help="fleet manifest, machines built in parallel")
+    ap.add_argument("-j", "--jobs", type=int, help="worker processes for --manifest (default: CPU count)")
+    ap.add_argument("--force", action="store_true", help="ignore the last-run state (with --no-cache: regenerate everything)")
+    ap.add_argument("--cache", default=CACHE_DIR, help=f"output cache directory (default: {CACHE_DIR})")
+    ap.add_argument("--no-cache", action="store_true", help="always generate, do not read or fill the cache")
+    ap.add_argument("--cache-size", type=int, default=CACHE_MAX_MB, help="cache size limit in MB (LRU eviction)")
+    profiling.add_arguments(ap)
+    args = ap.parse_args(argv)
+    profiling.from_args(args)
+    if not args.machines and not args.manifest:
+        ap.error("give machine files or --manifest")
+
+    cache_dir = None if args.no_cache else args.cache
+    cache = OutputCache(cache_dir) if cache_dir else None
+    failed = 0
+    all_results = []
+    for machine_file in args.machines:
+        t = time.perf_counter()
+        try:
+            results = run(machine_file, args.force, cache=cache)
+        except (OSError, ValueError, KeyError, ET.ParseError) as e:
+            print(f"❌ {machine_file}: {e}", file=sys.stderr)
+            failed += 1
+            continue
+        all_results += results
+        print(f"✅ {machine_file} ({(time.perf_counter() - t) * 1000:.1f} ms)")
+        for stage, path, status, ms, cached in results:
+            print(f"   {stage:4} {status:9} {ms:6.1f} ms  {path}{'  (cache)' if cached else ''}")
+
+    for manifest_file in args.manifest:
+        t = time.perf_counter()
+        try:
+            results = fleet(manifest_file, args.jobs, args.force, cache_dir)
+        except (OSError, ValueError) as e:
+            print(f"❌ {manifest_file}: {e}", file=sys.stderr)
+            failed += 1
+            continue
+        for _, (stages, _, _, _) in results:
+            all_results += stages
+        failed += print_fleet(results)
+        print(f"{manifest_file}: {len(results)} machines in {(time.perf_counter() - t) * 1000:.1f} ms")
+
+    if cache:
+        print(cache_summary(cache, all_results, args.cache_size))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
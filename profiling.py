@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Per-stage timers and counters for all tools (opt-in)
+- @timed("stage") on a function or method, stage("name") around a block, laps("prefix") for
+  consecutive steps of one method, count("name", n) for sizes (rows, widgets, characters)
+- Enabled by ETHERCAT_GEN_PROFILE=1 (breakdown on stderr at exit) or ETHERCAT_GEN_PROFILE=FILE.json,
+  or by the command line tools' --profile / --profile-json FILE / --cprofile STAGE options
+- ETHERCAT_GEN_CPROFILE=STAGE[,STAGE] runs the next call of that stage under cProfile: top functions
+  on stderr, full stats in STAGE.prof (open with snakeviz / pstats)
+
+Disabled, @timed returns the function itself and stage() / laps() hand out shared no-ops, so the
+hooks cost nothing. enable() later swaps the registered functions for timed ones.
+
+Usage:
+  ETHERCAT_GEN_PROFILE=1 python HAL_Generator.py
+  ETHERCAT_GEN_PROFILE=xml.json ETHERCAT_GEN_CPROFILE=xml.esi_to_xml python XML_Generator.py
+  python pipeline.py machine.json --profile --cprofile hal.generate_hal
+"""
+
+import atexit
+import os
+import sys
+import time
+from functools import wraps
+
+ENV = "ETHERCAT_GEN_PROFILE"
+ENV_CPROFILE = "ETHERCAT_GEN_CPROFILE"
+CPROFILE_LINES = 15
+
+_enabled = False
+_output = None        # None: table on stderr, else JSON file
+_cprofile = set()     # stages to capture once
+_times = {}           # stage -> [calls, total s, max s]
+_counters = {}        # name -> total
+_hooks = []           # (function, stage) registered while disabled
+
+
+def _noop(name):
+    pass
+
+class _Null:
+    def __enter__(self):
+        return None
+
+    def __exit__(self, *exc):
+        return False
+
+_NULL = _Null()
+
+
+# =========================
+# Hooks
+# =========================
+def timed(name):
+    """Decorator: time every call of the function as stage `name`."""
+    def decorate(fn):
+        if _enabled:
+            return _wrap(fn, name)
+        _hooks.append((fn, name))
+        return fn
+    return decorate
+
+def stage(name):
+    """Context manager timing a block as stage `name`."""
+    return _stage(name) if _enabled else _NULL
+
+def laps(prefix):
+    """lap(name) records the time since the previous lap (or since laps()) as stage prefix.name."""
+    if not _enabled:
+        return _noop
+    last = [time.perf_counter()]
+
+    def lap(name):
+        now = time.perf_counter()
+        _add(f"{prefix}.{name}", now - last[0])
+        last[0] = now
+    return lap
+
+def count(name, n=1):
+    if _enabled:
+        _counters[name] = _counters.get(name, 0) + n
+
+
+def _add(name, seconds):
+    entry = _times.setdefault(name, [0, 0.0, 0.0])
+    entry[0] += 1
+    entry[1] += seconds
+    entry[2] = max(entry[2], seconds)
+
+class _stage:
+    def __init__(self, name):
+        self.name = name
+        self.prof = None
+
+    def __enter__(self):
+        if self.name in _cprofile:
+            import cProfile   # only for a capture, keeps `import profiling` cheap
+            _cprofile.discard(self.name)
+            self.prof = cProfile.Profile()
+            self.prof.enable()
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc):
+        _add(self.name, time.perf_counter() - self.start)
+        if self.prof:
+            self.prof.disable()
+            _dump(self.name, self.prof)
+        return False
+
+def _wrap(fn, name):
+    @wraps(fn)
+    def timed_call(*args, **kwargs):
+        with _stage(name):
+            return fn(*args, **kwargs)
+    return timed_call
+
+def _dump(name, prof):
+    import io
+    import pstats
+    import re
+    path = re.sub(r"[^\w.-]", "_", name) + ".prof"
+    prof.dump_stats(path)
+    out = io.StringIO()
+    pstats.Stats(prof, stream=out).sort_stats("cumulative").print_stats(CPROFILE_LINES)
+    print(f"--- cProfile {name} (full stats: {path})\n{out.getvalue()}", file=sys.stderr)
+
+
+# =========================
+# Enable / report
+# =========================
+def _install(fn, timed_fn):
+    """Replace fn by timed_fn in its class / module and in the repo modules that imported it by name."""
+    owner = sys.modules.get(fn.__module__)
+    for part in fn.__qualname__.split(".")[:-1]:
+        owner = getattr(owner, part, None)
+    if owner is not None:
+        setattr(owner, fn.__name__, timed_fn)
+    here = os.path.dirname(os.path.abspath(__file__))
+    for module in list(sys.modules.values()):
+        if os.path.dirname(os.path.abspath(getattr(module, "__file__", None) or "/")) != here:
+            continue
+        for key, value in list(vars(module).items()):
+            if value is fn:
+                setattr(module, key, timed_fn)
+
+def enable(output=None, cprofile=None):
+    """Start collecting; the breakdown is printed (or written to output) at exit."""
+    global _enabled, _output
+    if cprofile:
+        _cprofile.update(s.strip() for s in cprofile.split(",") if s.strip())
+    _output = output or _output
+    if _enabled:
+        return
+    _enabled = True
+    for fn, name in _hooks:
+        _install(fn, _wrap(fn, name))
+    _hooks.clear()
+    atexit.register(report)
+
+def add_arguments(ap):
+    """--profile / --profile-json / --cprofile for an argparse command line tool."""
+    ap.add_argument("--profile", action="store_true", help="print a per-stage timing breakdown at exit")
+    ap.add_argument("--profile-json", metavar="FILE", help="write the per-stage timings to FILE as JSON")
+    ap.add_argument("--cprofile", metavar="STAGE", help="run the next call of STAGE under cProfile (e.g. xml.esi_to_xml)")
+
+def from_args(args):
+    if args.profile or args.profile_json or args.cprofile:
+        enable(args.profile_json, args.cprofile)
+
+def results():
+    return {
+        "stages": {
+            name: {"calls": calls, "total_ms": total * 1000, "mean_ms": total * 1000 / calls, "max_ms": peak * 1000}
+            for name, (calls, total, peak) in sorted(_times.items(), key=lambda kv: -kv[1][1])
+        },
+        "counters": dict(sorted(_counters.items())),
+    }
+
+def report():
+    data = results()
+    if _output:
+        import json
+        with open(_output, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=1)
+        print(f"profile written to {_output}", file=sys.stderr)
+        return
+    if not data["stages"] and not data["counters"]:
+        return
+    width = max((len(name) for name in (*data["stages"], *data["counters"])), default=10)
+    print(f"\n{'stage':{width}} {'calls':>6} {'total ms':>10} {'mean ms':>9} {'max ms':>9}", file=sys.stderr)
+    for name, s in data["stages"].items():
+        print(f"{name:{width}} {s['calls']:6} {s['total_ms']:10.2f} {s['mean_ms']:9.3f} {s['max_ms']:9.3f}",
+              file=sys.stderr)
+    for name, n in data["counters"].items():
+        print(f"{name:{width}} {n:6}", file=sys.stderr)
+
+
+if os.environ.get(ENV) or os.environ.get(ENV_CPROFILE):
+    value = os.environ.get(ENV, "")
+    enable(None if value.lower() in ("", "1", "true", "yes", "-") else value, os.environ.get(ENV_CPROFILE))
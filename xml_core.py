@@ -0,0 +1,522 @@
+#!/usr/bin/env python3
+"""
+ESI -> ethercat-conf.xml core (no GUI)
+- ESI reading: device ids, PDOs, object dictionary
+- Touch probe bits, SDO init commands; halPin mappings and mode essentials per drive profile
+- Conversion, PDO reduction, pruning to a HAL and slave duplication on the <masters> tree
+Used by XML_Generator.py (GUI) and pipeline.py.
+"""
+
+import re
+import xml.etree.ElementTree as ET
+
+import drive_profiles
+from profiling import timed
+
+# =========================
+# Auxiliary
+# =========================
+def parse_int(val):
+    if not val:
+        return 0
+    v = val.strip().lower().replace("#", "")
+    if v.startswith("0x"):
+        return int(v, 16)
+    if v.startswith("x"):
+        return int("0x" + v[1:], 16)
+    return int(v)
+
+def hex8(v):
+    return f"{v:08X}"
+
+def dec(v):
+    return str(v)
+
+SIGNED_TYPES = {"SINT", "INT", "DINT", "LINT"}
+
+def esi_objects(root):
+    """Object dictionary of an ESI: index -> name, PDO mapping and per-subindex type, access and limits."""
+    layouts = {}
+    for dt in root.findall(".//Dictionary/DataTypes/DataType"):
+        subs = {}
+        for si in dt.findall("SubItem"):
+            if si.findtext("SubIdx") is None:
+                continue
+            subs[parse_int(si.findtext("SubIdx"))] = {
+                "dtype": si.findtext("Type", "").upper(),
+                "bits": parse_int(si.findtext("BitSize")),
+                "access": si.findtext("Flags/Access", ""),
+            }
+        layouts[dt.findtext("Name", "")] = subs
+
+    def limit(info, tag, dtype, bits):
+        val = info.findtext(tag) if info is not None else None
+        if not val:
+            return None
+        val = parse_int(val)
+        if dtype in SIGNED_TYPES and bits and val >= 1 << (bits - 1):
+            val -= 1 << bits
+        return val
+
+    out = {}
+    for obj in root.findall(".//Dictionary/Objects/Object"):
+        idx = obj.findtext("Index", "0").replace("#x", "").replace("0x", "").upper()
+        dtype = obj.findtext("Type", "")
+        access = obj.findtext("Flags/Access", "")
+        layout = layouts.get(dtype) or {
+            0: {"dtype": dtype.upper(), "bits": parse_int(obj.findtext("BitSize")), "access": access}
+        }
+        # Info/SubItem limits are listed in subindex order
+        infos = [si.find("Info") for si in obj.findall("Info/SubItem")] or [obj.find("Info")]
+
+        subs = {}
+        for n, (sub, item) in enumerate(sorted(layout.items())):
+            info = infos[n] if n < len(infos) else None
+            subs[sub] = dict(
+                item,
+                access=item["access"] or access,
+                min=limit(info, "MinValue", item["dtype"], item["bits"]),
+                max=limit(info, "MaxValue", item["dtype"], item["bits"]),
+            )
+
+        out[idx] = {
+            "name": obj.findtext("Name", ""),
+            "bits": parse_int(obj.findtext("BitSize")),
+            "dtype": dtype.upper(),
+            "mapping": obj.findtext("Flags/PdoMapping", "").upper(),
+            "subs": subs,
+        }
+    return out
+
+# =========================
+# CiA-402 operating modes
+# =========================
+# halPin naming, halTypes, the essential / feed-forward / touch probe PDO sets per mode and the
+# float pin scales come from the drive's profile (drive_profiles.py)
+
+# Kept by prune_pdos even if the HAL does not use them: the CiA-402 state machine, the mode
+# switch and the mode's command / position feedback (mandatory mapping of ETG.6010)
+MANDATORY_PDOS = {
+    "CSP": {"6040", "6041", "6060", "6061", "607A", "6064"},
+    "CSV": {"6040", "6041", "6060", "6061", "60FF", "6064"},
+    "CST": {"6040", "6041", "6060", "6061", "6071", "6064"},
+}
+
+# Bit layout of the touch probe words as lcec complexEntry (bitLen, halPin – None = reserved)
+PROBE_BITS = {
+    "60B8": [(1, "probe1-enable"), (3, None), (1, "probe1-pos-edge"), (11, None)],
+    "60B9": [(1, "probe1-enabled"), (1, "probe1-pos-stored"), (14, None)],
+}
+
+# Standard CiA-402 object sizes, used when the ESI dictionary is not loaded
+CIA402_BITLEN = {
+    "6040": 16,
+    "6041": 16,
+    "6060": 8,
+    "6061": 8,
+    "6064": 32,
+    "606C": 32,
+    "6071": 16,
+    "6077": 16,
+    "607A": 32,
+    "60B1": 32,
+    "60B2": 16,
+    "60FF": 32,
+}
+
+# =========================
+# Drive-side SDO init (lcec sdoConfig)
+# =========================
+# Per-axis profile: (object, subindex, profile key) – empty values are not written
+SDO_PROFILE = [
+    ("6098", 0, "homing_method"),
+    ("6099", 1, "homing_speed_switch"),
+    ("6099", 2, "homing_speed_zero"),
+    ("609A", 0, "homing_acceleration"),
+    ("6065", 0, "following_error_window"),
+    ("6066", 0, "following_error_timeout"),
+]
+
+# Standard CiA-402 SDO types (dtype, bits), used when the ESI dictionary is not loaded
+SDO_TYPES = {
+    ("6098", 0): ("SINT", 8),
+    ("6099", 1): ("UDINT", 32),
+    ("6099", 2): ("UDINT", 32),
+    ("609A", 0): ("UDINT", 32),
+    ("6065", 0): ("UDINT", 32),
+    ("6066", 0): ("UINT", 16),
+    ("60C2", 1): ("USINT", 8),
+    ("60C2", 2): ("SINT", 8),
+}
+
+def interpolation_period(period_ns):
+    """60C2 interpolation time period (value, index) for a cycle in ns: value * 10^index s."""
+    value, index = period_ns, -9
+    while value % 10 == 0 and index < 0:
+        value //= 10
+        index += 1
+    if not 0 < value <= 255:
+        raise ValueError(f"appTimePeriod {period_ns} ns cannot be expressed as 60C2 (value 1..255 * 10^index)")
+    return value, index
+
+def sdo_commands(profile, period_ns=None, objects=None):
+    """
+    Builds (idx, subIdx, bits, value) SDO writes from an axis profile.
+    Values are checked against the ESI object dictionary when it is loaded.
+    Raises ValueError listing every invalid entry.
+    """
+    writes = []
+    for idx, sub, key in SDO_PROFILE:
+        val = str(profile.get(key, "")).strip()
+        if val:
+            writes.append((idx, sub, key, val))
+    if period_ns:
+        value, index = interpolation_period(period_ns)
+        writes.append(("60C2", 1, "interpolation period", str(value)))
+        writes.append(("60C2", 2, "interpolation index", str(index)))
+
+    cmds = []
+    errors = []
+    for idx, sub, key, val in writes:
+        try:
+            value = parse_int(val) if not val.startswith("-") else -parse_int(val[1:])
+        except ValueError:
+            errors.append(f"{key}: '{val}' is not a number")
+            continue
+
+        if objects:
+            obj = objects.get(idx)
+            item = obj["subs"].get(sub) if obj else None
+            if item is None:
+                errors.append(f"{key}: object {idx}:{sub:02X} not in ESI")
+                continue
+            if "w" not in item["access"]:
+                errors.append(f"{key}: object {idx}:{sub:02X} is read-only ({item['access']})")
+                continue
+            dtype, bits = item["dtype"], item["bits"]
+            lo, hi = item["min"], item["max"]
+        else:
+            dtype, bits = SDO_TYPES[(idx, sub)]
+            lo = hi = None
+
+        signed = dtype in SIGNED_TYPES
+        if lo is None:
+            lo = -(1 << (bits - 1)) if signed else 0
+        if hi is None:
+            hi = (1 << (bits - 1)) - 1 if signed else (1 << bits) - 1
+        if not lo <= value <= hi:
+            errors.append(f"{key}: {value} outside {idx}:{sub:02X} range {lo}..{hi}")
+            continue
+        cmds.append((idx, sub, bits, value))
+
+    if errors:
+        raise ValueError("\n".join(errors))
+    return cmds
+
+# =========================
+# Conversion (shared by the GUI and pipeline.py)
+# =========================
+def obj_index(text):
+    return text.replace("#x", "").replace("0x", "").upper()
+
+@timed("xml.read_esi")
+def read_esi(root):
+    """Device ids, name, Rx/Tx PDOs and object dictionary of a parsed ESI file."""
+    t = root.find(".//Device/Type")
+
+    def pdos(tag):
+        out = []
+        for p in root.findall(f".//{tag}"):
+            entries = []
+            for e in p.findall("Entry"):
+                entries.append({
+                    "idx": obj_index(e.findtext("Index", "0")),
+                    "sub": e.findtext("SubIndex", "0"),
+                    "bits": e.findtext("BitLen", "0"),
+                    "dtype": e.findtext("DataType", "").upper()
+                })
+            out.append({"index": obj_index(p.findtext("Index", "0")), "entries": entries})
+        return out
+
+    return {
+        "vendor": parse_int(root.findtext(".//Vendor/Id")),
+        "product": parse_int(t.attrib.get("ProductCode")),
+        "revision": parse_int(t.attrib.get("RevisionNo")),
+        "name": t.text.strip() if t.text else "EtherCAT-Slave",
+        "rx": pdos("RxPdo"),
+        "tx": pdos("TxPdo"),
+        "objects": esi_objects(root)
+    }
+
+def hal_for(idx, profile=None):
+    """halPin / halType of a pdoEntry from the drive profile (generic CiA-402: 6040, 6041 = u32, others = s32)."""
+    return (profile or drive_profiles.get()).hal_for(idx)
+
+def fix_close_tags(xml_text):
+    xml_text = xml_text.replace(" />", "/>")
+    xml_text = xml_text.replace("</slave></master>", "</slave>\n </master>")
+    return xml_text
+
+@timed("xml.xml_text")
+def xml_text(root):
+    return fix_close_tags(ET.tostring(root, encoding="unicode"))
+
+@timed("xml.esi_to_xml")
+def esi_to_xml(esi):
+    """ethercat-conf.xml text: EK1100 coupler + one drive with all PDOs of the ESI."""
+    s = esi
+    profile = drive_profiles.for_esi(esi)
+    o = []
+    o.append("<masters>")
+    o.append(' <master idx="0" appTimePeriod="1000000" refClockSyncCycles="1">')
+    o.append('  <slave idx="0" type="EK1100"/>')
+
+    o.append(
+        '  <slave idx="1" type="generic" '
+        f'vid="{hex8(s["vendor"])}" '
+        f'pid="{hex8(s["product"])}" '
+        f'configPdos="true">'
+    )
+
+    o.append('   <dcConf assignActivate="300" sync0Cycle="*1" sync0Shift="0"/>')
+
+    for sm, direction, pdos in (("2", "out", s["rx"]), ("3", "in", s["tx"])):
+        o.append(f'   <syncManager idx="{sm}" dir="{direction}">')
+        for pdo in pdos:
+            o.append(f'     <pdo idx="{pdo["index"]}">')
+            for e in pdo["entries"]:
+                halPin, halType = profile.hal_for(e["idx"])
+                o.append(
+                    f'       <pdoEntry idx="{e["idx"]}" subIdx="{int(e["sub"]):02}" '
+                    f'bitLen="{e["bits"]}" halPin="{halPin}" halType="{halType}"/>'
+                )
+            o.append("     </pdo>")
+        o.append("   </syncManager>")
+
+    o.append("  </slave>")
+    o.append(" </master>")
+    o.append("</masters>")
+    return fix_close_tags("\n".join(o))
+
+@timed("xml.rename_pins")
+def rename_pins(root, esi=None):
+    """Renamed halPins of each slave's drive profile for its pdoEntries."""
+    for slave in root.iter("slave"):
+        rename = drive_profiles.for_slave(slave, esi).rename
+        for p in slave.iter("pdoEntry"):
+            idx = p.attrib.get("idx", "").replace("0x", "").upper()
+            if idx in rename:
+                p.set("halPin", rename[idx])
+
+def pdo_entry(esi, idx, direction, profile=None):
+    """Builds a pdoEntry for an object missing from the PDO, None if the drive cannot map it."""
+    obj = (esi or {}).get("objects", {}).get(idx)
+    if obj is not None:
+        if obj["mapping"] and direction not in obj["mapping"]:
+            return None
+        bits = obj["bits"]
+    else:
+        bits = CIA402_BITLEN.get(idx)
+    if not bits:
+        return None
+
+    halPin, halType = hal_for(idx, profile)
+    return ET.Element("pdoEntry", {
+        "idx": idx, "subIdx": "00", "bitLen": str(bits),
+        "halPin": halPin, "halType": halType,
+    })
+
+def complex_entry(entry, bits):
+    """Splits a pdoEntry into lcec complexEntry bit pins."""
+    entry.attrib.pop("halPin", None)
+    entry.set("halType", "complex")
+    indent = (entry.tail or "\n").rstrip(" ")
+    pad = " " * (len(entry.tail or "") - len(indent))
+    entry.text = f"{indent}{pad}  "
+    children = []
+    for bitLen, halPin in bits:
+        attrs = {"bitLen": str(bitLen)}
+        if halPin:
+            attrs.update({"halPin": halPin, "halType": "bit"})
+        child = ET.SubElement(entry, "complexEntry", attrs)
+        child.tail = f"{indent}{pad}  "
+        children.append(child)
+    children[-1].tail = f"{indent}{pad}"
+
+@timed("xml.reduce_pdos")
+def reduce_pdos(root, mode, esi=None, feedforward=False, probe=False):
+    """
+    Reduces every slave's PDOs to the mode essentials of its drive profile; returns the
+    objects the drive cannot map.
+    """
+    skipped = set()
+    for slave in root.iter("slave"):
+        profile = drive_profiles.for_slave(slave, esi)
+        keep_map = profile.keep_map(mode, feedforward, probe)
+        float_scale = profile.float_scale()
+        for sm in slave.findall("syncManager"):
+            direction = "R" if sm.attrib.get("dir") == "out" else "T"
+            for pdo in list(sm.findall("pdo")):
+                idx = pdo.attrib.get("idx", "").upper()
+                if idx not in keep_map:
+                    sm.remove(pdo)
+                    continue
+
+                present = set()
+                for entry in list(pdo.findall("pdoEntry")):
+                    eidx = entry.attrib.get("idx", "").upper()
+                    if eidx not in keep_map[idx]:
+                        pdo.remove(entry)
+                    else:
+                        present.add(eidx)
+
+                # Objects the mode needs but the default PDO does not map
+                for eidx in keep_map[idx]:
+                    if eidx in present:
+                        continue
+                    entry = pdo_entry(esi, eidx, direction, profile)
+                    if entry is None:
+                        skipped.add(eidx)
+                        continue
+                    if len(pdo):
+                        # Keep the indentation of the existing entries
+                        entry.tail = pdo[-1].tail
+                        pdo[-1].tail = pdo[-2].tail if len(pdo) > 1 else pdo.text
+                    pdo.append(entry)
+
+                for entry in pdo.findall("pdoEntry"):
+                    eidx = entry.attrib.get("idx", "").upper()
+                    if eidx in float_scale:
+                        entry.set("halType", "float")
+                        entry.set("scale", float_scale[eidx])
+                    elif eidx in PROBE_BITS and entry.attrib.get("halType") != "complex":
+                        complex_entry(entry, PROBE_BITS[eidx])
+    return skipped
+
+def scale_floats(root, pos_scales, esi=None):
+    """
+    Sets the scale of the float entries (60B1 / 60B2 / 60BA) to the cia402 pos-scale the HAL
+    uses for their slave: {slave idx: pos-scale}. Returns the number of entries changed.
+    """
+    changed = 0
+    for slave in root.iter("slave"):
+        pos_scale = pos_scales.get(int(slave.attrib.get("idx", -1)))
+        if not pos_scale:
+            continue
+        float_scale = drive_profiles.for_slave(slave, esi).float_scale(pos_scale)
+        for entry in slave.iter("pdoEntry"):
+            scale = float_scale.get(entry.attrib.get("idx", "").upper())
+            if entry.attrib.get("halType") == "float" and scale and entry.attrib.get("scale") != scale:
+                entry.set("scale", scale)
+                changed += 1
+    return changed
+
+# =========================
+# Feedback pruning (HAL -> XML)
+# =========================
+LCEC_PIN = re.compile(r"\blcec\.(\d+)\.(\d+)\.([^\s#]+)")
+HAL_MODE = re.compile(r"\.(csp|csv|cst)-?mode\s+1\b", re.IGNORECASE)
+HAL_OPMODE = re.compile(r"^\s*setp\s+lcec\.\d+\.\d+\.opmode\s+(8|9|10)\b", re.MULTILINE)
+OPMODE_NAMES = {"8": "CSP", "9": "CSV", "10": "CST"}
+
+def hal_references(hal_text):
+    """{(master, slave): {pin}} of the lcec.M.S.<pin> names a HAL file uses (comments ignored)."""
+    refs = {}
+    for line in hal_text.splitlines():
+        for master, slave, pin in LCEC_PIN.findall(line.split("#", 1)[0]):
+            refs.setdefault((int(master), int(slave)), set()).add(pin.replace("_", "-"))
+    return refs
+
+def hal_mode(hal_text):
+    """
+    CiA-402 mode the HAL switches the drives to (setp cia402.N.csp-mode 1, or the drive's
+    setp lcec.M.S.opmode 10 of a comp without that mode), CSP if none.
+    """
+    m = HAL_MODE.search(hal_text)
+    if m:
+        return m.group(1).upper()
+    m = HAL_OPMODE.search(hal_text)
+    return OPMODE_NAMES[m.group(1)] if m else "CSP"
+
+def remove_child(parent, child):
+    """Removes child; the closing tag of parent keeps its indentation."""
+    i = list(parent).index(child)
+    if i and i == len(parent) - 1:
+        parent[i - 1].tail = child.tail
+    parent.remove(child)
+
+@timed("xml.prune_pdos")
+def prune_pdos(root, hal_text, mode=None):
+    """
+    Removes the pdoEntries whose halPins the HAL never uses or whose object an earlier PDO
+    already maps, and PDOs left empty, from every slave the HAL talks to; MANDATORY_PDOS[mode]
+    stay (mode None: read from the HAL). Returns the removed entries [(slave, pdo, entry, bits)].
+    """
+    refs = hal_references(hal_text)
+    keep = MANDATORY_PDOS[mode or hal_mode(hal_text)]
+    removed = []
+    for master in root.iter("master"):
+        midx = parse_int(master.attrib.get("idx", "0"))
+        for slave in master.findall("slave"):
+            sidx = parse_int(slave.attrib.get("idx", "0"))
+            used = refs.get((midx, sidx))
+            if not used:
+                continue   # not wired by this HAL (another HAL file or a wrong one) – left as it is
+            mapped = set()
+            for sm in slave.findall("syncManager"):
+                for pdo in list(sm.findall("pdo")):
+                    pidx = pdo.attrib.get("idx", "").upper()
+                    entries = pdo.findall("pdoEntry")
+                    dropped = []
+                    for entry in entries:
+                        eidx = entry.attrib.get("idx", "").upper()
+                        pins = {e.attrib.get("halPin", "").replace("_", "-") for e in entry.iter()}
+                        obj = (eidx, parse_int(entry.attrib.get("subIdx", "0")))
+                        if not eidx.strip("0"):
+                            continue   # padding goes only with its PDO
+                        if obj not in mapped and (eidx in keep or pins & used):
+                            mapped.add(obj)
+                            continue
+                        dropped.append(entry)
+                    if len(dropped) == sum(bool(e.attrib.get("idx", "").strip("0")) for e in entries):
+                        dropped = entries
+                    for entry in dropped:
+                        remove_child(pdo, entry)
+                        removed.append((sidx, pidx, entry.attrib.get("idx", "").upper(),
+                                        parse_int(entry.attrib.get("bitLen", "0"))))
+                    if not len(pdo.findall("pdoEntry")):
+                        remove_child(sm, pdo)
+    return removed
+
+@timed("xml.duplicate_slave")
+def duplicate_slave(root):
+    """Appends a copy of slave idx=1 with the next free idx; None if there is no slave 1."""
+    slave1 = root.find(".//slave[@idx='1']")
+    if slave1 is None:
+        return None
+    max_idx = max(int(s.attrib.get("idx", "0")) for s in root.findall(".//slave"))
+    new_slave = ET.fromstring(ET.tostring(slave1, encoding="unicode"))
+    new_slave.set("idx", str(max_idx + 1))
+    master = root.find(".//master")
+    if len(master) and not master[-1].tail:
+        master[-1].tail = "\n "   # as fix_close_tags leaves it, so repeated copies line up
+    master.append(new_slave)
+    return new_slave
+
+@timed("xml.set_sdo_config")
+def set_sdo_config(slave, cmds):
+    """Replaces the slave's sdoConfig for the given objects, placed before the sync managers."""
+    for idx, sub, bits, value in cmds:
+        for old in slave.findall("sdoConfig"):
+            if old.attrib.get("idx", "").upper() == idx and parse_int(old.attrib.get("subIdx", "0") or "0") == sub:
+                slave.remove(old)
+
+    pos = next((i for i, child in enumerate(slave) if child.tag == "syncManager"), len(slave))
+    tail = slave[pos - 1].tail if pos else slave.text
+    for idx, sub, bits, value in cmds:
+        data = value.to_bytes(bits // 8, "little", signed=value < 0)
+        sdo = ET.Element("sdoConfig", {"idx": idx, "subIdx": f"{sub:02X}"})
+        ET.SubElement(sdo, "sdoDataRaw", {"data": " ".join(f"{b:02X}" for b in data)})
+        sdo.tail = tail
+        slave.insert(pos, sdo)
+        pos += 1